@@ -4,9 +4,11 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from products.carts import get_cart_storage, get_guest_token, load_guest_cart
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
@@ -101,7 +103,7 @@ class LoginView(generics.GenericAPIView):
     permission_classes = [AllowAny]
 
     @swagger_auto_schema(
-        operation_description="Login with email and password",
+        operation_description="Login with email and password; a signed guest cart (X-Guest-Cart header or guest_cart cookie) is merged into the user's cart",
         request_body=UserLoginSerializer,
         responses={
             200: openapi.Response(
@@ -129,13 +131,21 @@ class LoginView(generics.GenericAPIView):
         user = serializer.validated_data['user']
         
         refresh = RefreshToken.for_user(user)
+
+        # Fold any anonymous cart into the user's cart
+        guest_nonce, guest_lines = load_guest_cart(get_guest_token(request))
+        if guest_lines:
+            get_cart_storage().merge(user, guest_nonce, guest_lines)
         
-        return Response({
+        response = Response({
             'user': UserProfileSerializer(user).data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
             'message': 'Login successful'
         })
+        if guest_lines:
+            response.delete_cookie(settings.GUEST_CART_COOKIE, samesite='Lax')
+        return response
 
 class ProfileView(generics.RetrieveUpdateAPIView):
     """Get and update user profile"""
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-15 04:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='payments_or_user_id_b1ddec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='payments_tr_user_id_a0b2b8_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-15 09:40
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+PAID_STATUSES = ('paid', 'processing', 'shipped', 'delivered')
+
+
+def populate_paid_at(apps, schema_editor):
+    Order = apps.get_model('payments', 'Order')
+    Transaction = apps.get_model('payments', 'Transaction')
+    # First successful payment, else the last change (orders marked paid by hand)
+    first_payment = Transaction.objects.filter(
+        order=OuterRef('pk'), status='success', paid_at__isnull=False
+    ).order_by('paid_at').values('paid_at')[:1]
+    Order.objects.filter(status__in=PAID_STATUSES).update(
+        paid_at=Coalesce(Subquery(first_payment), F('updated_at'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='paid_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(populate_paid_at, migrations.RunPython.noop),
+    ]
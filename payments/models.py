@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from decimal import Decimal
 import uuid
 
@@ -15,6 +16,8 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
         ('refunded', 'Refunded'),
     ]
+    # Statuses of orders that have been paid for
+    PAID_STATUSES = ('paid', 'processing', 'shipped', 'delivered')
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
@@ -24,11 +27,16 @@ class Order(models.Model):
     shipping_address = models.TextField()
     phone_number = models.CharField(max_length=20)
     notes = models.TextField(blank=True)
+    # When the order first reached a paid status (set by save())
+    paid_at = models.DateTimeField(null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"Order {self.order_number}"
@@ -36,6 +44,11 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         if not self.order_number:
             self.order_number = f"SG{str(self.id)[:8].upper()}"
+        if self.paid_at is None and self.status in self.PAID_STATUSES:
+            self.paid_at = timezone.now()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'paid_at'}
         super().save(*args, **kwargs)
 
 
@@ -85,6 +98,9 @@ class Transaction(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"Transaction {self.reference}"
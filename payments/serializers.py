@@ -53,6 +53,12 @@ class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     total_amount_formatted = serializers.SerializerMethodField()
+    # Model columns read by non-field attributes (see SparseFieldsetMixin)
+    field_dependencies = {
+        'user_name': ['user__first_name', 'user__last_name', 'user__username'],
+        'status_display': ['status'],
+        'total_amount_formatted': ['total_amount'],
+    }
     
     class Meta:
         model = Order
@@ -98,6 +104,11 @@ class TransactionSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     amount_formatted = serializers.SerializerMethodField()
     currency_display = serializers.SerializerMethodField()
+    field_dependencies = {
+        'status_display': ['status'],
+        'amount_formatted': ['amount'],
+        'currency_display': ['currency'],
+    }
     
     class Meta:
         model = Transaction
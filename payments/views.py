@@ -16,18 +16,22 @@ from .serializers import (
 )
 from .services import PaystackService
 from .utils import verify_paystack_signature, process_webhook_event, generate_transaction_reference
+from products.carts import get_cart_storage
 from products.models import Cart
+from smart_gear.fieldsets import SparseFieldsetMixin
+from smart_gear.pagination import KeysetOrPageNumberPagination
 
 logger = logging.getLogger(__name__)
 
-class OrderListView(generics.ListAPIView):
+class OrderListView(SparseFieldsetMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetOrPageNumberPagination
 
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user)
 
-class OrderDetailView(generics.RetrieveAPIView):
+class OrderDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
@@ -42,7 +46,7 @@ class OrderCreateView(generics.CreateAPIView):
         # Check if user has items in cart
         try:
             cart = Cart.objects.get(user=request.user)
-            if not cart.items.exists():
+            if not get_cart_storage().has_items(cart):
                 return Response({
                     'error': 'Your cart is empty'
                 }, status=status.HTTP_400_BAD_REQUEST)
@@ -256,14 +260,15 @@ def paystack_webhook(request):
         logger.error(f"Webhook processing error: {str(e)}")
         return HttpResponse(status=500)
 
-class TransactionListView(generics.ListAPIView):
+class TransactionListView(SparseFieldsetMixin, generics.ListAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetOrPageNumberPagination
 
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user)
 
-class TransactionDetailView(generics.RetrieveAPIView):
+class TransactionDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
 
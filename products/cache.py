@@ -0,0 +1,206 @@
+# products/cache.py
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+VERSION_KEY = 'catalog:version:{scope}'
+RESPONSE_KEY = 'catalog:response:{view}:{digest}'
+STATS_KEYS = {'hits': 'catalog:stats:hits', 'misses': 'catalog:stats:misses'}
+
+
+def get_catalog_cache():
+    """Return the cache backend used for catalog responses"""
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def new_version():
+    # Time-based so a version key that was evicted never restarts at a used value
+    return int(time.time() * 1000)
+
+
+def get_versions(scopes):
+    """Return the current version of each cache scope, initialising missing ones"""
+    cache = get_catalog_cache()
+    keys = {scope: VERSION_KEY.format(scope=scope) for scope in scopes}
+    stored = cache.get_many(keys.values())
+
+    versions = {}
+    for scope, key in keys.items():
+        if key not in stored:
+            cache.add(key, new_version(), timeout=None)
+            stored[key] = cache.get(key)
+        versions[scope] = stored[key]
+    return versions
+
+
+def bump_versions(*scopes):
+    """Invalidate every cached response depending on the given scopes"""
+    cache = get_catalog_cache()
+    for scope in set(scopes):
+        key = VERSION_KEY.format(scope=scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_version(), timeout=None)
+
+
+def bump_versions_on_commit(*scopes):
+    """Bump scope versions once the current transaction commits"""
+    transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+def record(outcome):
+    cache = get_catalog_cache()
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def get_stats():
+    """Return hit/miss counters for the catalog response cache"""
+    cache = get_catalog_cache()
+    stored = cache.get_many(STATS_KEYS.values())
+    hits = stored.get(STATS_KEYS['hits'], 0)
+    misses = stored.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0,
+        'backend': settings.CACHES[settings.CATALOG_CACHE_ALIAS]['BACKEND'],
+        'versions': get_versions(['products', 'categories']),
+    }
+
+
+def get_or_revalidate(key, compute, timeout, stale_timeout):
+    """
+    Return a cached value with stale-while-revalidate semantics.
+
+    Fresh values are returned as-is. Once stale, the first caller to take the
+    refresh lock recomputes the value while concurrent callers keep getting
+    the stale copy, so an expensive query never runs more than once at a time.
+    """
+    cache = get_catalog_cache()
+    lock_key = f"{key}:lock"
+    entry = cache.get(key)
+    now = time.time()
+    locked = False
+    if entry is not None:
+        value, fresh_until = entry
+        if now < fresh_until:
+            return value
+        locked = cache.add(lock_key, 1, timeout=30)
+        if not locked:
+            return value
+
+    try:
+        value = compute()
+        if value is not None:
+            cache.set(key, (value, now + timeout), timeout + stale_timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def normalize_query(query_params):
+    """Return a canonical string for a QueryDict (sorted keys and values)"""
+    return '&'.join(
+        f"{key}={value}"
+        for key in sorted(query_params)
+        for value in sorted(query_params.getlist(key))
+    )
+
+
+class CatalogCacheMixin:
+    """
+    Cache GET responses of catalog views.
+
+    Keys combine the versions of the view's cache scopes with the host, path
+    kwargs and normalized query string. Writes bump the affected scope
+    versions (see products.signals), which orphans stale entries instead of
+    deleting them.
+    """
+    cache_scopes = ('products', 'categories')
+
+    def get_cache_scopes(self):
+        return list(self.cache_scopes)
+
+    def get_response_cache_key(self, request):
+        versions = get_versions(self.get_cache_scopes())
+        parts = [
+            request.get_host(),
+            repr(sorted(self.kwargs.items())),
+            normalize_query(request.query_params),
+            repr(sorted(versions.items())),
+        ]
+        digest = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+        return RESPONSE_KEY.format(view=self.__class__.__name__, digest=digest)
+
+    def get(self, request, *args, **kwargs):
+        timeout = settings.CATALOG_CACHE_TIMEOUT
+        if not timeout:
+            return super().get(request, *args, **kwargs)
+
+        cache = get_catalog_cache()
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record('hits')
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        record('misses')
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+def make_etag(*parts):
+    """Build a quoted strong ETag from arbitrary validator parts"""
+    return quote_etag(hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs (If-None-Match / If-Modified-Since) with 304.
+
+    Views implement get_validators() returning (etag, last_modified) from a
+    cheap query on updated_at columns plus catalog versions, or None to skip.
+    Matching requests are answered before any response cache lookup or
+    serializer runs; full responses carry the ETag and Last-Modified headers.
+    """
+
+    def get_validators(self, request):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        validators = self.get_validators(request)
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        return response
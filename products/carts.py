@@ -0,0 +1,613 @@
+# products/carts.py
+import secrets
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .cache import get_catalog_cache, get_versions, make_etag
+from .models import Cart, CartItem, GuestCartMerge, Product
+
+# Databases supporting INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+GUEST_CART_SALT = 'products.guest_cart'
+GUEST_CART_HEADER = 'X-Guest-Cart'
+# Keeps the signed cookie well under browser size limits
+MAX_GUEST_CART_LINES = 50
+CART_PRODUCT_KEY = 'catalog:cart-product:{pk}:{versions}'
+
+
+def upsert_sql():
+    quote = connection.ops.quote_name
+    meta = CartItem._meta
+    table = quote(meta.db_table)
+    columns = {
+        name: quote(meta.get_field(name).column)
+        for name in ('cart', 'product', 'quantity', 'created_at', 'updated_at')
+    }
+    return (
+        f"INSERT INTO {table} ({columns['cart']}, {columns['product']}, {columns['quantity']}, "
+        f"{columns['created_at']}, {columns['updated_at']}) VALUES (%s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({columns['cart']}, {columns['product']}) DO UPDATE SET "
+        f"{columns['quantity']} = {table}.{columns['quantity']} + EXCLUDED.{columns['quantity']}, "
+        f"{columns['updated_at']} = EXCLUDED.{columns['updated_at']} "
+        f"RETURNING {quote(meta.pk.column)}, {columns['cart']}, {columns['product']}, "
+        f"{columns['quantity']}, {columns['created_at']}, {columns['updated_at']}"
+    )
+
+
+def add_to_cart(cart, product, quantity):
+    """
+    Add quantity of product to a cart and return the resulting CartItem.
+
+    The line is created or incremented in a single atomic upsert, so
+    concurrent adds of the same product never lose an update. Other
+    databases fall back to an F() increment, inserting (and retrying the
+    increment if a concurrent insert won) when no line exists yet.
+    """
+    if connection.vendor in UPSERT_VENDORS:
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        # Fully consumed so the statement completes before returning
+        cart_item, = CartItem.objects.raw(upsert_sql(), [cart.pk, product.pk, quantity, now, now])
+    else:
+        cart_item = increment_or_create(cart, product, quantity)
+
+    cart_item.cart = cart
+    cart_item.product = product
+    return cart_item
+
+
+def increment_or_create(cart, product, quantity):
+    lines = CartItem.objects.filter(cart=cart, product=product)
+    if not lines.update(quantity=F('quantity') + quantity, updated_at=timezone.now()):
+        try:
+            with transaction.atomic():
+                return CartItem.objects.create(cart=cart, product=product, quantity=quantity)
+        except IntegrityError:
+            lines.update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+    return lines.get()
+
+
+def fold_operations(operations, quantities, products):
+    """
+    Apply add/set/remove operations to a {product_id: quantity} dict in place.
+
+    Every add/set is checked against the (in_bulk) products; returns a list
+    of per-operation errors.
+    """
+    errors = []
+    for index, operation in enumerate(operations):
+        product_id = operation['product_id']
+        if operation['op'] == 'remove':
+            quantities[product_id] = 0
+            continue
+
+        quantity = operation['quantity']
+        if operation['op'] == 'add':
+            quantity += quantities.get(product_id, 0)
+        quantities[product_id] = quantity
+        if not quantity:
+            continue
+
+        product = products.get(product_id)
+        if product is None or not product.is_active:
+            errors.append({'index': index, 'product_id': product_id, 'errors': {
+                'product_id': ['Product not found']
+            }})
+        elif quantity > product.stock_quantity:
+            errors.append({'index': index, 'product_id': product_id, 'errors': {
+                'quantity': [f'Only {product.stock_quantity} units available']
+            }})
+    return errors
+
+
+def apply_cart_operations(cart, operations):
+    """
+    Apply a list of add/set/remove operations to a cart, all or nothing.
+
+    Products are fetched in one query and the cart's affected lines in
+    another (locked for the transaction); the operations are folded in
+    memory and validated against stock, then written with at most one
+    bulk delete, create and update. Returns a list of per-operation errors
+    (nothing is written unless it is empty).
+    """
+    product_ids = {operation['product_id'] for operation in operations}
+    products = Product.objects.in_bulk(product_ids)
+
+    with transaction.atomic():
+        lines = {
+            line.product_id: line
+            for line in CartItem.objects.select_for_update().filter(
+                cart=cart, product_id__in=product_ids
+            )
+        }
+        quantities = {product_id: line.quantity for product_id, line in lines.items()}
+
+        errors = fold_operations(operations, quantities, products)
+        if errors:
+            return errors
+
+        now = timezone.now()
+        to_delete = []
+        to_create = []
+        to_update = []
+        for product_id, quantity in quantities.items():
+            line = lines.get(product_id)
+            if not quantity:
+                if line is not None:
+                    to_delete.append(line.pk)
+            elif line is None:
+                to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+            elif line.quantity != quantity:
+                line.quantity = quantity
+                line.updated_at = now
+                to_update.append(line)
+
+        if to_delete:
+            CartItem.objects.filter(pk__in=to_delete).delete()
+        if to_create:
+            CartItem.objects.bulk_create(to_create)
+        if to_update:
+            CartItem.objects.bulk_update(to_update, ['quantity', 'updated_at'])
+    return []
+
+
+def get_guest_token(request):
+    """Signed guest cart token from the X-Guest-Cart header or the cookie"""
+    return request.headers.get(GUEST_CART_HEADER) or request.COOKIES.get(settings.GUEST_CART_COOKIE)
+
+
+def load_guest_cart(token):
+    """
+    Return (nonce, {product_id: quantity}) for a signed guest cart.
+
+    The nonce identifies the guest cart across edits so that it merges only
+    once; missing or invalid tokens give (None, {}).
+    """
+    if not token:
+        return None, {}
+    try:
+        payload = signing.loads(token, salt=GUEST_CART_SALT, max_age=settings.GUEST_CART_MAX_AGE)
+        nonce, lines = payload['n'], payload['l']
+        return str(nonce), {int(product_id): int(quantity) for product_id, quantity in lines}
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None, {}
+
+
+def dump_guest_cart(nonce, lines):
+    """Sign guest cart lines into a compact token (zero quantities dropped, new carts get a nonce)"""
+    return signing.dumps(
+        {
+            'n': nonce or secrets.token_hex(8),
+            'l': sorted([product_id, quantity] for product_id, quantity in lines.items() if quantity),
+        },
+        salt=GUEST_CART_SALT,
+        compress=True,
+    )
+
+
+def claim_guest_cart(user, nonce):
+    """
+    Record a guest cart as merged, returning False if it already was.
+
+    Call inside the merge transaction: the unique nonce makes replays and
+    concurrent merges of one guest cart no-ops. Records older than the token
+    lifetime are pruned, since their tokens no longer load.
+    """
+    GuestCartMerge.objects.filter(
+        merged_at__lt=timezone.now() - timedelta(seconds=settings.GUEST_CART_MAX_AGE)
+    ).delete()
+    try:
+        with transaction.atomic():
+            GuestCartMerge.objects.create(nonce=nonce, user=user)
+    except IntegrityError:
+        return False
+    return True
+
+
+def guest_cart_items(lines):
+    """Unsaved CartItems (with products) for guest cart lines, from one query"""
+    products = Product.objects.select_related('category').filter(
+        pk__in=list(lines), is_active=True
+    ).in_bulk()
+    return [
+        CartItem(product=products[product_id], quantity=quantity)
+        for product_id, quantity in sorted(lines.items())
+        if product_id in products
+    ]
+
+
+def merge_guest_cart(user, nonce, lines):
+    """
+    Merge guest cart lines into a user's cart, capping quantities at stock.
+
+    One product fetch covers every merged line, the user's matching lines
+    are read (locked) in a second query, and the summed quantities are
+    written with one bulk upsert. A guest cart merges once (see
+    claim_guest_cart). Returns the number of merged lines.
+    """
+    products = Product.objects.filter(
+        pk__in=list(lines), is_active=True, stock_quantity__gt=0
+    ).only('pk', 'stock_quantity').in_bulk()
+    if not products:
+        return 0
+
+    cart, created = Cart.objects.get_or_create(user=user)
+    with transaction.atomic():
+        if not claim_guest_cart(user, nonce):
+            return 0
+        current = dict(CartItem.objects.select_for_update().filter(
+            cart=cart, product_id__in=list(products)
+        ).values_list('product_id', 'quantity'))
+
+        now = timezone.now()
+        merged = [
+            CartItem(
+                cart=cart,
+                product_id=product_id,
+                quantity=min(current.get(product_id, 0) + lines[product_id], product.stock_quantity),
+                created_at=now,
+                updated_at=now,
+            )
+            for product_id, product in products.items()
+        ]
+        CartItem.objects.bulk_create(
+            merged,
+            update_conflicts=True,
+            unique_fields=['cart', 'product'],
+            update_fields=['quantity', 'updated_at'],
+        )
+    return len(merged)
+
+
+def get_cached_products(product_ids):
+    """
+    Products (with categories) by id, served from the catalog cache.
+
+    Entries are keyed by the products/categories scope versions, so any
+    catalog write orphans them; misses are loaded in one query and cached.
+    """
+    versions = get_versions(['products', 'categories'])
+    suffix = f"{versions['products']}.{versions['categories']}"
+    keys = {pk: CART_PRODUCT_KEY.format(pk=pk, versions=suffix) for pk in product_ids}
+
+    cache = get_catalog_cache()
+    stored = cache.get_many(keys.values())
+    products = {pk: stored[key] for pk, key in keys.items() if key in stored}
+    missing = [pk for pk in keys if pk not in products]
+    if missing:
+        loaded = Product.objects.select_related('category').in_bulk(missing)
+        if loaded and settings.CATALOG_CACHE_TIMEOUT:
+            cache.set_many(
+                {keys[pk]: product for pk, product in loaded.items()},
+                settings.CATALOG_CACHE_TIMEOUT
+            )
+        products.update(loaded)
+    return products
+
+
+class BaseCartStorage:
+    """
+    Interface for cart storages.
+
+    Storages read and write a user's cart for the cart views, returning Cart
+    and CartItem instances that CartSerializer and CartItemSerializer render
+    the same way whatever the storage. Instances live for one request.
+    """
+
+    def get_cart(self, user):
+        """The user's cart with its items loaded"""
+        raise NotImplementedError
+
+    def get_validators(self, user):
+        """(etag, last_modified) of the user's cart for conditional GETs, or None"""
+        return None
+
+    def summarize(self, user):
+        """Dict of total_amount, total_items and total_unique_items"""
+        raise NotImplementedError
+
+    def list_items(self, user):
+        raise NotImplementedError
+
+    def get_item(self, user, item_id):
+        """Cart item by id; raises CartItem.DoesNotExist"""
+        raise NotImplementedError
+
+    def product_ids(self, user):
+        """Ids of the carted products (a list or a values() queryset)"""
+        raise NotImplementedError
+
+    def has_items(self, cart):
+        raise NotImplementedError
+
+    def add(self, user, product, quantity):
+        """Add quantity of product, returning the resulting CartItem"""
+        raise NotImplementedError
+
+    def set_quantity(self, user, item, quantity):
+        """Set an item's quantity (0 removes it), returning the item or None"""
+        raise NotImplementedError
+
+    def remove_item(self, user, item_id):
+        """Remove an item; raises CartItem.DoesNotExist"""
+        raise NotImplementedError
+
+    def apply_operations(self, user, operations):
+        """Apply add/set/remove operations all or nothing, returning per-operation errors"""
+        raise NotImplementedError
+
+    def clear(self, user):
+        raise NotImplementedError
+
+    def merge(self, user, nonce, lines):
+        """Merge {product_id: quantity} guest lines once per nonce, capped at stock"""
+        raise NotImplementedError
+
+
+class RelationalCartStorage(BaseCartStorage):
+    """Carts as CartItem rows joined to their products and categories"""
+
+    def get_cart(self, user):
+        # Lines, products and categories in one prefetch; totals reuse it
+        cart, created = Cart.objects.with_items().get_or_create(user=user)
+        return cart
+
+    def get_validators(self, user):
+        # Item edits, removals and price changes of carted products all change this state
+        state = Cart.objects.filter(user=user).annotate(
+            items_updated=Max('items__updated_at'),
+            products_updated=Max('items__product__updated_at'),
+            item_count=Count('items'),
+        ).values('id', 'updated_at', 'items_updated', 'products_updated', 'item_count').first()
+        if state is None:
+            return None
+        versions = get_versions(['categories'])
+        # No Last-Modified: removing the newest line would move it backwards
+        return make_etag(state, sorted(versions.items())), None
+
+    def summarize(self, user):
+        return Cart.summarize(user)
+
+    def items(self, user):
+        return CartItem.objects.filter(cart__user=user).select_related('product__category')
+
+    def list_items(self, user):
+        return self.items(user).order_by('pk')
+
+    def get_item(self, user, item_id):
+        return self.items(user).get(id=item_id)
+
+    def product_ids(self, user):
+        # Passed on as a subquery
+        return CartItem.objects.filter(cart__user=user).values('product_id')
+
+    def has_items(self, cart):
+        return cart.items.exists()
+
+    def add(self, user, product, quantity):
+        cart, created = Cart.objects.get_or_create(user=user)
+        return add_to_cart(cart, product, quantity)
+
+    def set_quantity(self, user, item, quantity):
+        if not quantity:
+            item.delete()
+            return None
+        item.quantity = quantity
+        item.save()
+        return item
+
+    def remove_item(self, user, item_id):
+        deleted, _ = CartItem.objects.filter(cart__user=user, id=item_id).delete()
+        if not deleted:
+            raise CartItem.DoesNotExist
+
+    def apply_operations(self, user, operations):
+        cart, created = Cart.objects.get_or_create(user=user)
+        return apply_cart_operations(cart, operations)
+
+    def clear(self, user):
+        CartItem.objects.filter(cart__user=user).delete()
+
+    def merge(self, user, nonce, lines):
+        return merge_guest_cart(user, nonce, lines)
+
+
+class DocumentCartStorage(BaseCartStorage):
+    """
+    Carts as a JSON line list on the Cart row.
+
+    Each line holds the product id, quantity, a snapshot of the effective
+    price when the line last changed and its timestamps; the product id
+    doubles as the item id. Reads are one query for the cart row, with
+    products rehydrated from the catalog cache, and never create rows.
+    Writes lock the row and rewrite its line list.
+    """
+
+    def __init__(self):
+        self.carts = {}
+
+    def load(self, user):
+        """The user's cart row (an unsaved empty cart if there is none)"""
+        if user.pk not in self.carts:
+            self.carts[user.pk] = Cart.objects.filter(user=user).first() or Cart(user=user)
+        return self.carts[user.pk]
+
+    def rehydrate(self, cart):
+        products = get_cached_products([line['product_id'] for line in cart.lines])
+        cart.document_items = [
+            CartItem(
+                id=line['product_id'],
+                cart=cart,
+                product=products[line['product_id']],
+                quantity=line['quantity'],
+                created_at=parse_datetime(line['created_at']),
+                updated_at=parse_datetime(line['updated_at']),
+            )
+            # Lines of deleted products are dropped, as their rows would cascade
+            for line in cart.lines if line['product_id'] in products
+        ]
+        return cart.document_items
+
+    def get_cart(self, user):
+        cart = self.load(user)
+        self.rehydrate(cart)
+        return cart
+
+    def get_validators(self, user):
+        cart = self.load(user)
+        if cart.pk is None:
+            return None
+        # Rehydrated product data changes with the catalog versions
+        versions = get_versions(['products', 'categories'])
+        # No Last-Modified: catalog changes would not move it
+        return make_etag(cart.pk, cart.updated_at, sorted(versions.items())), None
+
+    def summarize(self, user):
+        cart = self.get_cart(user)
+        amount, quantity, count = cart.totals
+        return {'total_amount': amount, 'total_items': quantity, 'total_unique_items': count}
+
+    def list_items(self, user):
+        return self.rehydrate(self.load(user))
+
+    def get_item(self, user, item_id):
+        for item in self.list_items(user):
+            if item.id == item_id:
+                return item
+        raise CartItem.DoesNotExist
+
+    def product_ids(self, user):
+        return [line['product_id'] for line in self.load(user).lines]
+
+    def has_items(self, cart):
+        return bool(cart.lines)
+
+    def lock(self, user):
+        """The user's cart row, locked for the current transaction (created if missing)"""
+        # Writing before reading takes the row lock (and SQLite's write lock) up
+        # front, so concurrent writers queue instead of deadlocking on upgrade
+        carts = Cart.objects.filter(user=user)
+        if not carts.update(updated_at=timezone.now()):
+            Cart.objects.get_or_create(user=user)
+            carts.update(updated_at=timezone.now())
+        return carts.get()
+
+    def write(self, user, change):
+        """Apply change(quantities, products) to the locked cart; returns its errors, saving if none"""
+        with transaction.atomic():
+            cart = self.lock(user)
+            quantities = {line['product_id']: line['quantity'] for line in cart.lines}
+            products = {}
+            errors = change(quantities, products)
+            if errors:
+                transaction.set_rollback(True)
+                return cart, errors
+
+            now = timezone.now().isoformat()
+            lines = {line['product_id']: line for line in cart.lines}
+            cart.lines = []
+            # Existing lines keep their order; new ones are appended
+            for product_id, quantity in quantities.items():
+                line = lines.get(product_id)
+                if not quantity:
+                    continue
+                if line is None:
+                    line = {'product_id': product_id, 'created_at': now}
+                elif line['quantity'] == quantity and product_id not in products:
+                    cart.lines.append(line)
+                    continue
+                line['quantity'] = quantity
+                line['updated_at'] = now
+                if product_id in products:
+                    line['price'] = str(products[product_id].effective_price)
+                cart.lines.append(line)
+            cart.save(update_fields=['lines', 'updated_at'])
+        self.carts[user.pk] = cart
+        return cart, []
+
+    def add(self, user, product, quantity):
+        def change(quantities, products):
+            quantities[product.pk] = quantities.get(product.pk, 0) + quantity
+            products[product.pk] = product
+
+        cart, errors = self.write(user, change)
+        line = next(line for line in cart.lines if line['product_id'] == product.pk)
+        return CartItem(
+            id=product.pk,
+            cart=cart,
+            product=product,
+            quantity=line['quantity'],
+            created_at=parse_datetime(line['created_at']),
+            updated_at=parse_datetime(line['updated_at']),
+        )
+
+    def set_quantity(self, user, item, quantity):
+        def change(quantities, products):
+            if item.product_id not in quantities:
+                raise CartItem.DoesNotExist
+            quantities[item.product_id] = quantity
+            products[item.product_id] = item.product
+
+        self.write(user, change)
+        if not quantity:
+            return None
+        item.quantity = quantity
+        item.updated_at = timezone.now()
+        return item
+
+    def remove_item(self, user, item_id):
+        def change(quantities, products):
+            if item_id not in quantities:
+                raise CartItem.DoesNotExist
+            quantities[item_id] = 0
+
+        self.write(user, change)
+
+    def apply_operations(self, user, operations):
+        found = Product.objects.in_bulk({operation['product_id'] for operation in operations})
+
+        def change(quantities, products):
+            products.update(found)
+            return fold_operations(operations, quantities, found)
+
+        cart, errors = self.write(user, change)
+        return errors
+
+    def clear(self, user):
+        Cart.objects.filter(user=user).update(lines=[], updated_at=timezone.now())
+        self.carts.pop(user.pk, None)
+
+    def merge(self, user, nonce, lines):
+        found = Product.objects.filter(
+            pk__in=list(lines), is_active=True, stock_quantity__gt=0
+        ).in_bulk()
+        if not found:
+            return 0
+
+        def change(quantities, products):
+            for product_id, product in found.items():
+                quantities[product_id] = min(
+                    quantities.get(product_id, 0) + lines[product_id], product.stock_quantity
+                )
+            products.update(found)
+
+        with transaction.atomic():
+            if not claim_guest_cart(user, nonce):
+                return 0
+            self.write(user, change)
+        return len(found)
+
+
+CART_STORAGES = {
+    'relational': RelationalCartStorage,
+    'document': DocumentCartStorage,
+}
+
+
+def get_cart_storage():
+    """Return a cart storage for the configured CART_STORAGE mode"""
+    return CART_STORAGES[settings.CART_STORAGE]()
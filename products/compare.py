@@ -0,0 +1,93 @@
+# products/compare.py
+import hashlib
+from decimal import Decimal
+from django.conf import settings
+from .cache import get_catalog_cache, get_versions
+from .models import Product
+
+COMPARISON_KEY = 'catalog:compare:{digest}'
+MAX_COMPARE_PRODUCTS = 10
+
+# Matrix rows: (response field, values() lookup)
+COMPARE_FIELDS = (
+    ('price', 'price'),
+    ('effective_price', 'effective_price'),
+    ('discount_percentage', 'discount_percentage'),
+    ('stock_quantity', 'stock_quantity'),
+    ('weight', 'weight'),
+    ('dimensions', 'dimensions'),
+    ('category', 'category__name'),
+)
+# Fields that get min/max highlights
+NUMERIC_FIELDS = ('price', 'effective_price', 'discount_percentage', 'stock_quantity', 'weight')
+
+
+def compute_highlights(rows):
+    """IDs holding the min and max value of each numeric field (ties included)"""
+    highlights = {}
+    for field in NUMERIC_FIELDS:
+        values = [row[field] for row in rows if row[field] is not None]
+        if not values:
+            continue
+        low, high = min(values), max(values)
+        highlights[field] = {
+            'min': [row['id'] for row in rows if row[field] == low],
+            'max': [row['id'] for row in rows if row[field] == high],
+        }
+    return highlights
+
+
+def compute_comparison(product_ids):
+    """Comparison rows (by product ID) and highlights from a single query"""
+    lookups = {lookup: field for field, lookup in COMPARE_FIELDS}
+    queryset = Product.objects.filter(pk__in=product_ids, is_active=True).values(
+        'id', 'name', 'sku', *lookups
+    )
+    rows = [
+        {lookups.get(key, key): value for key, value in row.items()}
+        for row in queryset
+    ]
+    highlights = compute_highlights(rows)
+    # Render money and weights like the product serializers do
+    for row in rows:
+        for field, value in row.items():
+            if isinstance(value, Decimal):
+                row[field] = str(value)
+    return {
+        'rows': {row['id']: row for row in rows},
+        'highlights': highlights,
+    }
+
+
+def get_comparison(product_ids):
+    """Cached comparison for a set of product IDs (order does not matter)"""
+    cache = get_catalog_cache()
+    versions = get_versions(['products', 'categories'])
+    ids = sorted(set(product_ids))
+    digest = hashlib.md5(repr((ids, sorted(versions.items()))).encode('utf-8')).hexdigest()
+    key = COMPARISON_KEY.format(digest=digest)
+
+    comparison = cache.get(key)
+    if comparison is None:
+        comparison = compute_comparison(ids)
+        cache.set(key, comparison, settings.CATALOG_CACHE_TIMEOUT)
+    return comparison
+
+
+def build_matrix(product_ids):
+    """Comparison matrix with columns in the requested product order"""
+    comparison = get_comparison(product_ids)
+    rows = comparison['rows']
+    found = [pk for pk in product_ids if pk in rows]
+    return {
+        'products': [
+            {'id': pk, 'name': rows[pk]['name'], 'sku': rows[pk]['sku']}
+            for pk in found
+        ],
+        'matrix': {
+            field: [rows[pk][field] for pk in found]
+            for field, _ in COMPARE_FIELDS
+        },
+        'highlights': comparison['highlights'],
+        'missing': [pk for pk in product_ids if pk not in rows],
+    }
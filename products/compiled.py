@@ -0,0 +1,145 @@
+# products/compiled.py
+import decimal
+from functools import lru_cache
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .serializers import ProductListSerializer
+
+
+def decimal_renderer(max_digits, decimal_places):
+    """Render Decimals exactly like serializers.DecimalField (coerced to string)"""
+    exponent = decimal.Decimal('.1') ** decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = max_digits
+
+    def render(value):
+        if value is None:
+            return None
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(exponent, context=context))
+    return render
+
+
+def datetime_renderer(tzinfo):
+    """Render datetimes exactly like serializers.DateTimeField in the given timezone"""
+    field = serializers.DateTimeField(default_timezone=tzinfo)
+    if tzinfo is None or api_settings.DATETIME_FORMAT.lower() != ISO_8601:
+        return field.to_representation
+
+    def render(value):
+        if not value:
+            return None
+        if not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(tzinfo).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return render
+
+
+# ProductListSerializer field -> (values_list column, expression template over {v})
+PRODUCT_LIST_FIELDS = {
+    'id': ('id', '{v}'),
+    'name': ('name', '{v}'),
+    'category': ('category_id', '{v}'),
+    'category_name': ('category__name', '{v}'),
+    'price': ('price', 'money({v})'),
+    'discount_price': ('discount_price', 'money({v})'),
+    'effective_price': ('effective_price', 'money({v})'),
+    'price_formatted': ('price', '"GHS " + format({v}, ",.2f")'),
+    'effective_price_formatted': ('effective_price', '"GHS " + format({v}, ",.2f")'),
+    'discount_percentage': ('discount_percentage', 'percent({v})'),
+    'stock_quantity': ('stock_quantity', '{v}'),
+    'sku': ('sku', '{v}'),
+    'is_active': ('is_active', 'bool({v})'),
+    'is_featured': ('is_featured', 'bool({v})'),
+    'is_in_stock': ('stock_quantity', '{v} > 0'),
+    'created_at': ('created_at', 'datetime({v}) if {v} else None'),
+}
+
+
+@lru_cache(maxsize=64)
+def compile_product_list_renderer(field_names, extra_columns=(), tzinfo=None):
+    """
+    Compile a row -> dict function for the given ProductListSerializer fields.
+
+    Returns (columns, render): `columns` is the values_list() column order
+    (field columns first, then extra_columns, e.g. ordering fields needed by
+    keyset pagination) and `render` builds the same dict the serializer would,
+    rendering datetimes in `tzinfo` (the active timezone when USE_TZ is on).
+    """
+    columns = []
+    for column in [PRODUCT_LIST_FIELDS[name][0] for name in field_names] + list(extra_columns):
+        if column not in columns:
+            columns.append(column)
+
+    items = [
+        f"{name!r}: " + PRODUCT_LIST_FIELDS[name][1].format(
+            v=f"row[{columns.index(PRODUCT_LIST_FIELDS[name][0])}]"
+        )
+        for name in field_names
+    ]
+    source = 'def render(row):\n    return {' + ', '.join(items) + '}\n'
+    namespace = {
+        'money': decimal_renderer(10, 2),
+        'percent': decimal_renderer(5, 2),
+        'datetime': datetime_renderer(tzinfo),
+    }
+    exec(compile(source, '<compiled product list renderer>', 'exec'), namespace)
+    return tuple(columns), namespace['render']
+
+
+class CompiledListMixin:
+    """
+    Serve ProductListSerializer list views without per-row serializer work.
+
+    Rows are fetched with values_list() and mapped through a compiled
+    renderer producing byte-identical JSON. Falls back to the regular
+    serializer when disabled (PRODUCT_COMPILED_SERIALIZATION) or when the
+    view uses another serializer.
+    """
+
+    def use_compiled_serialization(self):
+        return (
+            settings.PRODUCT_COMPILED_SERIALIZATION and
+            self.get_serializer_class() is ProductListSerializer
+        )
+
+    def get_compiled_field_names(self):
+        field_names = ProductListSerializer.Meta.fields
+        get_fieldset = getattr(self, 'get_sparse_fieldset', None)
+        fieldset = get_fieldset() if get_fieldset else None
+        if fieldset is not None:
+            fields, omit = fieldset
+            field_names = [
+                name for name in field_names
+                if (not fields or name in fields) and name not in omit
+            ]
+        return tuple(field_names)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_compiled_serialization():
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        # Ordering values are read back from the rows by keyset pagination
+        ordering = tuple(
+            field.lstrip('-') for field in
+            (queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(field, str)
+        )
+        columns, render = compile_product_list_renderer(
+            self.get_compiled_field_names(), ordering + ('id',),
+            timezone.get_current_timezone() if settings.USE_TZ else None
+        )
+        rows = queryset.values_list(*columns, named=True)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([render(row) for row in page])
+        return Response([render(row) for row in rows])
@@ -0,0 +1,187 @@
+# products/copurchase.py
+from collections import defaultdict
+from datetime import timedelta
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import CoPurchaseRun, ProductCoPurchase
+
+# Orders paid more recently than this may still be committing; the next run
+# picks them up
+SETTLE_DELAY = timedelta(seconds=60)
+ORDER_CHUNK_SIZE = 5000
+PRODUCT_CHUNK_SIZE = 500
+
+
+def count_pairs(order_indexes, product_ids):
+    """
+    Co-occurrence counts from parallel (order, product) arrays.
+
+    Returns (left, right, counts) arrays with left < right, where counts is
+    the number of distinct orders containing both products. Every order's
+    rows are crossed with each other in one vectorized pass.
+    """
+    if not len(product_ids):
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    # Sorted by order then product, with repeated lines of an order dropped
+    rows = np.unique(np.column_stack([order_indexes, product_ids]).astype(np.int64), axis=0)
+    orders, products = rows[:, 0], rows[:, 1]
+    _, starts, sizes = np.unique(orders, return_index=True, return_counts=True)
+
+    # Row i of an order of size s is paired with the s rows of its order
+    row_sizes = np.repeat(sizes, sizes)
+    row_starts = np.repeat(starts, sizes)
+    left = np.repeat(np.arange(len(products)), row_sizes)
+    block_starts = np.repeat(np.cumsum(row_sizes) - row_sizes, row_sizes)
+    right = np.repeat(row_starts, row_sizes) + np.arange(left.size) - block_starts
+
+    keep = products[left] < products[right]
+    width = int(products.max()) + 1
+    codes, counts = np.unique(products[left][keep] * width + products[right][keep], return_counts=True)
+    return codes // width, codes % width, counts
+
+
+def paid_orders(since=None, until=None):
+    """Orders in a paid status that first reached one in (since, until]"""
+    Order = apps.get_model('payments', 'Order')
+    orders = Order.objects.filter(status__in=Order.PAID_STATUSES, paid_at__lte=until)
+    if since is not None:
+        orders = orders.filter(paid_at__gt=since)
+    return orders
+
+
+def collect_pairs(orders):
+    """Sum pair counts over a queryset of orders, ORDER_CHUNK_SIZE orders at a time"""
+    OrderItem = apps.get_model('payments', 'OrderItem')
+    order_ids = list(orders.values_list('pk', flat=True))
+
+    all_codes = []
+    all_counts = []
+    width = None
+    for start in range(0, len(order_ids), ORDER_CHUNK_SIZE):
+        chunk = order_ids[start:start + ORDER_CHUNK_SIZE]
+        rows = OrderItem.objects.filter(order_id__in=chunk).values_list('order_id', 'product_id')
+        order_index = {}
+        order_indexes = []
+        product_ids = []
+        for order_id, product_id in rows:
+            order_indexes.append(order_index.setdefault(order_id, len(order_index)))
+            product_ids.append(product_id)
+
+        left, right, counts = count_pairs(order_indexes, product_ids)
+        if counts.size:
+            all_codes.append((left, right))
+            all_counts.append(counts)
+            width = max(width or 0, int(right.max()) + 1)
+
+    if not all_counts:
+        return {}, len(order_ids)
+
+    # Merge the chunks: equal pairs share a code, their counts are summed
+    codes = np.concatenate([left * width + right for left, right in all_codes])
+    unique, inverse = np.unique(codes, return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate(all_counts)).astype(np.int64)
+    pairs = {
+        (int(code // width), int(code % width)): int(total)
+        for code, total in zip(unique.tolist(), totals.tolist())
+    }
+    return pairs, len(order_ids)
+
+
+def apply_pairs(pairs, top_k):
+    """Add pair counts to the stored matrix and re-rank the products they touch"""
+    deltas = defaultdict(dict)
+    for (left, right), count in pairs.items():
+        deltas[left][right] = count
+        deltas[right][left] = count
+
+    product_ids = sorted(deltas)
+    for start in range(0, len(product_ids), PRODUCT_CHUNK_SIZE):
+        chunk = product_ids[start:start + PRODUCT_CHUNK_SIZE]
+        stored = defaultdict(dict)
+        for product_id, related_id, orders, rank in ProductCoPurchase.objects.filter(
+            product_id__in=chunk
+        ).values_list('product_id', 'related_id', 'orders', 'rank'):
+            stored[product_id][related_id] = (orders, rank)
+
+        changed = []
+        for product_id in chunk:
+            current = stored[product_id]
+            totals = {related_id: orders for related_id, (orders, _) in current.items()}
+            for related_id, count in deltas[product_id].items():
+                totals[related_id] = totals.get(related_id, 0) + count
+
+            ranked = sorted(totals, key=lambda related_id: (-totals[related_id], related_id))
+            ranks = {related_id: index for index, related_id in enumerate(ranked[:top_k], start=1)}
+            for related_id, orders in totals.items():
+                rank = ranks.get(related_id)
+                if current.get(related_id) != (orders, rank):
+                    changed.append(ProductCoPurchase(
+                        product_id=product_id, related_id=related_id, orders=orders, rank=rank
+                    ))
+
+        ProductCoPurchase.objects.bulk_create(
+            changed,
+            batch_size=PRODUCT_CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=['product', 'related'],
+            update_fields=['orders', 'rank'],
+        )
+
+
+def update_copurchases(full=False, top_k=None):
+    """
+    Fold newly paid orders into the co-purchase matrix (everything if full).
+
+    Incremental runs only read orders that reached a paid status since the
+    previous run's watermark, so they add up to what a full rebuild counts.
+    Later refunds and cancellations are not subtracted; a full rebuild
+    recounts from scratch. Returns the CoPurchaseRun record.
+    """
+    top_k = top_k or settings.PRODUCT_COPURCHASE_TOP_K
+    until = timezone.now() - SETTLE_DELAY
+    since = None
+    if not full:
+        last_run = CoPurchaseRun.objects.order_by('-processed_until').first()
+        if last_run is None:
+            full = True
+        else:
+            since = last_run.processed_until
+
+    with transaction.atomic():
+        if full:
+            ProductCoPurchase.objects.all().delete()
+        pairs, order_count = collect_pairs(paid_orders(since, until))
+        apply_pairs(pairs, top_k)
+        return CoPurchaseRun.objects.create(
+            processed_until=until, orders=order_count, pairs=len(pairs), full_rebuild=full
+        )
+
+
+def bought_together(product_ids, limit=10):
+    """
+    Products most often bought with the given products, best first.
+
+    product_ids may be a list or a values_list() queryset (e.g. a cart's
+    items), so a cart is answered in one query. Scores sum the co-purchase
+    counts of every given product's top-K neighbours. Returns
+    (product, orders) pairs.
+    """
+    rows = ProductCoPurchase.objects.filter(
+        product_id__in=product_ids,
+        rank__isnull=False,
+        related__is_active=True,
+    ).exclude(related_id__in=product_ids).select_related('related__category')
+
+    scores = defaultdict(int)
+    products = {}
+    for row in rows:
+        scores[row.related_id] += row.orders
+        products[row.related_id] = row.related
+
+    ranked = sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
+    return [(products[pk], scores[pk]) for pk in ranked]
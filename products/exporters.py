@@ -0,0 +1,120 @@
+# products/exporters.py
+import csv
+import json
+import zlib
+from .models import Product
+
+# (column, values_list() lookup); the columns read back through ProductImporter
+EXPORT_COLUMNS = (
+    ('sku', 'sku'),
+    ('name', 'name'),
+    ('description', 'description'),
+    ('category_name', 'category__name'),
+    ('price', 'price'),
+    ('discount_price', 'discount_price'),
+    ('effective_price', 'effective_price'),
+    ('discount_percentage', 'discount_percentage'),
+    ('stock_quantity', 'stock_quantity'),
+    ('weight', 'weight'),
+    ('dimensions', 'dimensions'),
+    ('is_active', 'is_active'),
+    ('is_featured', 'is_featured'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class LineBuffer:
+    """File-like object whose write() hands the written text back (for csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def to_text(value):
+    """Decimals and datetimes as strings, None as blank"""
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def to_json(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    return to_text(value)
+
+
+class ProductExporter:
+    """
+    Stream the catalog as CSV or NDJSON without materializing it.
+
+    Rows are read as tuples through values_list().iterator(chunk_size), so
+    memory stays flat whatever the catalog size; output is yielded in blocks
+    of `chunk_size` rows, optionally gzip-compressed on the fly.
+    """
+    chunk_size = 2000
+
+    def __init__(self, file_format='csv', compress=False, chunk_size=None, queryset=None):
+        self.file_format = file_format
+        self.compress = compress
+        self.chunk_size = chunk_size or self.chunk_size
+        self.queryset = queryset if queryset is not None else Product.objects.all()
+        self.columns = [column for column, _ in EXPORT_COLUMNS]
+
+    @property
+    def content_type(self):
+        return 'application/gzip' if self.compress else EXPORT_FORMATS[self.file_format]
+
+    @property
+    def extension(self):
+        return f"{self.file_format}.gz" if self.compress else self.file_format
+
+    def rows(self):
+        return self.queryset.order_by('pk').values_list(
+            *[lookup for _, lookup in EXPORT_COLUMNS]
+        ).iterator(chunk_size=self.chunk_size)
+
+    def iter_csv(self):
+        writer = csv.writer(LineBuffer())
+        yield writer.writerow(self.columns)
+        for row in self.rows():
+            yield writer.writerow([to_text(value) for value in row])
+
+    def iter_ndjson(self):
+        columns = self.columns
+        for row in self.rows():
+            yield json.dumps(
+                {column: to_json(value) for column, value in zip(columns, row)},
+                ensure_ascii=False
+            ) + '\n'
+
+    def iter_blocks(self):
+        """Encoded output in blocks of chunk_size lines"""
+        lines = self.iter_csv() if self.file_format == 'csv' else self.iter_ndjson()
+        block = []
+        for line in lines:
+            block.append(line)
+            if len(block) >= self.chunk_size:
+                yield ''.join(block).encode('utf-8')
+                block = []
+        if block:
+            yield ''.join(block).encode('utf-8')
+
+    def __iter__(self):
+        if not self.compress:
+            yield from self.iter_blocks()
+            return
+
+        # wbits=31: gzip container
+        compressor = zlib.compressobj(wbits=31)
+        for block in self.iter_blocks():
+            data = compressor.compress(block)
+            if data:
+                yield data
+        yield compressor.flush()
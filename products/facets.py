@@ -0,0 +1,91 @@
+# products/facets.py
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import BooleanField, Case, Count, IntegerField, Value, When
+from rest_framework import serializers
+
+FACET_NAMES = ('category', 'price', 'featured', 'in_stock')
+
+
+def parse_facets(value):
+    """Parse the `facets` query parameter into a tuple of facet names"""
+    if not value:
+        return ()
+    if value.lower() in ('all', 'true', '1'):
+        return FACET_NAMES
+
+    names = tuple(name.strip() for name in value.split(',') if name.strip())
+    unknown = [name for name in names if name not in FACET_NAMES]
+    if unknown:
+        raise serializers.ValidationError({
+            'facets': f"Unknown facets: {', '.join(unknown)}. "
+                      f"Choose from: {', '.join(FACET_NAMES)}"
+        })
+    return names
+
+
+def get_price_bounds():
+    """Return the sorted lower bounds of the price facet buckets"""
+    return sorted(Decimal(str(bound)) for bound in settings.PRODUCT_PRICE_FACET_BUCKETS)
+
+
+def compute_facets(queryset, names=FACET_NAMES):
+    """
+    Count products per category, price bucket, featured flag and stock state.
+
+    All facets come from a single GROUP BY over the filtered queryset; the
+    grouped rows are then folded into the individual facet counts.
+    """
+    bounds = get_price_bounds()
+    price_bucket = Case(
+        *[When(effective_price__lt=upper, then=Value(index)) for index, upper in enumerate(bounds[1:])],
+        default=Value(len(bounds) - 1),
+        output_field=IntegerField(),
+    )
+    in_stock = Case(
+        When(stock_quantity__gt=0, then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    )
+
+    rows = queryset.order_by().annotate(
+        price_bucket=price_bucket,
+        in_stock=in_stock,
+    ).values(
+        'category_id', 'category__name', 'price_bucket', 'is_featured', 'in_stock'
+    ).annotate(count=Count('pk'))
+
+    categories = {}
+    buckets = [0] * len(bounds)
+    featured = {'true': 0, 'false': 0}
+    stock = {'true': 0, 'false': 0}
+
+    for row in rows:
+        count = row['count']
+        category = categories.setdefault(row['category_id'], {
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'count': 0,
+        })
+        category['count'] += count
+        buckets[row['price_bucket']] += count
+        featured['true' if row['is_featured'] else 'false'] += count
+        stock['true' if row['in_stock'] else 'false'] += count
+
+    facets = {}
+    if 'category' in names:
+        facets['category'] = sorted(categories.values(), key=lambda c: (-c['count'], c['name']))
+    if 'price' in names:
+        facets['price'] = [
+            {
+                'min': f"{lower:.2f}",
+                'max': f"{bounds[index + 1]:.2f}" if index + 1 < len(bounds) else None,
+                'count': buckets[index],
+            }
+            for index, lower in enumerate(bounds)
+        ]
+    if 'featured' in names:
+        facets['featured'] = featured
+    if 'in_stock' in names:
+        facets['in_stock'] = stock
+    return facets
@@ -0,0 +1,35 @@
+# products/filters.py
+import django_filters
+from rest_framework import filters
+from .models import Product
+from .search import get_search_backend
+
+
+class ProductFilter(django_filters.FilterSet):
+    """Product list filters; price ranges apply to what the customer pays"""
+    min_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'is_featured', 'min_price', 'max_price']
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """SearchFilter backed by the product full-text search index"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return get_search_backend().search(queryset, ' '.join(terms))
+
+
+class RelevanceOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter that keeps relevance order for searches without explicit ordering"""
+
+    def get_ordering(self, request, queryset, view):
+        searching = request.query_params.get(filters.SearchFilter.search_param, '').strip()
+        if searching and not request.query_params.get(self.ordering_param):
+            return None
+        return super().get_ordering(request, queryset, view)
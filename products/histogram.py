@@ -0,0 +1,87 @@
+# products/histogram.py
+import hashlib
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from .cache import get_catalog_cache, get_versions
+from .models import Product
+from .suggest import search_with_fallback
+
+HISTOGRAM_KEY = 'catalog:price-histogram:{digest}'
+DEFAULT_BINS = 20
+MAX_BINS = 100
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def to_money(value):
+    return f"{value:.2f}"
+
+
+def filter_products(filters):
+    """Active products matching a histogram filter signature"""
+    queryset = Product.objects.filter(is_active=True)
+    if 'category' in filters:
+        queryset = queryset.filter(category_id=filters['category'])
+    if filters.get('is_featured'):
+        queryset = queryset.filter(is_featured=True)
+    if filters.get('in_stock_only'):
+        queryset = queryset.filter(stock_quantity__gt=0)
+    if filters.get('search'):
+        queryset, _ = search_with_fallback(queryset, filters['search'])
+    return queryset
+
+
+def compute_price_histogram(queryset, bins=DEFAULT_BINS):
+    """
+    Bin counts and percentiles of effective_price over a Product queryset.
+
+    Prices are read as floats in one query straight into a NumPy array
+    (no Decimal or model instances); bins split [min, max] evenly, with
+    edges rounded to cents.
+    """
+    prices = np.fromiter(
+        queryset.order_by().annotate(
+            price_value=Cast('effective_price', FloatField())
+        ).values_list('price_value', flat=True),
+        dtype=np.float64,
+    )
+    if not prices.size:
+        return {'count': 0, 'min': None, 'max': None, 'mean': None, 'percentiles': {}, 'bins': []}
+
+    low, high = prices.min(), prices.max()
+    if low == high:
+        edges = np.array([low, high])
+    else:
+        edges = np.round(np.linspace(low, high, bins + 1), 2)
+    counts, _ = np.histogram(prices, bins=edges)
+
+    return {
+        'count': int(prices.size),
+        'min': to_money(low),
+        'max': to_money(high),
+        'mean': to_money(prices.mean()),
+        'percentiles': {
+            f"p{percentile}": to_money(value)
+            for percentile, value in zip(PERCENTILES, np.percentile(prices, PERCENTILES))
+        },
+        'bins': [
+            {'min': to_money(edges[index]), 'max': to_money(edges[index + 1]), 'count': int(count)}
+            for index, count in enumerate(counts)
+        ],
+    }
+
+
+def get_price_histogram(filters, bins=DEFAULT_BINS):
+    """Cached histogram per filter signature and bin count"""
+    cache = get_catalog_cache()
+    versions = get_versions(['products', 'categories'])
+    signature = (sorted(filters.items()), bins, sorted(versions.items()))
+    digest = hashlib.md5(repr(signature).encode('utf-8')).hexdigest()
+    key = HISTOGRAM_KEY.format(digest=digest)
+
+    histogram = cache.get(key)
+    if histogram is None:
+        histogram = compute_price_histogram(filter_products(filters), bins)
+        cache.set(key, histogram, settings.CATALOG_CACHE_TIMEOUT)
+    return histogram
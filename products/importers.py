@@ -0,0 +1,375 @@
+# products/importers.py
+import csv
+import json
+import logging
+from django.db import connection, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from .models import PRICING_FIELDS, Category, Product
+from .serializers import ProductImportRowSerializer
+from .signals import products_bulk_changed
+
+logger = logging.getLogger(__name__)
+
+# Blank CSV cells for these fields mean "no value" rather than "not provided"
+NULLABLE_FIELDS = ('discount_price', 'weight')
+PRODUCT_FIELDS = (
+    'name', 'description', 'price', 'discount_price', 'stock_quantity',
+    'weight', 'dimensions', 'is_active', 'is_featured',
+)
+
+
+def iter_csv_rows(lines):
+    """Yield (line_number, row) pairs from an iterable of CSV text lines"""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        cleaned = {}
+        for field, value in row.items():
+            if field is None:
+                continue
+            value = value.strip() if isinstance(value, str) else value
+            if value == '' or value is None:
+                if field in NULLABLE_FIELDS:
+                    cleaned[field] = None
+                continue
+            cleaned[field.strip()] = value
+        yield reader.line_num, cleaned
+
+
+def iter_ndjson_rows(lines):
+    """Yield (line_number, row) pairs from an iterable of NDJSON text lines"""
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError('Expected a JSON object')
+
+
+ROW_READERS = {
+    'csv': iter_csv_rows,
+    'ndjson': iter_ndjson_rows,
+}
+
+
+# Databases supporting UPDATE ... FROM with a VALUES list
+UPDATE_FROM_VENDORS = ('sqlite', 'postgresql')
+
+
+def detect_format(filename):
+    """Guess the import format from a file name (defaults to CSV)"""
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+class ProductImporter:
+    """
+    Streaming bulk product upsert.
+
+    Rows are consumed in batches: each batch is validated without per-row
+    queries (categories are preloaded once, SKUs once per batch), then written
+    with bulk_create/bulk_update inside its own transaction. Derived data
+    (search index, counters, caches) is refreshed once at the end through
+    products_bulk_changed.
+    """
+    batch_size = 500
+
+    def __init__(self, update_existing=True, batch_size=None):
+        self.update_existing = update_existing
+        self.batch_size = batch_size or self.batch_size
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.decode_failed = False
+        self.seen_skus = set()
+        self.product_ids = set()
+        self.category_ids = set()
+        self.categories_by_id = {}
+        self.categories_by_name = {}
+
+    def load_categories(self):
+        for pk, name in Category.objects.values_list('pk', 'name'):
+            self.categories_by_id[pk] = pk
+            self.categories_by_name[name.lower()] = pk
+
+    def run(self, rows):
+        """Import (line_number, row) pairs and return the report"""
+        self.load_categories()
+
+        batch = []
+        last_line = 0
+        try:
+            for line_number, row in rows:
+                last_line = line_number
+                batch.append((line_number, row))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+        except UnicodeDecodeError:
+            # Text is decoded lazily, so earlier batches are already committed;
+            # keep what was read and report where the file stopped being readable
+            self.decode_failed = True
+        if batch:
+            self.import_batch(batch)
+        if self.decode_failed:
+            self.add_error(None, None, {'file': [
+                f"File is not valid UTF-8 after line {last_line}; the rest was skipped "
+                f"({self.created} created and {self.updated} updated before that were committed)"
+            ]})
+
+        if self.product_ids:
+            products_bulk_changed.send(
+                sender=self.__class__,
+                product_ids=sorted(self.product_ids),
+                category_ids=sorted(self.category_ids),
+            )
+        return self.report()
+
+    def report(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': len(self.errors),
+            'errors': self.errors,
+        }
+
+    def add_error(self, line_number, sku, errors):
+        self.errors.append({'row': line_number, 'sku': sku, 'errors': errors})
+
+    def resolve_category(self, attrs):
+        if 'category' in attrs:
+            return self.categories_by_id.get(attrs['category'])
+        if 'category_name' in attrs:
+            return self.categories_by_name.get(attrs['category_name'].strip().lower())
+        return None
+
+    def import_batch(self, batch):
+        # One query for every existing SKU referenced by this batch
+        skus = {
+            str(row.get('sku', '')).strip().upper()
+            for _, row in batch if isinstance(row, dict)
+        }
+        existing = {
+            product.sku: product
+            for product in Product.objects.filter(sku__in=skus)
+        }
+
+        to_create = []
+        to_update = []
+        update_fields = set()
+
+        for line_number, row in batch:
+            if not isinstance(row, dict):
+                self.add_error(line_number, None, {'row': [str(row)]})
+                continue
+
+            sku = str(row.get('sku', '')).strip().upper()
+            product = existing.get(sku)
+            if product is not None and not self.update_existing:
+                self.add_error(line_number, sku, {'sku': ['Product with this SKU already exists']})
+                continue
+
+            serializer = ProductImportRowSerializer(data=row, partial=product is not None)
+            if not serializer.is_valid():
+                self.add_error(line_number, sku or None, serializer.errors)
+                continue
+            attrs = serializer.validated_data
+
+            if sku in self.seen_skus:
+                self.add_error(line_number, sku, {'sku': ['Duplicate SKU in import']})
+                continue
+
+            category_id = product.category_id if product is not None else None
+            if 'category' in attrs or 'category_name' in attrs:
+                category_id = self.resolve_category(attrs)
+                if category_id is None:
+                    self.add_error(line_number, sku, {'category': ['Category not found']})
+                    continue
+
+            price = attrs.get('price', product.price if product else None)
+            discount_price = attrs.get(
+                'discount_price', product.discount_price if product else None
+            )
+            if discount_price and price and discount_price >= price:
+                self.add_error(line_number, sku, {
+                    'discount_price': ['Discount price must be less than regular price']
+                })
+                continue
+
+            self.seen_skus.add(sku)
+            if product is None:
+                product = Product(sku=sku, category_id=category_id)
+                to_create.append(product)
+            else:
+                self.category_ids.add(product.category_id)
+                product.category_id = category_id
+                product.updated_at = timezone.now()
+                update_fields.update(field for field in PRODUCT_FIELDS if field in attrs)
+                update_fields.add('category')
+                to_update.append(product)
+
+            for field in PRODUCT_FIELDS:
+                if field in attrs:
+                    setattr(product, field, attrs[field])
+            # bulk_create/bulk_update skip save(), so derive pricing here
+            product.compute_pricing()
+            self.category_ids.add(category_id)
+
+        if not to_create and not to_update:
+            return
+
+        with transaction.atomic():
+            if to_create:
+                Product.objects.bulk_create(to_create, batch_size=self.batch_size)
+            if to_update:
+                fields = sorted(update_fields | {'effective_price', 'discount_percentage', 'updated_at'})
+                Product.objects.bulk_update(to_update, fields, batch_size=self.batch_size)
+
+        if to_create and to_create[0].pk is None:
+            # Backends without RETURNING: look the new rows up by SKU
+            created_ids = Product.objects.filter(
+                sku__in=[product.sku for product in to_create]
+            ).values_list('pk', flat=True)
+            self.product_ids.update(created_ids)
+        else:
+            self.product_ids.update(product.pk for product in to_create)
+        self.product_ids.update(product.pk for product in to_update)
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
+        logger.info(f"Imported batch: {len(to_create)} created, {len(to_update)} updated")
+
+
+class PriceStockUpdater:
+    """
+    Apply price/stock updates keyed by SKU with set-based UPDATEs.
+
+    Current prices are read (and locked) once per chunk, the merged rows are
+    checked and their pricing columns derived in Python, then each chunk is
+    written with a single UPDATE joined against a VALUES list (CASE
+    expressions on other databases). Everything runs in one transaction and
+    derived catalog data is refreshed once through products_bulk_changed.
+    """
+    chunk_size = 500
+    fields = ('price', 'discount_price', 'stock_quantity')
+    columns = fields + PRICING_FIELDS
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or self.chunk_size
+        self.updated = 0
+        self.unknown_skus = []
+        self.errors = []
+        self.product_ids = []
+        self.category_ids = set()
+
+    def run(self, items):
+        """Apply validated items (dicts with a sku and the fields to change) and return the report"""
+        # Later rows for the same SKU override earlier ones
+        changes = {}
+        for item in items:
+            changes.setdefault(item['sku'], {}).update(
+                (field, value) for field, value in item.items() if field != 'sku'
+            )
+
+        skus = list(changes)
+        with transaction.atomic():
+            for start in range(0, len(skus), self.chunk_size):
+                chunk = skus[start:start + self.chunk_size]
+                self.update_chunk({sku: changes[sku] for sku in chunk})
+
+            if self.product_ids:
+                # Activity and categories are untouched, so the search index is too
+                products_bulk_changed.send(
+                    sender=self.__class__,
+                    product_ids=self.product_ids,
+                    category_ids=sorted(self.category_ids),
+                    reindex_search=False,
+                )
+        return self.report()
+
+    def report(self):
+        return {
+            'updated': self.updated,
+            'unknown_skus': self.unknown_skus,
+            'failed': len(self.errors),
+            'errors': self.errors,
+        }
+
+    def update_chunk(self, changes):
+        # Locked (in pk order) until run() commits, so a concurrent save cannot
+        # change the prices the pricing columns are derived from
+        current = {
+            row['sku']: row
+            for row in Product.objects.select_for_update().filter(
+                sku__in=list(changes)
+            ).order_by('pk').values('pk', 'sku', 'category_id', *self.fields)
+        }
+
+        rows = []
+        for sku, attrs in changes.items():
+            row = current.get(sku)
+            if row is None:
+                self.unknown_skus.append(sku)
+                continue
+
+            product = Product(**{field: attrs.get(field, row[field]) for field in self.fields})
+            if product.discount_price and product.discount_price >= product.price:
+                self.errors.append({
+                    'sku': sku,
+                    'errors': {'discount_price': ['Discount price must be less than regular price']},
+                })
+                continue
+            product.compute_pricing()
+            product.pk = row['pk']
+            rows.append(product)
+            self.category_ids.add(row['category_id'])
+
+        if not rows:
+            return
+
+        if connection.vendor in UPDATE_FROM_VENDORS:
+            self.update_from_values(rows)
+        else:
+            Product.objects.filter(pk__in=[product.pk for product in rows]).update(
+                updated_at=timezone.now(),
+                **{
+                    field: Case(
+                        *[When(pk=product.pk, then=Value(getattr(product, field))) for product in rows],
+                        output_field=Product._meta.get_field(field),
+                    )
+                    for field in self.columns
+                }
+            )
+        self.product_ids.extend(product.pk for product in rows)
+        self.updated += len(rows)
+
+    def update_from_values(self, rows):
+        """UPDATE ... FROM (VALUES ...): one statement, no per-row expression building"""
+        quote = connection.ops.quote_name
+        meta = Product._meta
+        table = quote(meta.db_table)
+        assignments = ', '.join(
+            f"{quote(meta.get_field(field).column)} = CAST(v.column{index} AS {self.sql_type(field)})"
+            for index, field in enumerate(self.columns, start=2)
+        )
+        placeholders = ', '.join(['(%s' + ', %s' * len(self.columns) + ')'] * len(rows))
+        params = [connection.ops.adapt_datetimefield_value(timezone.now())]
+        for product in rows:
+            params.append(product.pk)
+            params.extend(getattr(product, field) for field in self.columns)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET {quote(meta.get_field('updated_at').column)} = %s, {assignments} "
+                f"FROM (VALUES {placeholders}) AS v "
+                f"WHERE {table}.{quote(meta.pk.column)} = v.column1",
+                params
+            )
+
+    def sql_type(self, field):
+        return 'INTEGER' if field == 'stock_quantity' else 'NUMERIC'
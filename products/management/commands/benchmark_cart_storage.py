@@ -0,0 +1,91 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from products.carts import CART_STORAGES
+from products.models import Product
+from products.serializers import CartSerializer
+
+User = get_user_model()
+
+
+def strip_identity(data):
+    """Drop ids and timestamps, which legitimately differ between storages"""
+    if isinstance(data, dict):
+        return {
+            key: strip_identity(value) for key, value in data.items()
+            if key not in ('id', 'created_at', 'updated_at')
+        }
+    if isinstance(data, list):
+        return [strip_identity(value) for value in data]
+    return data
+
+
+class Command(BaseCommand):
+    help = 'Compare cart reads and writes of the relational and document cart storages (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=20, help='Products in the benchmark cart')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed runs per operation (best is reported)')
+
+    def measure(self, repeat, func):
+        """(best seconds, queries of one run, output of the last run)"""
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                output = func()
+                timings.append(time.perf_counter() - start)
+        return min(timings), len(queries), output
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.filter(is_active=True, stock_quantity__gt=0).order_by('pk')[:options['lines']])
+        if not products:
+            raise CommandError('No products in stock to put in a cart')
+        renderer = JSONRenderer()
+        repeat = options['repeat']
+
+        results = {}
+        outputs = {}
+        with transaction.atomic():
+            for mode, storage_class in CART_STORAGES.items():
+                user = User.objects.create_user(
+                    email=f'cart-benchmark-{mode}@example.com',
+                    username=f'cart-benchmark-{mode}',
+                    password=None,
+                )
+                storage_class().apply_operations(user, [
+                    {'op': 'set', 'product_id': product.pk, 'quantity': 1} for product in products
+                ])
+
+                def read():
+                    # A fresh storage per run, as each request gets one
+                    cart = storage_class().get_cart(user)
+                    return renderer.render(CartSerializer(cart).data)
+
+                def write():
+                    return storage_class().add(user, products[0], 1)
+
+                read()  # warm the catalog cache
+                results[mode] = {
+                    'read': self.measure(repeat, read),
+                    'summary': self.measure(repeat, lambda: storage_class().summarize(user)),
+                    'write': self.measure(repeat, write),
+                }
+                outputs[mode] = strip_identity(CartSerializer(storage_class().get_cart(user)).data)
+            transaction.set_rollback(True)
+
+        if outputs['relational'] != outputs['document']:
+            raise CommandError('Document cart output differs from the relational cart output')
+
+        self.stdout.write(f"Cart lines: {len(products)} (identical output)")
+        for operation in ('read', 'summary', 'write'):
+            for mode in CART_STORAGES:
+                seconds, queries, _ = results[mode][operation]
+                self.stdout.write(f"{operation:<8} {mode:<11} {seconds * 1000:7.2f} ms  {queries} queries")
+        relational = results['relational']['read'][0]
+        document = results['document']['read'][0]
+        if document:
+            self.stdout.write(self.style.SUCCESS(f"Read speedup (document vs relational): {relational / document:.1f}x"))
@@ -0,0 +1,53 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from products.compiled import compile_product_list_renderer
+from products.models import Product
+from products.serializers import ProductListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compare ProductListSerializer with the compiled values_list() renderer on one page of products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Products per page')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path (best is reported)')
+
+    def best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = func()
+            timings.append(time.perf_counter() - start)
+        return min(timings), output
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.filter(is_active=True).order_by('-created_at', '-id')
+        rows = options['rows']
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            products = list(queryset.select_related('category')[:rows])
+            return renderer.render(ProductListSerializer(products, many=True).data)
+
+        def compiled_path():
+            columns, render = compile_product_list_renderer(
+                tuple(ProductListSerializer.Meta.fields),
+                tzinfo=timezone.get_current_timezone() if settings.USE_TZ else None
+            )
+            page = queryset.values_list(*columns, named=True)[:rows]
+            return renderer.render([render(row) for row in page])
+
+        serializer_time, expected = self.best_of(options['repeat'], serializer_path)
+        compiled_time, actual = self.best_of(options['repeat'], compiled_path)
+        if expected != actual:
+            raise CommandError('Compiled output differs from ProductListSerializer output')
+
+        count = min(rows, queryset.count())
+        self.stdout.write(f"Rows: {count} (identical output, {len(actual)} bytes)")
+        self.stdout.write(f"ProductListSerializer: {serializer_time * 1000:.1f} ms")
+        self.stdout.write(f"Compiled renderer:     {compiled_time * 1000:.1f} ms")
+        if compiled_time:
+            self.stdout.write(self.style.SUCCESS(f"Speedup: {serializer_time / compiled_time:.1f}x"))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.carts import CART_STORAGES
+from products.models import Cart, CartItem, Product
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Move carts between the relational and document cart storages (run before switching CART_STORAGE)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('mode', choices=sorted(CART_STORAGES), help='Storage to move carts to')
+
+    def handle(self, *args, **options):
+        if options['mode'] == 'document':
+            carts = Cart.objects.filter(items__isnull=False).distinct()
+            convert = self.to_document
+        else:
+            carts = Cart.objects.exclude(lines=[])
+            convert = self.to_relational
+
+        cart_ids = list(carts.values_list('pk', flat=True))
+        for start in range(0, len(cart_ids), CHUNK_SIZE):
+            with transaction.atomic():
+                convert(cart_ids[start:start + CHUNK_SIZE])
+        self.stdout.write(self.style.SUCCESS(f"Converted {len(cart_ids)} carts to {options['mode']} storage"))
+
+    def to_document(self, cart_ids):
+        carts = Cart.objects.select_for_update().in_bulk(cart_ids)
+        items = CartItem.objects.filter(cart_id__in=cart_ids).select_related('product').order_by('pk')
+        for item in items:
+            cart = carts[item.cart_id]
+            if not any(line['product_id'] == item.product_id for line in cart.lines):
+                cart.lines.append({
+                    'product_id': item.product_id,
+                    'quantity': item.quantity,
+                    'price': str(item.product.effective_price),
+                    'created_at': item.created_at.isoformat(),
+                    'updated_at': item.updated_at.isoformat(),
+                })
+        Cart.objects.bulk_update(carts.values(), ['lines'])
+        CartItem.objects.filter(cart_id__in=cart_ids).delete()
+
+    def to_relational(self, cart_ids):
+        carts = Cart.objects.select_for_update().in_bulk(cart_ids)
+        existing = set(Product.objects.filter(
+            pk__in={line['product_id'] for cart in carts.values() for line in cart.lines}
+        ).values_list('pk', flat=True))
+        CartItem.objects.bulk_create(
+            [
+                CartItem(cart=cart, product_id=line['product_id'], quantity=line['quantity'])
+                for cart in carts.values() for line in cart.lines
+                if line['product_id'] in existing
+            ],
+            # Rows already present (e.g. from a previous conversion) keep their quantity
+            ignore_conflicts=True,
+        )
+        Cart.objects.filter(pk__in=cart_ids).update(lines=[])
@@ -0,0 +1,42 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from products.exporters import EXPORT_FORMATS, ProductExporter
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Stream the product catalog to a CSV or NDJSON file (use - for stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write, or - for stdout')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', dest='file_format')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--chunk-size', type=int, default=ProductExporter.chunk_size)
+        parser.add_argument('--active-only', action='store_true', help='Skip inactive products')
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options['active_only']:
+            queryset = queryset.filter(is_active=True)
+        exporter = ProductExporter(
+            file_format=options['file_format'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size'],
+            queryset=queryset,
+        )
+
+        path = options['path']
+        try:
+            if path == '-':
+                output = sys.stdout.buffer
+                for block in exporter:
+                    output.write(block)
+                output.flush()
+                return
+            with open(path, 'wb') as output:
+                for block in exporter:
+                    output.write(block)
+        except OSError as e:
+            raise CommandError(f"Cannot write {path}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Exported products to {path}"))
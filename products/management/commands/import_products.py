@@ -0,0 +1,49 @@
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from products.importers import ROW_READERS, ProductImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products from a CSV or NDJSON file (use - for stdin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - to read stdin')
+        parser.add_argument('--format', choices=sorted(ROW_READERS), dest='file_format')
+        parser.add_argument('--batch-size', type=int, default=ProductImporter.batch_size)
+        parser.add_argument(
+            '--no-update', action='store_false', dest='update_existing',
+            help='Report existing SKUs as errors instead of updating them'
+        )
+        parser.add_argument('--report', help='Write the per-row error report to this JSON file')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or detect_format(path)
+        importer = ProductImporter(
+            update_existing=options['update_existing'],
+            batch_size=options['batch_size'],
+        )
+
+        try:
+            if path == '-':
+                report = importer.run(ROW_READERS[file_format](sys.stdin))
+            else:
+                with open(path, newline='', encoding='utf-8-sig') as lines:
+                    report = importer.run(ROW_READERS[file_format](lines))
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        if options['report']:
+            with open(options['report'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+        for error in report['errors'][:20]:
+            self.stderr.write(f"Row {error['row']} ({error['sku']}): {error['errors']}")
+        if report['failed'] > 20:
+            self.stderr.write(f"... {report['failed'] - 20} more errors")
+
+        summary = f"Created {report['created']}, updated {report['updated']}, failed {report['failed']}"
+        if importer.decode_failed:
+            raise CommandError(f"{report['errors'][-1]['errors']['file'][0]}. {summary}")
+        self.stdout.write(self.style.SUCCESS(summary))
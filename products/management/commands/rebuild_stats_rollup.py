@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from products.models import CategoryStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-category product stats rollup'
+
+    def handle(self, *args, **options):
+        count = CategoryStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {count} categories'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized active product counters on categories'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--category', type=int, action='append', dest='category_ids',
+            help='Only recount this category ID (can be repeated)'
+        )
+
+    def handle(self, *args, **options):
+        updated = Category.recount_active_products(options['category_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Corrected {updated} category counters'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from products.copurchase import update_copurchases
+
+
+class Command(BaseCommand):
+    help = 'Fold newly paid orders into the "frequently bought together" co-purchase matrix'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recount every paid order from scratch')
+        parser.add_argument('--top-k', type=int, help='Neighbours to rank per product')
+
+    def handle(self, *args, **options):
+        run = update_copurchases(full=options['full'], top_k=options['top_k'])
+        mode = 'Rebuilt' if run.full_rebuild else 'Updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'{mode} co-purchases from {run.orders} orders ({run.pairs} product pairs)'
+        ))
@@ -0,0 +1,57 @@
+from django.db import migrations
+
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_product_fts USING fts5("
+    "name, description, sku, category_name, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO products_product_fts (rowid, name, description, sku, category_name) "
+    "SELECT p.id, p.name, p.description, p.sku, c.name "
+    "FROM products_product p INNER JOIN products_category c ON c.id = p.category_id",
+]
+
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS products_product_fts",
+]
+
+POSTGRES_CREATE = [
+    "CREATE TABLE IF NOT EXISTS products_product_search ("
+    "product_id bigint PRIMARY KEY REFERENCES products_product (id) "
+    "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS products_product_search_document_idx "
+    "ON products_product_search USING GIN (document)",
+    "INSERT INTO products_product_search (product_id, document) "
+    "SELECT p.id, "
+    "setweight(to_tsvector('simple', p.name), 'A') || "
+    "setweight(to_tsvector('simple', p.sku), 'A') || "
+    "setweight(to_tsvector('simple', c.name), 'B') || "
+    "setweight(to_tsvector('simple', p.description), 'C') "
+    "FROM products_product p INNER JOIN products_category c ON c.id = p.category_id",
+]
+
+POSTGRES_DROP = [
+    "DROP TABLE IF EXISTS products_product_search",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        vendor_statements = statements.get(schema_editor.connection.vendor, [])
+        for statement in vendor_statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE}),
+            run_for_vendor({'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP}),
+        ),
+    ]
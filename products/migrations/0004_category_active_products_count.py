@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-15 04:30
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_active_products(apps, schema_editor):
+    Category = apps.get_model('products', 'Category')
+    Product = apps.get_model('products', 'Product')
+    active_counts = Product.objects.filter(
+        category=OuterRef('pk'), is_active=True
+    ).order_by().values('category').annotate(total=Count('pk')).values('total')
+    Category.objects.update(active_products_count=Coalesce(Subquery(active_counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_products_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_active_products, migrations.RunPython.noop),
+    ]
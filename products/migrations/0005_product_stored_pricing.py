@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-15 04:31
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Case, DecimalField, F, Func, IntegerField, Value, When
+from django.db.models.functions import Cast, Round
+
+
+class Hundredths(Func):
+    template = '(%(expressions)s / 100.0)'
+    output_field = DecimalField(max_digits=12, decimal_places=2)
+
+
+def populate_pricing(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    # Round half-up in whole cents, matching Product.compute_pricing()
+    price_cents = Cast(Round(F('price') * 100), IntegerField())
+    discount_cents = Cast(Round(F('discount_price') * 100), IntegerField())
+    Product.objects.update(
+        effective_price=Case(
+            When(discount_price__gt=0, then=F('discount_price')),
+            default=F('price'),
+        ),
+        discount_percentage=Case(
+            When(
+                discount_price__gt=0,
+                discount_price__lt=F('price'),
+                then=Hundredths(
+                    ((price_cents - discount_cents) * 20000 + price_cents) / (price_cents * 2)
+                ),
+            ),
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=5, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_category_active_products_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='discount_percentage',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Discount price if set, otherwise regular price', max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_active', 'effective_price', 'id'], name='products_pr_is_acti_ca0b69_idx'),
+        ),
+        migrations.RunPython(populate_pricing, migrations.RunPython.noop),
+    ]
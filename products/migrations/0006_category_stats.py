@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-15 04:33
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_stored_pricing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='products.category')),
+                ('total_products', models.IntegerField(default=0)),
+                ('active_products', models.IntegerField(default=0)),
+                ('featured_products', models.IntegerField(default=0)),
+                ('out_of_stock', models.IntegerField(default=0)),
+                ('active_price_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Category Stats',
+                'verbose_name_plural': 'Category Stats',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-15 04:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_wishlistitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoPurchaseRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('processed_until', models.DateTimeField()),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('pairs', models.PositiveIntegerField(default=0)),
+                ('full_rebuild', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Co-purchase Run',
+                'verbose_name_plural': 'Co-purchase Runs',
+                'ordering': ['-processed_until'],
+                'get_latest_by': 'processed_until',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductCoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('rank', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='copurchases', to='products.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Product Co-purchase',
+                'verbose_name_plural': 'Product Co-purchases',
+                'indexes': [models.Index(fields=['product', 'rank'], name='products_pr_product_b7c23f_idx')],
+                'unique_together': {('product', 'related')},
+            },
+        ),
+    ]
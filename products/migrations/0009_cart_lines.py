@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-15 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_copurchase'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='lines',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
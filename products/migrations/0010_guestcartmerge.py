@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-15 05:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0009_cart_lines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestCartMerge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nonce', models.CharField(max_length=32, unique=True)),
+                ('merged_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guest_cart_merges', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Guest Cart Merge',
+                'verbose_name_plural': 'Guest Cart Merges',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-15 09:12
+
+from importlib import import_module
+from django.db import migrations
+
+# Rows backfilled or bulk updated before half-up rounding could be a cent off
+populate_pricing = import_module('products.migrations.0005_product_stored_pricing').populate_pricing
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_guestcartmerge'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_pricing, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,14 @@
 # products/models.py
 from django.db import models
+from django.db.models import Case, Count, DecimalField, F, Func, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum, Value, When
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Cast, Coalesce, Greatest, Round
+from django.db.models.lookups import GreaterThan, LessThan
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from decimal import Decimal
+from django.utils import timezone
+from django.utils.functional import cached_property
+from decimal import ROUND_HALF_UP, Decimal
 
 User = get_user_model()
 
@@ -12,6 +18,8 @@ class Category(models.Model):
     # Temporarily comment out image field until Pillow is installed
     # image = models.ImageField(upload_to='categories/', blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    # Denormalized count of active products, maintained by products.signals
+    active_products_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -23,6 +31,94 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def adjust_active_products_count(cls, category_id, delta):
+        """Atomically add delta to a category's active product counter"""
+        # update() skips auto_now; the counter is part of category responses
+        cls.objects.filter(pk=category_id).update(
+            active_products_count=Greatest(F('active_products_count') + delta, 0),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def recount_active_products(cls, category_ids=None):
+        """Recompute active product counters from the products table, returning how many were off"""
+        active_counts = Product.objects.filter(
+            category=OuterRef('pk'), is_active=True
+        ).order_by().values('category').annotate(total=Count('pk')).values('total')
+
+        active_count = Coalesce(Subquery(active_counts), 0)
+        categories = cls.objects.exclude(active_products_count=active_count)
+        if category_ids is not None:
+            categories = categories.filter(pk__in=category_ids)
+        # Only rows whose counter was off, so unchanged categories keep updated_at
+        return categories.update(
+            active_products_count=active_count,
+            updated_at=timezone.now(),
+        )
+
+
+# Fields the stored pricing columns are derived from
+PRICING_SOURCE_FIELDS = ('price', 'discount_price')
+PRICING_FIELDS = ('effective_price', 'discount_percentage')
+
+
+class Hundredths(Func):
+    """Turn an integer count of hundredths into units (the 100.0 literal avoids integer division)"""
+    template = '(%(expressions)s / 100.0)'
+    output_field = DecimalField(max_digits=12, decimal_places=2)
+
+
+def pricing_expressions(price=F('price'), discount_price=F('discount_price')):
+    """SQL expressions computing the stored pricing columns from price and discount_price"""
+    money = DecimalField(max_digits=10, decimal_places=2)
+    if not isinstance(price, Combinable):
+        price = Value(price, output_field=money)
+    if not isinstance(discount_price, Combinable):
+        discount_price = Value(discount_price, output_field=money)
+
+    # Whole cents, so the percentage is rounded half-up in integer arithmetic
+    # exactly like compute_pricing() (SQLite has no exact decimal type)
+    price_cents = Cast(Round(price * 100), IntegerField())
+    discount_cents = Cast(Round(discount_price * 100), IntegerField())
+    percentage_hundredths = (
+        ((price_cents - discount_cents) * 20000 + price_cents) / (price_cents * 2)
+    )
+
+    return {
+        'effective_price': Case(
+            When(GreaterThan(discount_price, 0), then=discount_price),
+            default=price,
+            output_field=money,
+        ),
+        'discount_percentage': Case(
+            When(
+                Q(GreaterThan(discount_price, 0), LessThan(discount_price, price)),
+                then=Hundredths(percentage_hundredths),
+            ),
+            default=Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=5, decimal_places=2),
+        ),
+    }
+
+
+class ProductQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        """Update rows, recomputing the stored pricing columns in the same statement"""
+        # Callers that already computed the pricing columns may pass them explicitly
+        recompute = not any(field in kwargs for field in PRICING_FIELDS)
+        if recompute and any(field in kwargs for field in PRICING_SOURCE_FIELDS):
+            kwargs.update(pricing_expressions(
+                kwargs.get('price', F('price')),
+                kwargs.get('discount_price', F('discount_price')),
+            ))
+        return super().update(**kwargs)
+
+    def sync_pricing(self):
+        """Recompute the stored pricing columns (repair after raw SQL writes)"""
+        return super().update(**pricing_expressions())
+
 
 class Product(models.Model):
     name = models.CharField(max_length=200)
@@ -44,6 +140,21 @@ class Product(models.Model):
         blank=True,
         validators=[MinValueValidator(Decimal('0.01'))]
     )
+    # Stored so that what the customer pays can be sorted and filtered in SQL;
+    # kept in sync by save() and ProductQuerySet.update()
+    effective_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        help_text="Discount price if set, otherwise regular price"
+    )
+    discount_percentage = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False
+    )
     stock_quantity = models.PositiveIntegerField(default=0)
     sku = models.CharField(max_length=50, unique=True)
     # Temporarily comment out image field until Pillow is installed
@@ -65,6 +176,8 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Product"
         verbose_name_plural = "Products"
@@ -73,28 +186,45 @@ class Product(models.Model):
             models.Index(fields=['sku']),
             models.Index(fields=['is_active', 'is_featured']),
             models.Index(fields=['category', 'is_active']),
+            # Keyset pagination over the public orderings
+            models.Index(fields=['is_active', 'created_at', 'id']),
+            models.Index(fields=['is_active', 'price', 'id']),
+            models.Index(fields=['is_active', 'name', 'id']),
+            models.Index(fields=['is_active', 'effective_price', 'id']),
         ]
 
     def __str__(self):
         return self.name
 
-    @property
-    def effective_price(self):
-        """Return the effective price (discount price if available, otherwise regular price)"""
-        return self.discount_price if self.discount_price else self.price
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember loaded values so signal handlers can diff saves without a query
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.compute_pricing()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(PRICING_SOURCE_FIELDS) & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | set(PRICING_FIELDS)
+        super().save(*args, **kwargs)
+
+    def compute_pricing(self):
+        """Set the effective price (discount price if available, otherwise regular price) and discount percentage"""
+        self.effective_price = self.discount_price if self.discount_price else self.price
+        if self.discount_price and self.discount_price < self.price:
+            self.discount_percentage = (
+                (self.price - self.discount_price) * 100 / self.price
+            ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        else:
+            self.discount_percentage = Decimal('0.00')
 
     @property
     def is_in_stock(self):
         """Check if product is in stock"""
         return self.stock_quantity > 0
 
-    @property
-    def discount_percentage(self):
-        """Calculate discount percentage if discount price is set"""
-        if self.discount_price and self.discount_price < self.price:
-            return round(((self.price - self.discount_price) / self.price) * 100, 2)
-        return 0
-
     def clean(self):
         """Validate the model"""
         from django.core.exceptions import ValidationError
@@ -103,11 +233,115 @@ class Product(models.Model):
             raise ValidationError('Discount price must be less than regular price.')
 
 
+class CategoryStats(models.Model):
+    """
+    Per-category product counters for the stats endpoints.
+
+    Optional rollup (see PRODUCT_STATS_ROLLUP): when enabled, products.signals
+    applies incremental deltas on every product write, and rebuild() repairs
+    rows after bulk writes.
+    """
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    total_products = models.IntegerField(default=0)
+    active_products = models.IntegerField(default=0)
+    featured_products = models.IntegerField(default=0)
+    out_of_stock = models.IntegerField(default=0)
+    active_price_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Category Stats"
+        verbose_name_plural = "Category Stats"
+
+    def __str__(self):
+        return f"Stats for {self.category_id}"
+
+    @staticmethod
+    def contribution(is_active, is_featured, stock_quantity, price):
+        """Return what a single product adds to its category counters"""
+        return {
+            'total_products': 1,
+            'active_products': int(bool(is_active)),
+            'featured_products': int(bool(is_active and is_featured)),
+            'out_of_stock': int(bool(is_active and stock_quantity == 0)),
+            'active_price_total': Decimal(price or 0) if is_active else Decimal('0.00'),
+        }
+
+    @classmethod
+    def apply_delta(cls, category_id, delta):
+        """Atomically add counter deltas to a category row, creating it if missing"""
+        changes = {field: F(field) + value for field, value in delta.items() if value}
+        if not changes:
+            return
+        if not cls.objects.filter(category_id=category_id).update(**changes):
+            cls.rebuild([category_id])
+
+    @classmethod
+    def rebuild(cls, category_ids=None):
+        """Recompute rollup rows from the products table in one grouped query"""
+        categories = Category.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=category_ids)
+
+        active = Q(products__is_active=True)
+        rows = categories.annotate(
+            total=Count('products'),
+            active=Count('products', filter=active),
+            featured=Count('products', filter=active & Q(products__is_featured=True)),
+            empty=Count('products', filter=active & Q(products__stock_quantity=0)),
+            price_total=Coalesce(
+                Sum('products__price', filter=active), Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+        ).values_list('pk', 'total', 'active', 'featured', 'empty', 'price_total')
+
+        stats = [
+            cls(
+                category_id=pk, total_products=total, active_products=active_count,
+                featured_products=featured, out_of_stock=empty,
+                active_price_total=price_total
+            )
+            for pk, total, active_count, featured, empty, price_total in rows
+        ]
+        cls.objects.bulk_create(
+            stats,
+            update_conflicts=True,
+            unique_fields=['category'],
+            update_fields=[
+                'total_products', 'active_products', 'featured_products',
+                'out_of_stock', 'active_price_total', 'updated_at'
+            ],
+        )
+        return len(stats)
+
+
+class CartQuerySet(models.QuerySet):
+
+    def with_items(self):
+        """Prefetch items with their products and categories in a single query"""
+        return self.prefetch_related(Prefetch(
+            'items',
+            queryset=CartItem.objects.select_related('product__category').order_by('pk'),
+        ))
+
+
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cart')
+    # Line list used instead of CartItem rows when CART_STORAGE = 'document'
+    # (see products.carts.DocumentCartStorage)
+    lines = models.JSONField(default=list, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CartQuerySet.as_manager()
+    # Rehydrated document lines; None for carts stored as CartItem rows
+    document_items = None
+
     class Meta:
         verbose_name = "Cart"
         verbose_name_plural = "Carts"
@@ -115,20 +349,51 @@ class Cart(models.Model):
     def __str__(self):
         return f"Cart for {self.user.email}"
 
+    def get_items(self):
+        """Items of the cart: the rehydrated document lines, or the (prefetched) rows"""
+        if self.document_items is not None:
+            return self.document_items
+        return self.items.all()
+
+    @cached_property
+    def totals(self):
+        """(amount, items, unique items) from one pass over the (prefetched) items"""
+        amount = Decimal('0.00')
+        quantity = 0
+        count = 0
+        for item in self.get_items():
+            amount += item.subtotal
+            quantity += item.quantity
+            count += 1
+        return amount, quantity, count
+
     @property
     def total_amount(self):
         """Calculate total amount of all items in cart"""
-        return sum(item.subtotal for item in self.items.all())
+        return self.totals[0]
 
     @property
     def total_items(self):
         """Calculate total number of items in cart"""
-        return sum(item.quantity for item in self.items.all())
+        return self.totals[1]
 
     @property
     def total_unique_items(self):
         """Get count of unique items in cart"""
-        return self.items.count()
+        return self.totals[2]
+
+    @staticmethod
+    def summarize(user):
+        """Totals of a user's cart from one aggregate query (no item rows loaded)"""
+        money = DecimalField(max_digits=12, decimal_places=2)
+        return CartItem.objects.filter(cart__user=user).aggregate(
+            total_amount=Coalesce(
+                Sum(F('quantity') * F('product__effective_price'), output_field=money),
+                Value(Decimal('0.00')), output_field=money
+            ),
+            total_items=Coalesce(Sum('quantity'), Value(0)),
+            total_unique_items=Count('pk'),
+        )
 
 
 class CartItem(models.Model):
@@ -161,4 +426,78 @@ class CartItem(models.Model):
         if self.product and self.quantity > self.product.stock_quantity:
             raise ValidationError(
                 f'Only {self.product.stock_quantity} units available for {self.product.name}'
-            )
\ No newline at end of file
+            )
+
+
+class GuestCartMerge(models.Model):
+    """Nonce of a signed guest cart already merged into a user's cart (merges are use-once)"""
+    nonce = models.CharField(max_length=32, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='guest_cart_merges')
+    merged_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Guest Cart Merge"
+        verbose_name_plural = "Guest Cart Merges"
+
+    def __str__(self):
+        return f"Guest cart {self.nonce} merged for {self.user.email}"
+
+
+class WishlistItem(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='wishlist_items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='wishlisted_by')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # The unique index doubles as the lookup index for a user's wishlist
+        unique_together = ['user', 'product']
+        ordering = ['-created_at']
+        verbose_name = "Wishlist Item"
+        verbose_name_plural = "Wishlist Items"
+
+    def __str__(self):
+        return f"{self.user.email} - {self.product.name}"
+
+
+class ProductCoPurchase(models.Model):
+    """
+    Number of paid orders containing both products, stored in both directions.
+
+    Rows form a sparse product-by-product matrix maintained by
+    products.copurchase; `rank` is set (1 = bought together most often) on
+    each product's top PRODUCT_COPURCHASE_TOP_K rows and null on the rest.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='copurchases')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+    rank = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['product', 'related']
+        indexes = [
+            # Top-K lookups for one product or a whole cart
+            models.Index(fields=['product', 'rank']),
+        ]
+        verbose_name = "Product Co-purchase"
+        verbose_name_plural = "Product Co-purchases"
+
+    def __str__(self):
+        return f"{self.product_id} + {self.related_id}: {self.orders}"
+
+
+class CoPurchaseRun(models.Model):
+    """Co-purchase job runs; the latest processed_until is the incremental watermark"""
+    processed_until = models.DateTimeField()
+    orders = models.PositiveIntegerField(default=0)
+    pairs = models.PositiveIntegerField(default=0)
+    full_rebuild = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-processed_until']
+        get_latest_by = 'processed_until'
+        verbose_name = "Co-purchase Run"
+        verbose_name_plural = "Co-purchase Runs"
+
+    def __str__(self):
+        return f"Co-purchases up to {self.processed_until}"
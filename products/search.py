@@ -0,0 +1,240 @@
+# products/search.py
+import re
+import unicodedata
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SEARCH_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+INDEX_CHUNK_SIZE = 500
+
+
+def tokenize(query):
+    """Split a raw search string into lowercase word tokens"""
+    return [token.lower() for token in SEARCH_TOKEN_RE.findall(query or '')]
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+def chunked(values, size=INDEX_CHUNK_SIZE):
+    """Yield lists of at most `size` values"""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class BaseSearchBackend:
+    """
+    Interface for product search backends.
+
+    Backends filter a Product queryset down to the rows matching a search
+    string and annotate them with `search_rank` (lower is more relevant), and
+    keep their index in sync when products change.
+    """
+
+    def search(self, queryset, query):
+        """Filter and rank a Product queryset by a search string"""
+        raise NotImplementedError
+
+    def index_products(self, product_ids):
+        """Add or refresh the given products in the index"""
+
+    def reindex_category(self, category_id):
+        """Refresh every product of a category (e.g. after a rename)"""
+
+    def remove_products(self, product_ids):
+        """Drop the given products from the index"""
+
+    def rebuild(self):
+        """Rebuild the whole index, returning the number of indexed products"""
+        from .models import Product
+        return Product.objects.count()
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Fallback backend using LIKE lookups (no index to maintain)"""
+
+    def search(self, queryset, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return queryset.none()
+
+        for token in tokens:
+            queryset = queryset.filter(
+                Q(name__icontains=token) |
+                Q(description__icontains=token) |
+                Q(sku__icontains=token) |
+                Q(category__name__icontains=token)
+            )
+        return queryset
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Search backend using an SQLite FTS5 virtual table"""
+
+    table = 'products_product_fts'
+    # bm25() column weights: name, description, sku, category_name
+    weights = (10.0, 1.0, 8.0, 4.0)
+
+    def build_query(self, query):
+        """Turn user input into an FTS5 query of quoted prefix terms"""
+        return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+    def search(self, queryset, query):
+        match = self.build_query(query)
+        if not match:
+            return queryset.none()
+
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s',
+                (match,)
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT bm25({self.table}, {weights}) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s AND rowid = products_product.id',
+                (match,)
+            )
+        ).order_by('search_rank', '-created_at')
+
+    def _insert_sql(self, where):
+        return (
+            f'INSERT INTO {self.table} (rowid, name, description, sku, category_name) '
+            'SELECT p.id, p.name, p.description, p.sku, c.name '
+            'FROM products_product p '
+            'INNER JOIN products_category c ON c.id = p.category_id '
+            f'WHERE {where}'
+        )
+
+    def index_products(self, product_ids):
+        with connection.cursor() as cursor:
+            for chunk in chunked(product_ids):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', chunk
+                )
+                cursor.execute(self._insert_sql(f'p.id IN ({placeholders})'), chunk)
+
+    def reindex_category(self, category_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN '
+                '(SELECT id FROM products_product WHERE category_id = %s)',
+                [category_id]
+            )
+            cursor.execute(self._insert_sql('p.category_id = %s'), [category_id])
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            for chunk in chunked(product_ids):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', chunk
+                )
+
+    def rebuild(self):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(self._insert_sql('1 = 1'))
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Search backend using a tsvector side table with a GIN index"""
+
+    table = 'products_product_search'
+    config = 'simple'
+
+    def build_query(self, query):
+        """Turn user input into a tsquery of ANDed prefix terms"""
+        return ' & '.join(f'{token}:*' for token in tokenize(query))
+
+    def search(self, queryset, query):
+        match = self.build_query(query)
+        if not match:
+            return queryset.none()
+
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT product_id FROM {self.table} '
+                'WHERE document @@ to_tsquery(%s, %s)',
+                (self.config, match)
+            )
+        ).annotate(
+            # Negated so that, like bm25(), lower ranks are more relevant
+            search_rank=RawSQL(
+                f'SELECT -ts_rank(document, to_tsquery(%s, %s)) FROM {self.table} '
+                'WHERE product_id = products_product.id',
+                (self.config, match)
+            )
+        ).order_by('search_rank', '-created_at')
+
+    def _upsert_sql(self, where):
+        return (
+            f'INSERT INTO {self.table} (product_id, document) '
+            'SELECT p.id, '
+            "setweight(to_tsvector(%s, p.name), 'A') || "
+            "setweight(to_tsvector(%s, p.sku), 'A') || "
+            "setweight(to_tsvector(%s, c.name), 'B') || "
+            "setweight(to_tsvector(%s, p.description), 'C') "
+            'FROM products_product p '
+            'INNER JOIN products_category c ON c.id = p.category_id '
+            f'WHERE {where} '
+            'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document'
+        )
+
+    def index_products(self, product_ids):
+        configs = [self.config] * 4
+        with connection.cursor() as cursor:
+            for chunk in chunked(product_ids):
+                cursor.execute(self._upsert_sql('p.id = ANY(%s)'), configs + [chunk])
+
+    def reindex_category(self, category_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self._upsert_sql('p.category_id = %s'),
+                [self.config] * 4 + [category_id]
+            )
+
+    def remove_products(self, product_ids):
+        with connection.cursor() as cursor:
+            for chunk in chunked(product_ids):
+                cursor.execute(
+                    f'DELETE FROM {self.table} WHERE product_id = ANY(%s)', [chunk]
+                )
+
+    def rebuild(self):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+            cursor.execute(self._upsert_sql('TRUE'), [self.config] * 4)
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """Return the configured search backend, defaulting to one matching the database"""
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+
+    backend_class = VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)
+    return backend_class()
@@ -1,11 +1,13 @@
 # products/serializers.py
 from rest_framework import serializers
 from decimal import Decimal
-from .models import Category, Product, Cart, CartItem
+from .models import Category, Product, Cart, CartItem, WishlistItem
 
 class CategorySerializer(serializers.ModelSerializer):
     """Serializer for product categories"""
-    products_count = serializers.SerializerMethodField()
+    products_count = serializers.IntegerField(
+        source='active_products_count', read_only=True
+    )
     
     class Meta:
         model = Category
@@ -15,10 +17,6 @@ class CategorySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ('id', 'created_at', 'updated_at')
 
-    def get_products_count(self, obj):
-        """Get count of active products in this category"""
-        return obj.products.filter(is_active=True).count()
-
 
 class ProductListSerializer(serializers.ModelSerializer):
     """Simplified serializer for product listing"""
@@ -32,6 +30,12 @@ class ProductListSerializer(serializers.ModelSerializer):
         max_digits=5, decimal_places=2, read_only=True
     )
     is_in_stock = serializers.BooleanField(read_only=True)
+    # Model columns read by non-field attributes (see SparseFieldsetMixin)
+    field_dependencies = {
+        'price_formatted': ['price'],
+        'effective_price_formatted': ['effective_price'],
+        'is_in_stock': ['stock_quantity'],
+    }
     
     class Meta:
         model = Product
@@ -66,6 +70,12 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     )
     is_in_stock = serializers.BooleanField(read_only=True)
     savings_amount = serializers.SerializerMethodField()
+    field_dependencies = {
+        'price_formatted': ['price'],
+        'effective_price_formatted': ['effective_price'],
+        'is_in_stock': ['stock_quantity'],
+        'savings_amount': ['price', 'discount_price'],
+    }
     
     class Meta:
         model = Product
@@ -137,6 +147,108 @@ class ProductCreateUpdateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Validates one row of a bulk product import.
+
+    Deliberately free of database lookups: categories and SKU uniqueness are
+    resolved by products.importers against sets preloaded once per batch.
+    """
+    sku = serializers.CharField(max_length=50)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    category = serializers.IntegerField(required=False)
+    category_name = serializers.CharField(max_length=100, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    discount_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, allow_null=True
+    )
+    stock_quantity = serializers.IntegerField(min_value=0, required=False)
+    weight = serializers.DecimalField(
+        max_digits=6, decimal_places=2, required=False, allow_null=True
+    )
+    dimensions = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    is_active = serializers.BooleanField(required=False)
+    is_featured = serializers.BooleanField(required=False)
+
+    def validate_sku(self, value):
+        """Normalize SKU like ProductCreateUpdateSerializer"""
+        return value.strip().upper()
+
+    def validate_price(self, value):
+        """Validate price is positive"""
+        if value <= 0:
+            raise serializers.ValidationError("Price must be greater than 0")
+        return value
+
+    def validate_discount_price(self, value):
+        """Validate discount price"""
+        if value is not None and value <= 0:
+            raise serializers.ValidationError("Discount price must be greater than 0")
+        return value
+
+    def validate(self, attrs):
+        """New products need a category (by ID or name)"""
+        if not self.partial and 'category' not in attrs and 'category_name' not in attrs:
+            raise serializers.ValidationError({
+                'category': 'Provide a category ID or category_name'
+            })
+        return attrs
+
+
+class ProductImportSerializer(serializers.Serializer):
+    """Serializer for bulk product import uploads"""
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(choices=['csv', 'ndjson'], required=False)
+    update_existing = serializers.BooleanField(default=True)
+
+
+class ProductStockPriceSerializer(serializers.Serializer):
+    """One row of a bulk price/stock update, keyed by SKU"""
+    sku = serializers.CharField(max_length=50)
+    price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0.01'), required=False
+    )
+    discount_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal('0.01'),
+        required=False, allow_null=True
+    )
+    stock_quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate_sku(self, value):
+        return value.strip().upper()
+
+    def validate(self, attrs):
+        if len(attrs) == 1:
+            raise serializers.ValidationError(
+                "Provide at least one of price, discount_price or stock_quantity"
+            )
+        return attrs
+
+
+class ProductBulkUpdateSerializer(serializers.Serializer):
+    """Serializer for bulk price/stock updates"""
+    items = ProductStockPriceSerializer(many=True, allow_empty=False, max_length=10000)
+
+
+class WishlistItemSerializer(serializers.ModelSerializer):
+    """Serializer for wishlist items"""
+    product = ProductListSerializer(read_only=True)
+
+    class Meta:
+        model = WishlistItem
+        fields = ['id', 'product', 'created_at']
+
+
+class WishlistUpdateSerializer(serializers.Serializer):
+    """Serializer for adding or removing wishlist products in one request"""
+    product_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100
+    )
+
+
 class CartItemSerializer(serializers.ModelSerializer):
     """Serializer for cart items"""
     product = ProductListSerializer(read_only=True)
@@ -211,7 +323,9 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 class CartSerializer(serializers.ModelSerializer):
     """Serializer for shopping cart"""
-    items = CartItemSerializer(many=True, read_only=True)
+    # Null until the first write when CART_STORAGE = 'document' (reads never create the row)
+    id = serializers.IntegerField(read_only=True, allow_null=True)
+    items = CartItemSerializer(many=True, read_only=True, source='get_items')
     total_amount = serializers.DecimalField(
         max_digits=10, decimal_places=2, read_only=True
     )
@@ -225,6 +339,10 @@ class CartSerializer(serializers.ModelSerializer):
             'id', 'items', 'total_amount', 'total_amount_formatted',
             'total_items', 'total_unique_items', 'created_at', 'updated_at'
         ]
+        extra_kwargs = {
+            'created_at': {'allow_null': True},
+            'updated_at': {'allow_null': True},
+        }
 
     def get_total_amount_formatted(self, obj):
         """Format total amount for display"""
@@ -236,28 +354,21 @@ class AddToCartSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
     quantity = serializers.IntegerField(min_value=1, default=1)
     
-    def validate_product_id(self, value):
-        """Validate product exists and is active"""
-        try:
-            product = Product.objects.get(id=value, is_active=True)
-            if not product.is_in_stock:
-                raise serializers.ValidationError("Product is out of stock")
-            return value
-        except Product.DoesNotExist:
-            raise serializers.ValidationError("Product not found")
-
     def validate(self, attrs):
-        """Validate stock availability"""
-        product_id = attrs.get('product_id')
-        quantity = attrs.get('quantity')
-        
-        if product_id and quantity:
-            product = Product.objects.get(id=product_id)
-            if quantity > product.stock_quantity:
-                raise serializers.ValidationError({
-                    'quantity': f'Only {product.stock_quantity} units available'
-                })
-        
+        """Validate the product and stock, fetching the product once for the view too"""
+        product = Product.objects.select_related('category').filter(
+            id=attrs['product_id'], is_active=True
+        ).first()
+        if product is None:
+            raise serializers.ValidationError({'product_id': 'Product not found'})
+        if not product.is_in_stock:
+            raise serializers.ValidationError({'product_id': 'Product is out of stock'})
+        if attrs['quantity'] > product.stock_quantity:
+            raise serializers.ValidationError({
+                'quantity': f'Only {product.stock_quantity} units available'
+            })
+
+        attrs['product'] = product
         return attrs
 
 
@@ -276,6 +387,29 @@ class UpdateCartItemSerializer(serializers.Serializer):
         return value
 
 
+class CartOperationSerializer(serializers.Serializer):
+    """One cart edit of a batch: add to, set or remove a product's line"""
+    OPERATIONS = ('add', 'set', 'remove')
+
+    op = serializers.ChoiceField(choices=OPERATIONS)
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs['op'] == 'remove':
+            attrs.pop('quantity', None)
+        elif 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': 'This field is required.'})
+        elif attrs['op'] == 'add' and attrs['quantity'] < 1:
+            raise serializers.ValidationError({'quantity': 'Quantity must be greater than 0'})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """Serializer for applying several cart edits in one request"""
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=100)
+
+
 class ProductSearchSerializer(serializers.Serializer):
     """Serializer for product search parameters"""
     search = serializers.CharField(required=False, allow_blank=True)
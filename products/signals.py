@@ -0,0 +1,217 @@
+# products/signals.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+from .cache import bump_versions_on_commit
+from .models import Category, CategoryStats, Product
+from .search import get_search_backend
+from .suggest import get_built_index
+
+# Sent after bulk writes that bypass model signals (bulk_create, bulk_update,
+# queryset.update) with the affected product IDs and every category they were
+# in before or after the write
+products_bulk_changed = Signal()
+
+# Product fields whose previous values the write handlers below need
+TRACKED_FIELDS = (
+    'category_id', 'is_active', 'sku', 'is_featured', 'stock_quantity', 'price'
+)
+
+
+def snapshot(instance):
+    """Return the tracked field values of a product instance"""
+    return {field: getattr(instance, field) for field in TRACKED_FIELDS}
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    """Capture the pre-save state of a product for the post_save handlers"""
+    instance._previous_state = None
+    if raw or instance._state.adding:
+        return
+
+    loaded = getattr(instance, '_loaded_values', {})
+    if all(field in loaded for field in TRACKED_FIELDS):
+        instance._previous_state = {field: loaded[field] for field in TRACKED_FIELDS}
+    else:
+        instance._previous_state = Product.objects.filter(
+            pk=instance.pk
+        ).values(*TRACKED_FIELDS).first()
+
+
+@receiver(post_save, sender=Product)
+def update_category_counters(sender, instance, created, raw=False, **kwargs):
+    """Move the product between category active counters as needed"""
+    if raw:
+        return
+
+    previous = getattr(instance, '_previous_state', None)
+    current = snapshot(instance)
+
+    was_counted_in = previous['category_id'] if previous and previous['is_active'] else None
+    counted_in = current['category_id'] if current['is_active'] else None
+    if was_counted_in != counted_in:
+        if was_counted_in:
+            Category.adjust_active_products_count(was_counted_in, -1)
+        if counted_in:
+            Category.adjust_active_products_count(counted_in, 1)
+
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), **current}
+
+    # Invalidate cached catalog responses that include this product
+    scopes = ['products', f"product:{instance.pk}", f"sku:{instance.sku}"]
+    if previous and previous['sku'] != instance.sku:
+        scopes.append(f"sku:{previous['sku']}")
+    if was_counted_in != counted_in:
+        scopes.append('categories')
+    bump_versions_on_commit(*scopes)
+
+
+@receiver(post_delete, sender=Product)
+def release_category_counter(sender, instance, **kwargs):
+    """Drop deleted active products from their category counter"""
+    if instance.is_active:
+        Category.adjust_active_products_count(instance.category_id, -1)
+    bump_versions_on_commit(
+        'products', 'categories', f"product:{instance.pk}", f"sku:{instance.sku}"
+    )
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_responses(sender, instance, raw=False, **kwargs):
+    """Category names and counters appear in both category and product responses"""
+    if raw:
+        return
+    bump_versions_on_commit('categories', 'products')
+
+
+def stats_contribution(state):
+    return CategoryStats.contribution(
+        state['is_active'], state['is_featured'], state['stock_quantity'], state['price']
+    )
+
+
+@receiver(post_save, sender=Product)
+def update_stats_rollup(sender, instance, created, raw=False, **kwargs):
+    """Apply incremental deltas to the optional category stats rollup"""
+    if raw or not settings.PRODUCT_STATS_ROLLUP:
+        return
+
+    previous = getattr(instance, '_previous_state', None)
+    current = snapshot(instance)
+    added = stats_contribution(current)
+
+    if previous is None:
+        CategoryStats.apply_delta(current['category_id'], added)
+        return
+
+    removed = stats_contribution(previous)
+    if previous['category_id'] == current['category_id']:
+        CategoryStats.apply_delta(
+            current['category_id'],
+            {field: added[field] - removed[field] for field in added}
+        )
+    else:
+        CategoryStats.apply_delta(
+            previous['category_id'],
+            {field: -value for field, value in removed.items()}
+        )
+        CategoryStats.apply_delta(current['category_id'], added)
+
+
+@receiver(post_delete, sender=Product)
+def release_stats_rollup(sender, instance, **kwargs):
+    """Remove deleted products from the optional category stats rollup"""
+    if not settings.PRODUCT_STATS_ROLLUP:
+        return
+    removed = stats_contribution(snapshot(instance))
+    CategoryStats.objects.filter(category_id=instance.category_id).update(**{
+        field: F(field) - value for field, value in removed.items() if value
+    })
+
+
+@receiver(post_save, sender=Category)
+def create_stats_rollup(sender, instance, created, raw=False, **kwargs):
+    """Start every new category with an empty rollup row"""
+    if created and not raw and settings.PRODUCT_STATS_ROLLUP:
+        CategoryStats.objects.get_or_create(category=instance)
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    """Keep the search index in sync with product edits"""
+    if raw:
+        return
+    get_search_backend().index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    """Drop deleted products from the search index"""
+    get_search_backend().remove_products([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, raw=False, **kwargs):
+    """Refresh indexed category names when a category changes"""
+    if raw or created:
+        return
+    get_search_backend().reindex_category(instance.pk)
+
+
+@receiver(products_bulk_changed)
+def sync_after_bulk_change(sender, product_ids, category_ids, reindex_search=True, **kwargs):
+    """Bring derived catalog data up to date after a bulk product write"""
+    if reindex_search:
+        get_search_backend().index_products(product_ids)
+    Category.recount_active_products(category_ids)
+    if settings.PRODUCT_STATS_ROLLUP:
+        CategoryStats.rebuild(category_ids)
+    bump_versions_on_commit('products', 'categories')
+
+
+def update_suggest_index(method, *args):
+    """Patch this process's suggest index (if built) once the transaction commits"""
+    def apply():
+        index = get_built_index()
+        if index is not None:
+            getattr(index, method)(*args)
+    transaction.on_commit(apply)
+
+
+@receiver(post_save, sender=Product)
+def suggest_saved_product(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_suggest_index('update_product', instance)
+
+
+@receiver(post_delete, sender=Product)
+def unsuggest_deleted_product(sender, instance, **kwargs):
+    update_suggest_index('remove_product', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def suggest_saved_category(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_suggest_index('update_category', instance)
+
+
+@receiver(post_delete, sender=Category)
+def unsuggest_deleted_category(sender, instance, **kwargs):
+    update_suggest_index('remove_category', instance.pk)
+
+
+@receiver(products_bulk_changed)
+def suggest_bulk_changed(sender, product_ids, reindex_search=True, **kwargs):
+    """Price/stock-only bulk updates do not touch suggested fields"""
+    if reindex_search:
+        update_suggest_index('refresh_products', list(product_ids))
+
+
+@receiver(post_save, sender='payments.OrderItem')
+def count_suggest_sales(sender, instance, created, raw=False, **kwargs):
+    """Rank newly ordered products higher without waiting for the next rebuild"""
+    if created and not raw:
+        update_suggest_index('add_sales', instance.product_id, instance.quantity)
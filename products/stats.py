@@ -0,0 +1,108 @@
+# products/stats.py
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Avg, Count, Q, Sum
+from .cache import get_or_revalidate
+from .models import Category, CategoryStats
+
+PRODUCT_STATS_KEY = 'catalog:product-stats'
+CATEGORY_STATS_KEY = 'catalog:category-stats:{category_id}'
+
+
+def to_money(value):
+    """Round an average price to cents (0 when there is nothing to average)"""
+    if not value:
+        return 0
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def compute_product_stats():
+    """Catalog-wide product statistics in a single query"""
+    if settings.PRODUCT_STATS_ROLLUP:
+        # O(categories) over the incrementally maintained rollup
+        totals = CategoryStats.objects.aggregate(
+            total_products=Sum('total_products'),
+            active_products=Sum('active_products'),
+            featured_products=Sum('featured_products'),
+            out_of_stock=Sum('out_of_stock'),
+            categories_count=Count('pk', filter=Q(category__is_active=True)),
+            price_total=Sum('active_price_total'),
+        )
+        return {
+            'total_products': totals['total_products'] or 0,
+            'active_products': totals['active_products'] or 0,
+            'featured_products': totals['featured_products'] or 0,
+            'out_of_stock': totals['out_of_stock'] or 0,
+            'categories_count': totals['categories_count'],
+            'average_price': to_money(
+                totals['price_total'] / totals['active_products'] if totals['active_products'] else 0
+            ),
+        }
+
+    # Categories LEFT JOIN products: one row per product (plus empty categories)
+    active = Q(products__is_active=True)
+    stats = Category.objects.aggregate(
+        total_products=Count('products'),
+        active_products=Count('products', filter=active),
+        featured_products=Count('products', filter=active & Q(products__is_featured=True)),
+        out_of_stock=Count('products', filter=active & Q(products__stock_quantity=0)),
+        categories_count=Count('pk', filter=Q(is_active=True), distinct=True),
+        average_price=Avg('products__price', filter=active),
+    )
+    stats['average_price'] = to_money(stats['average_price'])
+    return stats
+
+
+def compute_category_stats(category_id):
+    """Statistics for one active category in a single query (None if not found)"""
+    categories = Category.objects.filter(pk=category_id, is_active=True)
+
+    if settings.PRODUCT_STATS_ROLLUP:
+        row = categories.values(
+            'name', 'stats__total_products', 'stats__active_products',
+            'stats__featured_products', 'stats__active_price_total'
+        ).first()
+        if row is None:
+            return None
+        return {
+            'category_name': row['name'],
+            'total_products': row['stats__total_products'] or 0,
+            'active_products': row['stats__active_products'] or 0,
+            'featured_products': row['stats__featured_products'] or 0,
+            'average_price': to_money(
+                row['stats__active_price_total'] / row['stats__active_products']
+                if row['stats__active_products'] else 0
+            ),
+        }
+
+    active = Q(products__is_active=True)
+    row = categories.annotate(
+        total=Count('products'),
+        active=Count('products', filter=active),
+        featured=Count('products', filter=active & Q(products__is_featured=True)),
+        average=Avg('products__price', filter=active),
+    ).values('name', 'total', 'active', 'featured', 'average').first()
+    if row is None:
+        return None
+    return {
+        'category_name': row['name'],
+        'total_products': row['total'],
+        'active_products': row['active'],
+        'featured_products': row['featured'],
+        'average_price': to_money(row['average']),
+    }
+
+
+def get_product_stats():
+    return get_or_revalidate(
+        PRODUCT_STATS_KEY, compute_product_stats,
+        settings.STATS_CACHE_TIMEOUT, settings.STATS_STALE_TIMEOUT
+    )
+
+
+def get_category_stats(category_id):
+    return get_or_revalidate(
+        CATEGORY_STATS_KEY.format(category_id=category_id),
+        lambda: compute_category_stats(category_id),
+        settings.STATS_CACHE_TIMEOUT, settings.STATS_STALE_TIMEOUT
+    )
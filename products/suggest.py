@@ -0,0 +1,258 @@
+# products/suggest.py
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Case, FloatField, Sum, Value, When
+from .models import Category, Product
+from .search import get_search_backend, normalize
+from .trigrams import TrigramIndex
+
+# Orders in these states do not count towards product popularity
+EXCLUDED_ORDER_STATUSES = ('cancelled', 'refunded')
+# Memoized answers kept between index changes
+MAX_CACHED_RESULTS = 10000
+
+
+def name_terms(name):
+    """Index terms for a name: the full name and every suffix starting at a word"""
+    words = normalize(name).split(' ')
+    return {' '.join(words[index:]) for index in range(len(words)) if words[index]}
+
+
+class PrefixIndex:
+    """Sorted (term, id) keys searched with bisect"""
+
+    def __init__(self):
+        self.keys = []
+        self.terms = {}
+
+    def add(self, pk, terms):
+        self.remove(pk)
+        self.terms[pk] = terms
+        for term in terms:
+            insort(self.keys, (term, pk))
+
+    def remove(self, pk):
+        for term in self.terms.pop(pk, ()):
+            index = bisect_left(self.keys, (term, pk))
+            if index < len(self.keys) and self.keys[index] == (term, pk):
+                del self.keys[index]
+
+    def load(self, terms_by_pk):
+        """Bulk load (replaces the index contents)"""
+        self.terms = terms_by_pk
+        self.keys = sorted(
+            (term, pk) for pk, terms in terms_by_pk.items() for term in terms
+        )
+
+    def match(self, prefix):
+        """IDs with a term starting with prefix (every match, so callers can rank them all)"""
+        start = bisect_left(self.keys, (prefix,))
+        end = bisect_left(self.keys, (prefix + '\uffff',), start)
+        return {pk for _, pk in self.keys[start:end]}
+
+
+class SuggestIndex:
+    """
+    In-memory autocomplete index over active products and categories.
+
+    Products are matched on name words and SKU, categories on name words,
+    and results are ranked by units sold (answers are memoized until the
+    index next changes). Product names and SKUs are also held in a trigram
+    index for fuzzy search. The index is built from three queries, patched in
+    place by products.signals as products change, and rebuilt every
+    PRODUCT_SUGGEST_REFRESH seconds so that writes made by other processes
+    are picked up.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.products = PrefixIndex()
+        self.categories = PrefixIndex()
+        self.trigrams = TrigramIndex()
+        self.product_data = {}
+        self.category_data = {}
+        self.popularity = {}
+        self.results = {}
+        self.built_at = None
+
+    def build(self):
+        OrderItem = apps.get_model('payments', 'OrderItem')
+        popularity = dict(
+            OrderItem.objects.exclude(order__status__in=EXCLUDED_ORDER_STATUSES)
+            .values('product_id').annotate(units=Sum('quantity'))
+            .values_list('product_id', 'units')
+        )
+        rows = Product.objects.filter(
+            is_active=True, category__is_active=True
+        ).values_list('pk', 'name', 'sku', 'category__name')
+        categories = Category.objects.filter(is_active=True).values_list('pk', 'name')
+
+        product_data = {}
+        product_terms = {}
+        for pk, name, sku, category_name in rows:
+            product_data[pk] = {'id': pk, 'name': name, 'sku': sku, 'category_name': category_name}
+            product_terms[pk] = self.product_terms(name, sku)
+
+        with self.lock:
+            self.popularity = popularity
+            self.results = {}
+            self.product_data = product_data
+            self.products.load(product_terms)
+            self.trigrams.load({
+                pk: f"{data['name']} {data['sku']}" for pk, data in product_data.items()
+            })
+            self.category_data = {pk: {'id': pk, 'name': name} for pk, name in categories}
+            self.categories.load({pk: name_terms(name) for pk, name in categories})
+            self.built_at = time.monotonic()
+        return self
+
+    def is_stale(self):
+        return time.monotonic() - self.built_at > settings.PRODUCT_SUGGEST_REFRESH
+
+    def product_terms(self, name, sku):
+        return name_terms(name) | {normalize(sku)}
+
+    def update_product(self, product):
+        """Add, refresh or drop one product after a save"""
+        if not product.is_active or not product.category.is_active:
+            self.remove_product(product.pk)
+            return
+        with self.lock:
+            self.results.clear()
+            self.product_data[product.pk] = {
+                'id': product.pk, 'name': product.name,
+                'sku': product.sku, 'category_name': product.category.name,
+            }
+            self.products.add(product.pk, self.product_terms(product.name, product.sku))
+            self.trigrams.add(product.pk, f"{product.name} {product.sku}")
+
+    def remove_product(self, pk):
+        with self.lock:
+            self.results.clear()
+            self.product_data.pop(pk, None)
+            self.products.remove(pk)
+            self.trigrams.remove(pk)
+
+    def update_category(self, category):
+        """Refresh a category and the category name of its products"""
+        with self.lock:
+            self.results.clear()
+            if category.is_active:
+                self.category_data[category.pk] = {'id': category.pk, 'name': category.name}
+                self.categories.add(category.pk, name_terms(category.name))
+            else:
+                self.category_data.pop(category.pk, None)
+                self.categories.remove(category.pk)
+        self.refresh_products(
+            Product.objects.filter(category=category).values_list('pk', flat=True)
+        )
+
+    def remove_category(self, pk):
+        with self.lock:
+            self.results.clear()
+            self.category_data.pop(pk, None)
+            self.categories.remove(pk)
+
+    def refresh_products(self, product_ids):
+        """Reload the given products from the database (after bulk writes)"""
+        product_ids = set(product_ids)
+        for product in Product.objects.filter(pk__in=product_ids).select_related('category'):
+            product_ids.discard(product.pk)
+            self.update_product(product)
+        for pk in product_ids:
+            self.remove_product(pk)
+
+    def add_sales(self, product_id, units):
+        with self.lock:
+            self.results.clear()
+            self.popularity[product_id] = self.popularity.get(product_id, 0) + units
+
+    def fuzzy_search(self, query):
+        """Return (product_id, similarity) pairs for a possibly misspelled query, best first"""
+        with self.lock:
+            return self.trigrams.search(query)
+
+    def suggest(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return {'products': [], 'categories': []}
+
+        with self.lock:
+            cached = self.results.get((prefix, limit))
+            if cached is not None:
+                return cached
+
+            popularity = self.popularity
+            product_data = self.product_data
+            ranked = heapq.nsmallest(
+                limit, self.products.match(prefix),
+                key=lambda pk: (-popularity.get(pk, 0), product_data[pk]['name'])
+            )
+            result = {
+                'products': [product_data[pk] for pk in ranked],
+                'categories': sorted(
+                    (self.category_data[pk] for pk in self.categories.match(prefix)),
+                    key=lambda category: category['name']
+                )[:limit],
+            }
+            if len(self.results) >= MAX_CACHED_RESULTS:
+                self.results.clear()
+            self.results[(prefix, limit)] = result
+            return result
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_suggest_index():
+    """Return the process-wide suggest index, building or refreshing it as needed"""
+    global _index
+    if _index is None or _index.is_stale():
+        with _index_lock:
+            if _index is None or _index.is_stale():
+                _index = SuggestIndex().build()
+    return _index
+
+
+def get_built_index():
+    """Return the index only if this process has built one (for incremental updates)"""
+    return _index
+
+
+def fuzzy_search(queryset, query):
+    """Filter and rank a Product queryset by trigram similarity to a (possibly misspelled) query"""
+    matches = get_suggest_index().fuzzy_search(query)
+    if not matches:
+        return queryset.none()
+
+    # Few distinct scores: one CASE branch per score rather than per product
+    by_score = defaultdict(list)
+    for pk, score in matches:
+        by_score[score].append(pk)
+
+    # Negated so that, like the search backends, lower ranks are more relevant
+    return queryset.filter(pk__in=[pk for pk, _ in matches]).annotate(
+        search_rank=Case(
+            *[When(pk__in=pks, then=Value(-score)) for score, pks in by_score.items()],
+            output_field=FloatField(),
+        )
+    ).order_by('search_rank', '-created_at')
+
+
+def search_with_fallback(queryset, query, mode='auto'):
+    """
+    Search a Product queryset through the search backend, falling back to
+    fuzzy matching when nothing matches ('auto'). Mode 'true' always searches
+    fuzzily and 'false' never does. Returns (queryset, fuzzy).
+    """
+    if mode != 'true':
+        results = get_search_backend().search(queryset, query)
+        if mode == 'false' or results.exists():
+            return results, False
+    return fuzzy_search(queryset, query), True
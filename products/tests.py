@@ -1,3 +1,1804 @@
-from django.test import TestCase
+import csv
+import gzip
+import itertools
+import json
+import tempfile
+import threading
+import time
+from base64 import b64encode
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from payments.models import Order, OrderItem, Transaction
+from .cache import bump_versions, get_catalog_cache, get_or_revalidate, get_versions
+from .carts import CART_STORAGES, add_to_cart
+from .copurchase import bought_together, count_pairs, update_copurchases
+from .exporters import ProductExporter
+from .importers import ROW_READERS, PriceStockUpdater, ProductImporter
+from .models import Cart, CartItem, Category, GuestCartMerge, Product, ProductCoPurchase
+from .search import get_search_backend
+from .serializers import CartSerializer, ProductListSerializer
+from .stats import compute_category_stats, compute_product_stats
+from .trigrams import TrigramIndex
 
-# Create your tests here.
+User = get_user_model()
+SKU_SEQUENCE = itertools.count()
+
+
+class CatalogTestMixin:
+    """Helpers creating users, categories and products"""
+
+    def setUp(self):
+        # Catalog versions are bumped on commit, which rolled-back tests never reach
+        get_catalog_cache().clear()
+
+    def create_user(self, name='shopper'):
+        return User.objects.create_user(email=f'{name}@example.com', username=name, password='pass12345')
+
+    def create_admin(self, name='admin'):
+        admin = self.create_user(name)
+        admin.is_staff = True
+        admin.save()
+        return admin
+
+    def create_product(self, name='Phone', category=None, **fields):
+        if category is None:
+            category = Category.objects.get_or_create(name='Phones')[0]
+        fields.setdefault('description', f'About the {name}')
+        fields.setdefault('price', Decimal('100.00'))
+        fields.setdefault('stock_quantity', 10)
+        fields.setdefault('sku', f'SKU-{next(SKU_SEQUENCE):04d}')
+        return Product.objects.create(name=name, category=category, **fields)
+
+    def create_products(self, count=1, stock_quantity=1000):
+        category = Category.objects.create(name='Phones')
+        return [
+            Product.objects.create(
+                name=f'Phone {index}',
+                description='A phone',
+                category=category,
+                price=Decimal('100.00') + index,
+                stock_quantity=stock_quantity,
+                sku=f'PH-{index:04d}',
+            )
+            for index in range(count)
+        ]
+
+    def create_order(self, user, quantities, status='paid'):
+        """Order of {product: quantity} in the given status"""
+        order = Order.objects.create(
+            user=user, status=status, total_amount=Decimal('0.00'),
+            shipping_address='1 Main Street', phone_number='0240000000'
+        )
+        for product, quantity in quantities.items():
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+        return order
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def cart_quantities(self, user):
+        """{product_id: quantity} of a user's cart, read through the API"""
+        response = self.client_for(user).get('/api/v1/products/cart/')
+        return {item['product']['id']: item['quantity'] for item in response.data['items']}
+
+
+class AddToCartConcurrencyTests(CatalogTestMixin, TransactionTestCase):
+    """Parallel adds of one product must never lose an increment"""
+    threads = 8
+    adds_per_thread = 5
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.product, = self.create_products()
+
+    def run_in_threads(self, add):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.adds_per_thread):
+                    add()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def assert_quantity(self, expected):
+        line = CartItem.objects.get(cart__user=self.user, product=self.product)
+        self.assertEqual(line.quantity, expected)
+
+    def test_parallel_add_to_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        self.run_in_threads(lambda: add_to_cart(cart, self.product, 1))
+        self.assert_quantity(self.threads * self.adds_per_thread)
+
+    def test_parallel_add_to_cart_view(self):
+        statuses = []
+
+        def add():
+            response = self.client_for(self.user).post(
+                '/api/v1/products/cart/add/',
+                {'product_id': self.product.pk, 'quantity': 1},
+                format='json',
+            )
+            statuses.append(response.status_code)
+
+        self.run_in_threads(add)
+        self.assertEqual(set(statuses), {201})
+        self.assertEqual(Cart.objects.filter(user=self.user).count(), 1)
+        self.assert_quantity(self.threads * self.adds_per_thread)
+
+    def test_parallel_increment_or_create_fallback(self):
+        cart = Cart.objects.create(user=self.user)
+        # No vendor supports the upsert, forcing the F() increment path
+        with mock.patch('products.carts.UPSERT_VENDORS', ()):
+            self.run_in_threads(lambda: add_to_cart(cart, self.product, 2))
+        self.assert_quantity(self.threads * self.adds_per_thread * 2)
+
+    def test_fallback_creates_then_increments(self):
+        cart = Cart.objects.create(user=self.user)
+        with mock.patch('products.carts.UPSERT_VENDORS', ()):
+            created = add_to_cart(cart, self.product, 3)
+            incremented = add_to_cart(cart, self.product, 4)
+        self.assertEqual(created.pk, incremented.pk)
+        self.assertEqual(incremented.quantity, 7)
+        self.assertEqual(incremented.product, self.product)
+
+
+class GuestCartMergeTests(CatalogTestMixin, TestCase):
+    """Guest carts merge into the user's cart once, capped at stock"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.phone, self.tablet = self.create_products(count=2, stock_quantity=5)
+
+    def guest_token(self, operations):
+        response = APIClient().post(
+            '/api/v1/products/cart/guest/batch/', {'operations': operations}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['token']
+
+    def login(self, token):
+        response = APIClient().post(
+            '/api/v1/auth/login/',
+            {'email': self.user.email, 'password': 'pass12345'},
+            format='json',
+            HTTP_X_GUEST_CART=token,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_login_merges_guest_cart_capped_at_stock(self):
+        self.client_for(self.user).post(
+            '/api/v1/products/cart/add/', {'product_id': self.tablet.pk, 'quantity': 3}, format='json'
+        )
+        token = self.guest_token([
+            {'op': 'add', 'product_id': self.phone.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': self.tablet.pk, 'quantity': 4},
+        ])
+        self.login(token)
+        self.assertEqual(self.cart_quantities(self.user), {self.phone.pk: 2, self.tablet.pk: 5})
+
+    def test_replayed_token_merges_once(self):
+        token = self.guest_token([{'op': 'add', 'product_id': self.phone.pk, 'quantity': 2}])
+        self.login(token)
+        self.login(token)
+        response = self.client_for(self.user).post('/api/v1/products/cart/merge/', HTTP_X_GUEST_CART=token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart_quantities(self.user), {self.phone.pk: 2})
+        self.assertEqual(GuestCartMerge.objects.filter(user=self.user).count(), 1)
+
+    def test_new_guest_cart_merges_again(self):
+        self.login(self.guest_token([{'op': 'add', 'product_id': self.phone.pk, 'quantity': 1}]))
+        self.login(self.guest_token([{'op': 'add', 'product_id': self.phone.pk, 'quantity': 2}]))
+        self.assertEqual(self.cart_quantities(self.user), {self.phone.pk: 3})
+
+    def test_invalid_token_is_ignored(self):
+        token = self.guest_token([{'op': 'add', 'product_id': self.phone.pk, 'quantity': 1}])
+        self.login(token[:-2] + 'xx')
+        self.assertEqual(self.cart_quantities(self.user), {})
+
+
+@override_settings(CART_STORAGE='document')
+class DocumentGuestCartMergeTests(GuestCartMergeTests):
+    """The same merge guarantees with carts stored as documents"""
+
+
+class CartStorageParityTests(CatalogTestMixin, TestCase):
+    """Relational and document storages render the same cart the same way"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.products = self.create_products(count=3)
+        CART_STORAGES['relational']().apply_operations(self.user, [
+            {'op': 'add', 'product_id': product.pk, 'quantity': index + 1}
+            for index, product in enumerate(self.products)
+        ])
+
+    def render(self, mode):
+        cart = CART_STORAGES[mode]().get_cart(self.user)
+        data = CartSerializer(cart).data
+        for item in data['items']:
+            # Item ids are row ids in one storage and product ids in the other
+            item.pop('id')
+        return data
+
+    def test_same_cart_renders_identically(self):
+        relational = self.render('relational')
+        call_command('convert_carts', 'document', stdout=StringIO())
+        self.assertFalse(CartItem.objects.exists())
+        document = self.render('document')
+
+        self.assertEqual(document, relational)
+        self.assertEqual(document['total_items'], 6)
+        self.assertEqual(len(document['items']), 3)
+
+    def test_same_summary(self):
+        relational = CART_STORAGES['relational']().summarize(self.user)
+        call_command('convert_carts', 'document', stdout=StringIO())
+        self.assertEqual(CART_STORAGES['document']().summarize(self.user), relational)
+
+    @override_settings(CART_STORAGE='document')
+    def test_document_read_never_creates_a_cart(self):
+        user = self.create_user('newcomer')
+        response = self.client_for(user).get('/api/v1/products/cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'], [])
+        self.assertIsNone(response.data['id'])
+        self.assertIsNone(response.data['created_at'])
+        self.assertFalse(Cart.objects.filter(user=user).exists())
+
+    @override_settings(CART_STORAGE='document')
+    def test_document_api_matches_relational_api(self):
+        document_user = self.create_user('document')
+        client = self.client_for(document_user)
+        for index, product in enumerate(self.products):
+            response = client.post(
+                '/api/v1/products/cart/add/',
+                {'product_id': product.pk, 'quantity': index + 1},
+                format='json',
+            )
+            self.assertEqual(response.status_code, 201)
+
+        with self.settings(CART_STORAGE='relational'):
+            relational = self.client_for(self.user).get('/api/v1/products/cart/').data
+        document = client.get('/api/v1/products/cart/').data
+
+        ignored = ('id', 'created_at', 'updated_at')
+        for data in (relational, document):
+            for key in ignored:
+                data.pop(key)
+            for item in data['items']:
+                for key in ignored:
+                    item.pop(key)
+        self.assertEqual(document, relational)
+
+
+class SearchIndexTests(CatalogTestMixin, TestCase):
+    """The search index follows product and category writes"""
+
+    def search(self, query):
+        return list(get_search_backend().search(Product.objects.all(), query))
+
+    def test_saved_product_is_indexed(self):
+        product = self.create_product('Galaxy Handset')
+        self.assertEqual(self.search('galaxy'), [product])
+
+    def test_edited_product_is_reindexed(self):
+        product = self.create_product('Galaxy Handset', description='A phone')
+        product.name = 'Pixel Handset'
+        product.save()
+        self.assertEqual(self.search('galaxy'), [])
+        self.assertEqual(self.search('pixel'), [product])
+
+    def test_deleted_product_is_unindexed(self):
+        product = self.create_product('Galaxy Handset')
+        product.delete()
+        self.assertEqual(self.search('galaxy'), [])
+
+    def test_category_rename_reindexes_its_products(self):
+        category = Category.objects.create(name='Phones')
+        product = self.create_product('Galaxy Handset', category=category)
+        category.name = 'Smartphones'
+        category.save()
+        self.assertEqual(self.search('smartphones'), [product])
+        self.assertEqual(self.search('phones'), [])
+
+    def test_prefix_terms_are_all_required(self):
+        product = self.create_product('Galaxy Handset')
+        self.create_product('Galaxy Watch')
+        self.assertEqual(self.search('gal hand'), [product])
+
+    def test_name_matches_rank_above_description_matches(self):
+        in_description = self.create_product('Handset', description='Successor to the galaxy line')
+        in_name = self.create_product('Galaxy Handset', description='A phone')
+        self.assertEqual(self.search('galaxy'), [in_name, in_description])
+
+    def test_search_endpoint_orders_by_relevance(self):
+        in_description = self.create_product('Handset', description='Successor to the galaxy line')
+        in_name = self.create_product('Galaxy Handset', description='A phone')
+        response = APIClient().get('/api/v1/products/search/', {'search': 'galaxy'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product['id'] for product in response.data['results']],
+            [in_name.pk, in_description.pk]
+        )
+
+
+class SearchFacetTests(CatalogTestMixin, TestCase):
+    """Facet counts describe the filtered search results"""
+
+    def setUp(self):
+        super().setUp()
+        self.phones = Category.objects.create(name='Phones')
+        self.laptops = Category.objects.create(name='Laptops')
+        self.create_product('Budget Phone', self.phones, price=Decimal('50.00'))
+        self.create_product('Midrange Phone', self.phones, price=Decimal('300.00'), is_featured=True)
+        self.create_product('Flagship Phone', self.phones, price=Decimal('1200.00'), stock_quantity=0)
+        self.create_product('Gaming Laptop', self.laptops, price=Decimal('2500.00'), discount_price=Decimal('450.00'))
+        self.create_product('Hidden Laptop', self.laptops, is_active=False)
+
+    def get_facets(self, **params):
+        response = APIClient().get('/api/v1/products/search/', {'facets': 'all', **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['facets']
+
+    def test_counts_every_facet(self):
+        facets = self.get_facets()
+        self.assertEqual(
+            [(category['name'], category['count']) for category in facets['category']],
+            [('Phones', 3), ('Laptops', 1)]
+        )
+        # Buckets use the effective (discounted) price
+        self.assertEqual(
+            [(bucket['min'], bucket['max'], bucket['count']) for bucket in facets['price']],
+            [
+                ('0.00', '100.00', 1),
+                ('100.00', '500.00', 2),
+                ('500.00', '1000.00', 0),
+                ('1000.00', '5000.00', 1),
+                ('5000.00', '10000.00', 0),
+                ('10000.00', None, 0),
+            ]
+        )
+        self.assertEqual(facets['featured'], {'true': 1, 'false': 3})
+        self.assertEqual(facets['in_stock'], {'true': 3, 'false': 1})
+
+    def test_counts_follow_the_filters(self):
+        facets = self.get_facets(search='phone', in_stock_only='true')
+        self.assertEqual(
+            [(category['name'], category['count']) for category in facets['category']],
+            [('Phones', 2)]
+        )
+        self.assertEqual(facets['in_stock'], {'true': 2, 'false': 0})
+
+    def test_only_requested_facets_are_returned(self):
+        response = APIClient().get('/api/v1/products/search/', {'facets': 'featured,in_stock'})
+        self.assertEqual(set(response.data['facets']), {'featured', 'in_stock'})
+
+    def test_no_facets_by_default(self):
+        response = APIClient().get('/api/v1/products/search/')
+        self.assertNotIn('facets', response.data)
+
+    def test_unknown_facet_is_rejected(self):
+        response = APIClient().get('/api/v1/products/search/', {'facets': 'category,colour'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('facets', response.data)
+
+
+class KeysetPaginationTests(CatalogTestMixin, TestCase):
+    """Cursor pages walk the whole ordering once, in both directions"""
+
+    def setUp(self):
+        super().setUp()
+        category = Category.objects.create(name='Phones')
+        # Repeated prices force the id tiebreaker to matter
+        for index in range(45):
+            self.create_product(f'Phone {index}', category, price=Decimal('100.00') + index % 4)
+
+    def get(self, url, params=None):
+        response = APIClient().get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def walk(self, params):
+        ids = []
+        page = self.get('/api/v1/products/', {'pagination': 'cursor', **params})
+        ids += [product['id'] for product in page['results']]
+        pages = [page]
+        while page['next']:
+            page = self.get(page['next'])
+            ids += [product['id'] for product in page['results']]
+            pages.append(page)
+        return ids, pages
+
+    def expected_ids(self, *ordering):
+        return list(Product.objects.order_by(*ordering).values_list('id', flat=True))
+
+    def test_forward_walk_matches_ordering(self):
+        ids, pages = self.walk({'ordering': 'price'})
+        self.assertEqual(ids, self.expected_ids('price', 'id'))
+        self.assertEqual([len(page['results']) for page in pages], [20, 20, 5])
+
+    def test_descending_walk_matches_ordering(self):
+        ids, _ = self.walk({'ordering': '-price'})
+        self.assertEqual(ids, self.expected_ids('-price', '-id'))
+
+    def test_previous_link_returns_the_previous_page(self):
+        _, pages = self.walk({'ordering': 'price'})
+        self.assertIsNone(pages[0]['previous'])
+        previous = self.get(pages[2]['previous'])
+        self.assertEqual(previous['results'], pages[1]['results'])
+        self.assertIsNotNone(previous['next'])
+
+    def test_count_can_be_skipped(self):
+        ids, pages = self.walk({'ordering': 'price', 'count': 'false'})
+        self.assertEqual(len(ids), 45)
+        self.assertTrue(all('count' not in page for page in pages))
+
+    def test_page_number_mode_is_the_default(self):
+        page = self.get('/api/v1/products/', {'ordering': 'price', 'page': 3})
+        self.assertEqual(page['count'], 45)
+        self.assertEqual([product['id'] for product in page['results']], self.expected_ids('price', 'id')[40:])
+
+    def assert_rejected(self, cursor):
+        response = APIClient().get('/api/v1/products/', {'ordering': 'price', 'cursor': cursor})
+        self.assertEqual(response.status_code, 404)
+
+    def encode(self, payload):
+        return b64encode(json.dumps(payload).encode()).decode()
+
+    def test_garbage_cursor_is_rejected(self):
+        self.assert_rejected('not-a-cursor')
+
+    def test_cursor_with_wrong_arity_is_rejected(self):
+        self.assert_rejected(self.encode({'v': ['100.00'], 'r': False}))
+
+    def test_cursor_with_uncoercible_values_is_rejected(self):
+        self.assert_rejected(self.encode({'v': ['cheap', 1], 'r': False}))
+        self.assert_rejected(self.encode({'v': [{'price': 1}, 1], 'r': False}))
+        self.assert_rejected(self.encode({'v': [None, 1], 'r': False}))
+
+
+class CategoryCounterTests(CatalogTestMixin, TestCase):
+    """Category.active_products_count follows product writes"""
+
+    def setUp(self):
+        super().setUp()
+        self.phones = Category.objects.create(name='Phones')
+        self.laptops = Category.objects.create(name='Laptops')
+
+    def assert_counts(self, phones, laptops):
+        self.assertEqual(
+            dict(Category.objects.values_list('name', 'active_products_count')),
+            {'Phones': phones, 'Laptops': laptops}
+        )
+
+    def test_create_counts_active_products_only(self):
+        self.create_product('Phone', self.phones)
+        self.create_product('Old Phone', self.phones, is_active=False)
+        self.assert_counts(1, 0)
+
+    def test_deactivate_and_reactivate(self):
+        product = self.create_product('Phone', self.phones)
+        product.is_active = False
+        product.save()
+        self.assert_counts(0, 0)
+        product.is_active = True
+        product.save()
+        self.assert_counts(1, 0)
+
+    def test_move_to_another_category(self):
+        product = self.create_product('Phone', self.phones)
+        product.category = self.laptops
+        product.save()
+        self.assert_counts(0, 1)
+
+    def test_move_inactive_product_leaves_counts(self):
+        product = self.create_product('Phone', self.phones, is_active=False)
+        product.category = self.laptops
+        product.save()
+        self.assert_counts(0, 0)
+
+    def test_unrelated_edits_leave_counts(self):
+        product = self.create_product('Phone', self.phones)
+        product.price = Decimal('150.00')
+        product.save()
+        Product.objects.get(pk=product.pk).save()
+        self.assert_counts(1, 0)
+
+    def test_delete(self):
+        product = self.create_product('Phone', self.phones)
+        self.create_product('Old Phone', self.phones, is_active=False).delete()
+        self.assert_counts(1, 0)
+        product.delete()
+        self.assert_counts(0, 0)
+
+    def test_api_reports_the_counter(self):
+        self.create_product('Phone', self.phones)
+        self.create_product('Old Phone', self.phones, is_active=False)
+        response = APIClient().get(f'/api/v1/products/categories/{self.phones.pk}/')
+        self.assertEqual(response.data['products_count'], 1)
+
+    def test_recount_repairs_drift(self):
+        self.create_product('Phone', self.phones)
+        Category.objects.update(active_products_count=7)
+        call_command('recount_categories', stdout=StringIO())
+        self.assert_counts(1, 0)
+
+
+class CatalogCacheTests(CatalogTestMixin, TestCase):
+    """Cached catalog responses are dropped when a write bumps their scopes"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_product('Galaxy Handset')
+
+    def get(self, url):
+        response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_second_request_is_a_hit(self):
+        self.assertEqual(self.get('/api/v1/products/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/v1/products/')['X-Cache'], 'HIT')
+        self.assertEqual(self.get('/api/v1/products/?ordering=price')['X-Cache'], 'MISS')
+
+    def test_bump_versions_increments_each_scope(self):
+        before = get_versions(['products', 'categories'])
+        bump_versions('products')
+        after = get_versions(['products', 'categories'])
+        self.assertEqual(after['products'], before['products'] + 1)
+        self.assertEqual(after['categories'], before['categories'])
+
+    def test_product_write_bumps_versions_on_commit(self):
+        before = get_versions(['products', f'product:{self.product.pk}'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('150.00')
+            self.product.save()
+        after = get_versions(['products', f'product:{self.product.pk}'])
+        self.assertGreater(after['products'], before['products'])
+        self.assertGreater(after[f'product:{self.product.pk}'], before[f'product:{self.product.pk}'])
+
+    def test_product_write_invalidates_cached_responses(self):
+        url = f'/api/v1/products/{self.product.pk}/'
+        self.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Galaxy Handset 2'
+            self.product.save()
+        response = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['name'], 'Galaxy Handset 2')
+
+    def test_category_write_invalidates_product_responses(self):
+        self.get('/api/v1/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.category.save()
+        self.assertEqual(self.get('/api/v1/products/')['X-Cache'], 'MISS')
+
+    def test_unrelated_product_scope_is_untouched(self):
+        other = self.create_product('Pixel Handset')
+        before = get_versions([f'product:{other.pk}'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.assertEqual(get_versions([f'product:{other.pk}']), before)
+
+    @override_settings(CATALOG_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_caching(self):
+        self.assertNotIn('X-Cache', self.get('/api/v1/products/'))
+        self.assertNotIn('X-Cache', self.get('/api/v1/products/'))
+
+    def test_stats_count_hits_and_misses(self):
+        self.get('/api/v1/products/')
+        self.get('/api/v1/products/')
+        self.get('/api/v1/products/')
+        response = self.client_for(self.create_admin()).get('/api/v1/products/cache/stats/')
+        self.assertEqual(response.data['hits'], 2)
+        self.assertEqual(response.data['misses'], 1)
+        self.assertEqual(response.data['hit_ratio'], round(2 / 3, 4))
+        self.assertEqual(APIClient().get('/api/v1/products/cache/stats/').status_code, 401)
+
+
+class StoredPricingTests(CatalogTestMixin, TestCase):
+    """effective_price and discount_percentage agree between save() and bulk updates"""
+
+    def stored(self, product):
+        return Product.objects.values_list('effective_price', 'discount_percentage').get(pk=product.pk)
+
+    def test_save_stores_pricing(self):
+        discounted = self.create_product('Phone', price=Decimal('200.00'), discount_price=Decimal('150.00'))
+        full_price = self.create_product('Watch', price=Decimal('80.00'))
+        self.assertEqual(self.stored(discounted), (Decimal('150.00'), Decimal('25.00')))
+        self.assertEqual(self.stored(full_price), (Decimal('80.00'), Decimal('0.00')))
+
+    def test_zero_discount_price_is_no_discount(self):
+        product = self.create_product('Phone', price=Decimal('80.00'), discount_price=Decimal('0.00'))
+        self.assertEqual(self.stored(product), (Decimal('80.00'), Decimal('0.00')))
+
+    def test_percentage_rounds_half_up(self):
+        # 0.125% and 0.005% sit exactly on the rounding boundary
+        product = self.create_product('Phone', price=Decimal('8.00'), discount_price=Decimal('7.99'))
+        self.assertEqual(product.discount_percentage, Decimal('0.13'))
+        self.assertEqual(self.stored(product), (Decimal('7.99'), Decimal('0.13')))
+        product = self.create_product('Watch', price=Decimal('200.00'), discount_price=Decimal('199.99'))
+        self.assertEqual(self.stored(product), (Decimal('199.99'), Decimal('0.01')))
+
+    def test_save_with_update_fields_refreshes_pricing(self):
+        product = self.create_product('Phone', price=Decimal('200.00'))
+        product.discount_price = Decimal('100.00')
+        product.save(update_fields=['discount_price'])
+        self.assertEqual(self.stored(product), (Decimal('100.00'), Decimal('50.00')))
+
+    def test_bulk_update_recomputes_pricing(self):
+        product = self.create_product('Phone', price=Decimal('200.00'), discount_price=Decimal('150.00'))
+        Product.objects.filter(pk=product.pk).update(price=Decimal('300.00'))
+        self.assertEqual(self.stored(product), (Decimal('150.00'), Decimal('50.00')))
+        Product.objects.filter(pk=product.pk).update(discount_price=None)
+        self.assertEqual(self.stored(product), (Decimal('300.00'), Decimal('0.00')))
+
+    def test_bulk_update_matches_save(self):
+        pairs = [
+            ('8.00', '7.99'), ('200.00', '199.99'), ('3.00', '2.00'), ('16.00', '15.99'),
+            ('99.99', '33.33'), ('1234.56', '1000.01'), ('7.00', '6.65'), ('0.03', '0.01'),
+        ]
+        products = [self.create_product(f'Product {index}') for index in range(len(pairs))]
+        for product, (price, discount_price) in zip(products, pairs):
+            Product.objects.filter(pk=product.pk).update(
+                price=Decimal(price), discount_price=Decimal(discount_price)
+            )
+        for product in products:
+            product.refresh_from_db()
+            stored = (product.effective_price, product.discount_percentage)
+            product.compute_pricing()
+            self.assertEqual(stored, (product.effective_price, product.discount_percentage))
+
+    def test_price_filters_use_the_effective_price(self):
+        discounted = self.create_product('Phone', price=Decimal('200.00'), discount_price=Decimal('90.00'))
+        self.create_product('Watch', price=Decimal('150.00'))
+        response = APIClient().get('/api/v1/products/', {'max_price': '100'})
+        self.assertEqual([product['id'] for product in response.data['results']], [discounted.pk])
+
+
+class StatsTests(CatalogTestMixin, TestCase):
+    """Stats come from one aggregation (or the rollup) and are served stale-while-revalidate"""
+
+    def setUp(self):
+        super().setUp()
+        self.phones = Category.objects.create(name='Phones')
+        self.laptops = Category.objects.create(name='Laptops')
+        Category.objects.create(name='Archived', is_active=False)
+        self.create_product('Budget Phone', self.phones, price=Decimal('100.00'))
+        self.create_product('Flagship Phone', self.phones, price=Decimal('300.00'), is_featured=True, stock_quantity=0)
+        self.create_product('Old Phone', self.phones, price=Decimal('50.00'), is_active=False)
+        self.create_product('Laptop', self.laptops, price=Decimal('1000.00'))
+
+    def test_product_stats(self):
+        self.assertEqual(compute_product_stats(), {
+            'total_products': 4,
+            'active_products': 3,
+            'featured_products': 1,
+            'out_of_stock': 1,
+            'categories_count': 2,
+            'average_price': Decimal('466.67'),
+        })
+
+    def test_category_stats(self):
+        self.assertEqual(compute_category_stats(self.phones.pk), {
+            'category_name': 'Phones',
+            'total_products': 3,
+            'active_products': 2,
+            'featured_products': 1,
+            'average_price': Decimal('200.00'),
+        })
+        response = APIClient().get('/api/v1/products/categories/0/stats/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_rollup_matches_scan(self):
+        expected = (compute_product_stats(), compute_category_stats(self.phones.pk))
+        with override_settings(PRODUCT_STATS_ROLLUP=True):
+            call_command('rebuild_stats_rollup', stdout=StringIO())
+            self.assertEqual((compute_product_stats(), compute_category_stats(self.phones.pk)), expected)
+
+    @override_settings(PRODUCT_STATS_ROLLUP=True)
+    def test_rollup_follows_product_writes(self):
+        call_command('rebuild_stats_rollup', stdout=StringIO())
+        product = self.create_product('New Phone', self.phones, price=Decimal('500.00'))
+        product.category = self.laptops
+        product.stock_quantity = 0
+        product.save()
+        Product.objects.get(name='Budget Phone').delete()
+        rollup = (compute_product_stats(), compute_category_stats(self.laptops.pk))
+        with override_settings(PRODUCT_STATS_ROLLUP=False):
+            self.assertEqual(rollup, (compute_product_stats(), compute_category_stats(self.laptops.pk)))
+
+    def test_fresh_value_is_served_from_cache(self):
+        compute = mock.Mock(return_value='first')
+        self.assertEqual(get_or_revalidate('test:stats', compute, 60, 600), 'first')
+        compute.return_value = 'second'
+        self.assertEqual(get_or_revalidate('test:stats', compute, 60, 600), 'first')
+        self.assertEqual(compute.call_count, 1)
+
+    def test_stale_value_is_recomputed(self):
+        compute = mock.Mock(return_value='first')
+        get_or_revalidate('test:stats', compute, 60, 600)
+        compute.return_value = 'second'
+        with mock.patch('products.cache.time.time', return_value=time.time() + 61):
+            self.assertEqual(get_or_revalidate('test:stats', compute, 60, 600), 'second')
+        self.assertIsNone(get_catalog_cache().get('test:stats:lock'))
+
+    def test_stale_value_is_served_while_another_request_refreshes(self):
+        compute = mock.Mock(return_value='first')
+        get_or_revalidate('test:stats', compute, 60, 600)
+        get_catalog_cache().add('test:stats:lock', 1)
+        compute.return_value = 'second'
+        with mock.patch('products.cache.time.time', return_value=time.time() + 61):
+            self.assertEqual(get_or_revalidate('test:stats', compute, 60, 600), 'first')
+        self.assertEqual(compute.call_count, 1)
+
+    def test_endpoint_serves_cached_stats(self):
+        first = APIClient().get('/api/v1/products/stats/').data
+        self.create_product('New Phone', self.phones)
+        self.assertEqual(APIClient().get('/api/v1/products/stats/').data, first)
+        self.assertEqual(first['active_products'], 3)
+
+
+class ProductImportTests(CatalogTestMixin, TestCase):
+    """Bulk import upserts by SKU and reports bad rows without failing the file"""
+    header = 'sku,name,description,category_name,price,discount_price,stock_quantity\n'
+
+    def setUp(self):
+        super().setUp()
+        self.phones = Category.objects.create(name='Phones')
+        self.client = self.client_for(self.create_admin())
+
+    def upload(self, content, name='products.csv', **data):
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        upload = SimpleUploadedFile(name, content)
+        return self.client.post(
+            '/api/v1/products/admin/products/import/', {'file': upload, **data}, format='multipart'
+        )
+
+    def test_creates_and_updates_by_sku(self):
+        existing = self.create_product('Old Name', self.phones, sku='PH-1', price=Decimal('100.00'))
+        response = self.upload(
+            self.header +
+            'ph-1,New Name,Updated,Phones,120.00,90.00,5\n'
+            'PH-2,Second Phone,Brand new,phones,80.00,,3\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            (response.data['created'], response.data['updated'], response.data['failed']), (1, 1, 0)
+        )
+        existing.refresh_from_db()
+        self.assertEqual(
+            (existing.name, existing.price, existing.effective_price, existing.discount_percentage),
+            ('New Name', Decimal('120.00'), Decimal('90.00'), Decimal('25.00'))
+        )
+        created = Product.objects.get(sku='PH-2')
+        self.assertEqual((created.category, created.effective_price), (self.phones, Decimal('80.00')))
+
+    def test_derived_data_is_refreshed(self):
+        self.upload(self.header + 'PH-1,Galaxy Handset,A phone,Phones,120.00,,5\n')
+        self.phones.refresh_from_db()
+        self.assertEqual(self.phones.active_products_count, 1)
+        self.assertEqual(
+            [product.sku for product in get_search_backend().search(Product.objects.all(), 'galaxy')],
+            ['PH-1']
+        )
+
+    def test_bad_rows_are_reported(self):
+        response = self.upload(
+            self.header +
+            'PH-1,Phone,A phone,Phones,120.00,,5\n'
+            'PH-2,Phone,A phone,Phones,cheap,,5\n'
+            'PH-3,Phone,A phone,Tablets,120.00,,5\n'
+            'PH-4,Phone,A phone,Phones,120.00,150.00,5\n'
+            'ph-1,Phone,A phone,Phones,130.00,,5\n'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(
+            [(error['row'], error['sku'], list(error['errors'])) for error in response.data['errors']],
+            [
+                (3, 'PH-2', ['price']),
+                (4, 'PH-3', ['category']),
+                (5, 'PH-4', ['discount_price']),
+                (6, 'PH-1', ['sku']),
+            ]
+        )
+        self.assertEqual(Product.objects.get(sku='PH-1').price, Decimal('120.00'))
+
+    def test_existing_skus_can_be_rejected(self):
+        self.create_product('Old Name', self.phones, sku='PH-1')
+        response = self.upload(self.header + 'PH-1,New Name,A phone,Phones,120.00,,5\n', update_existing='false')
+        self.assertEqual((response.data['updated'], response.data['failed']), (0, 1))
+        self.assertEqual(Product.objects.get(sku='PH-1').name, 'Old Name')
+
+    def test_ndjson(self):
+        response = self.upload(
+            '{"sku": "PH-1", "name": "Phone", "description": "A phone", "category": %d, "price": "99.50"}\n'
+            'not json\n'
+            '[1, 2]\n' % self.phones.pk,
+            name='products.ndjson'
+        )
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertEqual(Product.objects.get(sku='PH-1').price, Decimal('99.50'))
+
+    def test_invalid_utf8_is_a_bad_request(self):
+        response = self.upload(
+            (self.header + 'PH-1,Phone,A phone,Phones,120.00,,5\n').encode('utf-8') +
+            b'PH-2,Caf\xe9,A phone,Phones,120.00,,5\n'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(response.data['errors'][-1]['row'])
+        self.assertIn('not valid UTF-8', response.data['errors'][-1]['errors']['file'][0])
+
+    def test_batches_before_invalid_utf8_are_kept(self):
+        def lines():
+            yield self.header
+            yield 'PH-1,Phone,A phone,Phones,120.00,,5\n'
+            yield 'PH-2,Phone,A phone,Phones,120.00,,5\n'
+            raise UnicodeDecodeError('utf-8', b'\xe9', 0, 1, 'invalid continuation byte')
+
+        importer = ProductImporter(batch_size=1)
+        report = importer.run(ROW_READERS['csv'](lines()))
+        self.assertTrue(importer.decode_failed)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_command_fails_on_invalid_utf8(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as upload:
+            upload.write(self.header.encode('utf-8') + b'PH-1,Caf\xe9,A phone,Phones,120.00,,5\n')
+            upload.flush()
+            with self.assertRaisesMessage(CommandError, 'not valid UTF-8'):
+                call_command('import_products', upload.name, stdout=StringIO(), stderr=StringIO())
+
+    def test_requires_admin(self):
+        upload = SimpleUploadedFile('products.csv', self.header.encode('utf-8'))
+        response = self.client_for(self.create_user()).post(
+            '/api/v1/products/admin/products/import/', {'file': upload}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class PriceStockUpdateTests(CatalogTestMixin, TestCase):
+    """Bulk price/stock updates through UPDATE ... FROM (VALUES ...)"""
+
+    def setUp(self):
+        super().setUp()
+        self.phone = self.create_product('Phone', sku='PH-1', price=Decimal('100.00'), stock_quantity=5)
+        self.watch = self.create_product(
+            'Watch', sku='WA-1', price=Decimal('80.00'), discount_price=Decimal('60.00'), stock_quantity=2
+        )
+
+    def run_updates(self, items):
+        return PriceStockUpdater(chunk_size=1).run(items)
+
+    def test_updates_prices_and_stock(self):
+        report = self.run_updates([
+            {'sku': 'PH-1', 'price': Decimal('120.00'), 'discount_price': Decimal('90.00')},
+            {'sku': 'WA-1', 'stock_quantity': 0},
+        ])
+        self.assertEqual(report, {'updated': 2, 'unknown_skus': [], 'failed': 0, 'errors': []})
+        self.phone.refresh_from_db()
+        self.watch.refresh_from_db()
+        self.assertEqual(
+            (self.phone.price, self.phone.effective_price, self.phone.discount_percentage, self.phone.stock_quantity),
+            (Decimal('120.00'), Decimal('90.00'), Decimal('25.00'), 5)
+        )
+        self.assertEqual(
+            (self.watch.price, self.watch.effective_price, self.watch.stock_quantity),
+            (Decimal('80.00'), Decimal('60.00'), 0)
+        )
+
+    def test_clearing_the_discount(self):
+        self.run_updates([{'sku': 'WA-1', 'discount_price': None}])
+        self.watch.refresh_from_db()
+        self.assertEqual((self.watch.effective_price, self.watch.discount_percentage), (Decimal('80.00'), Decimal('0.00')))
+
+    def test_later_rows_override_earlier_ones(self):
+        self.run_updates([
+            {'sku': 'PH-1', 'price': Decimal('120.00'), 'stock_quantity': 1},
+            {'sku': 'PH-1', 'price': Decimal('130.00')},
+        ])
+        self.phone.refresh_from_db()
+        self.assertEqual((self.phone.price, self.phone.stock_quantity), (Decimal('130.00'), 1))
+
+    def test_unknown_skus_and_invalid_discounts_are_reported(self):
+        report = self.run_updates([
+            {'sku': 'NOPE-1', 'stock_quantity': 1},
+            {'sku': 'WA-1', 'price': Decimal('50.00')},
+            {'sku': 'PH-1', 'stock_quantity': 9},
+        ])
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(report['unknown_skus'], ['NOPE-1'])
+        self.assertEqual([error['sku'] for error in report['errors']], ['WA-1'])
+        self.watch.refresh_from_db()
+        self.assertEqual(self.watch.price, Decimal('80.00'))
+
+    def test_updated_at_is_touched(self):
+        before = self.phone.updated_at
+        self.run_updates([{'sku': 'PH-1', 'stock_quantity': 9}])
+        self.phone.refresh_from_db()
+        self.assertGreater(self.phone.updated_at, before)
+
+    def test_cached_responses_are_invalidated(self):
+        before = get_versions(['products'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_updates([{'sku': 'PH-1', 'stock_quantity': 9}])
+        self.assertGreater(get_versions(['products'])['products'], before['products'])
+
+    def test_endpoint(self):
+        response = self.client_for(self.create_admin()).post(
+            '/api/v1/products/admin/products/bulk-update/',
+            {'items': [{'sku': 'ph-1', 'price': '110.00'}, {'sku': 'NOPE-1', 'stock_quantity': 1}]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['unknown_skus']), (1, ['NOPE-1']))
+        self.phone.refresh_from_db()
+        self.assertEqual(self.phone.effective_price, Decimal('110.00'))
+
+
+@mock.patch('products.importers.UPDATE_FROM_VENDORS', ())
+class CaseExpressionPriceStockUpdateTests(PriceStockUpdateTests):
+    """The same updates through CASE expressions (databases without UPDATE ... FROM)"""
+
+
+class ProductBatchLookupTests(CatalogTestMixin, TestCase):
+    """Batch lookups keep the requested order and list what was not found"""
+
+    def setUp(self):
+        super().setUp()
+        self.phone = self.create_product('Phone', sku='PH-1')
+        self.watch = self.create_product('Watch', sku='WA-1')
+        self.hidden = self.create_product('Hidden', sku='HI-1', is_active=False)
+
+    def get(self, **params):
+        return APIClient().get('/api/v1/products/batch/', params)
+
+    def test_lookup_by_sku_reports_missing_skus(self):
+        response = self.get(skus='wa-1, NOPE-1,PH-1,HI-1,WA-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([product['sku'] for product in response.data['results']], ['WA-1', 'PH-1'])
+        self.assertEqual(response.data['missing'], ['NOPE-1', 'HI-1'])
+
+    def test_lookup_by_id(self):
+        response = self.get(ids=f'{self.watch.pk},0,{self.phone.pk}')
+        self.assertEqual([product['id'] for product in response.data['results']], [self.watch.pk, self.phone.pk])
+        self.assertEqual(response.data['missing'], [0])
+
+    def test_all_missing(self):
+        response = self.get(skus='NOPE-1,NOPE-2')
+        self.assertEqual((response.data['results'], response.data['missing']), ([], ['NOPE-1', 'NOPE-2']))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get().status_code, 400)
+        self.assertEqual(self.get(skus=' , ').status_code, 400)
+        self.assertEqual(self.get(ids='1,two').status_code, 400)
+        self.assertEqual(self.get(skus=','.join(f'SKU-{index}' for index in range(101))).status_code, 400)
+
+    def test_single_sku_endpoint(self):
+        response = APIClient().get('/api/v1/products/sku/PH-1/')
+        self.assertEqual(response.data['id'], self.phone.pk)
+        self.assertEqual(APIClient().get('/api/v1/products/sku/NOPE-1/').status_code, 404)
+
+
+class CompareProductsTests(CatalogTestMixin, TestCase):
+    """The comparison matrix follows the requested order and highlights extremes"""
+
+    def setUp(self):
+        super().setUp()
+        self.cheap = self.create_product('Cheap', price=Decimal('100.00'), stock_quantity=5, weight=Decimal('0.20'))
+        self.sale = self.create_product(
+            'Sale', price=Decimal('300.00'), discount_price=Decimal('100.00'), stock_quantity=0
+        )
+        self.premium = self.create_product('Premium', price=Decimal('900.00'), stock_quantity=5, weight=Decimal('0.50'))
+
+    def compare(self, *products):
+        response = APIClient().get('/api/v1/products/compare/', {'ids': ','.join(str(pk) for pk in products)})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_columns_follow_the_requested_order(self):
+        data = self.compare(self.premium.pk, self.cheap.pk, 0)
+        self.assertEqual([product['id'] for product in data['products']], [self.premium.pk, self.cheap.pk])
+        self.assertEqual(data['matrix']['price'], ['900.00', '100.00'])
+        self.assertEqual(data['matrix']['weight'], ['0.50', '0.20'])
+        self.assertEqual(data['matrix']['category'], ['Phones', 'Phones'])
+        self.assertEqual(data['missing'], [0])
+
+    def test_highlights_include_ties_and_skip_missing_values(self):
+        data = self.compare(self.cheap.pk, self.sale.pk, self.premium.pk)
+        highlights = {
+            field: {bound: sorted(ids) for bound, ids in extremes.items()}
+            for field, extremes in data['highlights'].items()
+        }
+        self.assertEqual(highlights['effective_price'], {'min': [self.cheap.pk, self.sale.pk], 'max': [self.premium.pk]})
+        self.assertEqual(highlights['price'], {'min': [self.cheap.pk], 'max': [self.premium.pk]})
+        self.assertEqual(highlights['stock_quantity'], {'min': [self.sale.pk], 'max': [self.cheap.pk, self.premium.pk]})
+        self.assertEqual(highlights['weight'], {'min': [self.cheap.pk], 'max': [self.premium.pk]})
+        self.assertEqual(highlights['discount_percentage']['max'], [self.sale.pk])
+
+    def test_order_does_not_change_highlights(self):
+        forward = self.compare(self.cheap.pk, self.sale.pk, self.premium.pk)
+        backward = self.compare(self.premium.pk, self.sale.pk, self.cheap.pk)
+        self.assertEqual(forward['highlights'], backward['highlights'])
+
+    def test_product_edits_refresh_the_comparison(self):
+        self.compare(self.cheap.pk, self.premium.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheap.price = Decimal('1000.00')
+            self.cheap.save()
+        data = self.compare(self.cheap.pk, self.premium.pk)
+        self.assertEqual(data['highlights']['price'], {'min': [self.premium.pk], 'max': [self.cheap.pk]})
+
+    def test_needs_two_to_ten_ids(self):
+        self.assertEqual(APIClient().get('/api/v1/products/compare/', {'ids': self.cheap.pk}).status_code, 400)
+        ids = ','.join(str(pk) for pk in range(1, 12))
+        self.assertEqual(APIClient().get('/api/v1/products/compare/', {'ids': ids}).status_code, 400)
+        self.assertEqual(APIClient().get('/api/v1/products/compare/', {'ids': '1,x'}).status_code, 400)
+
+
+class WishlistTests(CatalogTestMixin, TestCase):
+    """Wishlist add/remove/check work on batches and ignore repeats"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        self.phone, self.watch, self.tablet = self.create_products(3)
+        self.hidden = self.create_product('Hidden', is_active=False)
+
+    def add(self, *product_ids):
+        return self.client.post('/api/v1/products/wishlist/add/', {'product_ids': list(product_ids)}, format='json')
+
+    def wishlisted(self):
+        return [item['product']['id'] for item in self.client.get('/api/v1/products/wishlist/').data]
+
+    def test_add_skips_repeats_and_unavailable_products(self):
+        response = self.add(self.phone.pk, self.watch.pk, self.phone.pk, self.hidden.pk, 999999)
+        self.assertEqual(response.data, {'added': [self.phone.pk, self.watch.pk], 'not_found': [self.hidden.pk, 999999]})
+        self.add(self.phone.pk)
+        self.assertCountEqual(self.wishlisted(), [self.phone.pk, self.watch.pk])
+
+    def test_remove(self):
+        self.add(self.phone.pk, self.watch.pk)
+        response = self.client.post(
+            '/api/v1/products/wishlist/remove/', {'product_ids': [self.phone.pk, self.tablet.pk]}, format='json'
+        )
+        self.assertEqual(response.data, {'removed': 1})
+        self.assertEqual(self.wishlisted(), [self.watch.pk])
+
+    def test_check(self):
+        self.add(self.watch.pk)
+        response = self.client.get('/api/v1/products/wishlist/check/', {'ids': f'{self.phone.pk},{self.watch.pk}'})
+        self.assertEqual(response.data, {'results': {str(self.phone.pk): False, str(self.watch.pk): True}})
+        self.assertEqual(self.client.get('/api/v1/products/wishlist/check/').status_code, 400)
+
+    def test_wishlists_are_per_user(self):
+        self.add(self.phone.pk)
+        other = self.client_for(self.create_user('other'))
+        self.assertEqual(other.get('/api/v1/products/wishlist/').data, [])
+
+    def test_list_shows_current_prices(self):
+        self.add(self.phone.pk)
+        self.phone.discount_price = Decimal('50.00')
+        self.phone.save()
+        item, = self.client.get('/api/v1/products/wishlist/').data
+        self.assertEqual(item['product']['effective_price'], '50.00')
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get('/api/v1/products/wishlist/').status_code, 401)
+
+
+class ConditionalGetTests(CatalogTestMixin, TestCase):
+    """ETag and If-Modified-Since answers on catalog and cart endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        self.phone, self.watch = self.create_products(2)
+        # Backdate so later writes land in a later second
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Category.objects.update(updated_at=an_hour_ago)
+        Product.objects.update(updated_at=an_hour_ago)
+
+    def get(self, url, client=None, **headers):
+        return (client or APIClient()).get(url, **headers)
+
+    def write(self, change):
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+
+    def test_product_detail_etag(self):
+        url = f'/api/v1/products/{self.phone.pk}/'
+        first = self.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.phone.refresh_from_db()
+        self.phone.stock_quantity = 3
+        self.write(self.phone.save)
+        second = self.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+
+    def test_product_detail_if_modified_since(self):
+        url = f'/api/v1/products/{self.phone.pk}/'
+        first = self.get(url)
+        self.assertEqual(self.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+        self.phone.refresh_from_db()
+        self.phone.name = 'Renamed'
+        self.write(self.phone.save)
+        self.assertEqual(self.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 200)
+
+    def test_product_detail_sees_category_counter_changes(self):
+        url = f'/api/v1/products/{self.phone.pk}/'
+        first = self.get(url)
+        self.watch.refresh_from_db()
+        self.watch.is_active = False
+        self.write(self.watch.save)
+        second = self.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['category_details']['products_count'], 1)
+
+    def test_category_list_etag(self):
+        url = '/api/v1/products/categories/'
+        first = self.get(url)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.watch.refresh_from_db()
+        self.watch.is_active = False
+        self.write(self.watch.save)
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_cart_etag(self):
+        user = self.create_user()
+        client = self.client_for(user)
+        client.post('/api/v1/products/cart/add/', {'product_id': self.phone.pk, 'quantity': 1}, format='json')
+        client.post('/api/v1/products/cart/add/', {'product_id': self.watch.pk, 'quantity': 1}, format='json')
+        first = self.get('/api/v1/products/cart/', client)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.get('/api/v1/products/cart/', client, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        newest = max(first.data['items'], key=lambda item: item['updated_at'])
+        client.delete(f"/api/v1/products/cart/items/{newest['id']}/remove/")
+        second = self.get('/api/v1/products/cart/', client, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(len(second.data['items']), 1)
+
+
+class SparseFieldsetTests(CatalogTestMixin, TestCase):
+    """?fields= and ?omit= prune responses and reject unknown names"""
+
+    def setUp(self):
+        super().setUp()
+        self.phone = self.create_product('Phone', price=Decimal('200.00'), discount_price=Decimal('150.00'))
+
+    def get(self, url, **params):
+        return APIClient().get(url, params)
+
+    def test_fields_keeps_only_the_requested_fields(self):
+        response = self.get(f'/api/v1/products/{self.phone.pk}/', fields='id,name,savings_amount')
+        self.assertEqual(response.data, {'id': self.phone.pk, 'name': 'Phone', 'savings_amount': 'GHS 50.00'})
+
+    def test_omit_drops_fields(self):
+        response = self.get(f'/api/v1/products/{self.phone.pk}/', omit='description,category_details')
+        self.assertNotIn('description', response.data)
+        self.assertNotIn('category_details', response.data)
+        self.assertEqual(response.data['category_name'], 'Phones')
+
+    def test_list_endpoints_prune_every_item(self):
+        response = self.get('/api/v1/products/', fields='id,effective_price')
+        self.assertEqual(response.data['results'], [{'id': self.phone.pk, 'effective_price': '150.00'}])
+
+    def test_narrowed_queryset_needs_no_extra_queries(self):
+        self.create_product('Watch')
+        with self.assertNumQueries(2):
+            self.get('/api/v1/products/search/', fields='id,name,category_name')
+
+    def test_unknown_field_is_rejected(self):
+        response = self.get(f'/api/v1/products/{self.phone.pk}/', fields='id,colour')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colour', response.data['fields'][0])
+        self.assertIn('Valid fields are', response.data['fields'][0])
+
+    def test_unknown_omitted_field_is_rejected(self):
+        response = self.get('/api/v1/products/', omit='colour')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('omit', response.data)
+
+
+class CompiledRendererTests(CatalogTestMixin, TestCase):
+    """Compiled list rendering produces exactly the serializer's JSON"""
+
+    def setUp(self):
+        super().setUp()
+        self.phones = Category.objects.create(name='Phones')
+        self.create_product('Phone', self.phones, price=Decimal('1234.50'), discount_price=Decimal('999.99'), is_featured=True)
+        self.create_product('Watch', self.phones, price=Decimal('80.00'), stock_quantity=0)
+        self.create_product('Tablet', self.phones, price=Decimal('12345678.90'), is_featured=True)
+
+    def assert_same_json(self, url, **params):
+        with mock.patch.object(ProductListSerializer, 'to_representation', side_effect=AssertionError):
+            compiled = APIClient().get(url, params)
+        get_catalog_cache().clear()
+        with override_settings(PRODUCT_COMPILED_SERIALIZATION=False):
+            serialized = APIClient().get(url, params)
+        self.assertEqual(compiled.status_code, 200)
+        self.assertEqual(compiled.content, serialized.content)
+
+    def test_product_list(self):
+        self.assert_same_json('/api/v1/products/')
+        self.assert_same_json('/api/v1/products/', ordering='-effective_price')
+
+    def test_featured_and_category_lists(self):
+        self.assert_same_json('/api/v1/products/featured/')
+        self.assert_same_json(f'/api/v1/products/categories/{self.phones.pk}/products/')
+
+    def test_sparse_fieldsets(self):
+        self.assert_same_json('/api/v1/products/', fields='id,price_formatted,is_in_stock,created_at')
+        self.assert_same_json('/api/v1/products/', omit='category_name,discount_price')
+
+    def test_cursor_pages(self):
+        self.assert_same_json('/api/v1/products/', pagination='cursor', ordering='price')
+
+    @override_settings(TIME_ZONE='UTC')
+    def test_datetimes_in_another_timezone(self):
+        self.assert_same_json('/api/v1/products/')
+
+
+class SuggestTests(CatalogTestMixin, TestCase):
+    """Autocomplete ranks every prefix match by units sold"""
+
+    def setUp(self):
+        super().setUp()
+        self.phones = Category.objects.create(name='Phones')
+        self.user = self.create_user()
+        patcher = mock.patch('products.suggest._index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def suggest(self, query, **params):
+        response = APIClient().get('/api/v1/products/suggest/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_matches_name_words_skus_and_categories(self):
+        galaxy = self.create_product('Samsung Galaxy S24', self.phones, sku='SG-S24')
+        data = self.suggest('gal')
+        self.assertEqual([product['id'] for product in data['products']], [galaxy.pk])
+        self.assertEqual([product['id'] for product in self.suggest('sg-s')['products']], [galaxy.pk])
+        self.assertEqual([category['name'] for category in self.suggest('pho')['categories']], ['Phones'])
+        self.assertEqual(self.suggest('tab'), {'query': 'tab', 'products': [], 'categories': []})
+
+    def test_ranks_by_units_sold(self):
+        quiet = self.create_product('Galaxy A', self.phones)
+        popular = self.create_product('Galaxy B', self.phones)
+        steady = self.create_product('Galaxy C', self.phones)
+        self.create_order(self.user, {popular: 5, steady: 2})
+        self.create_order(self.user, {quiet: 50}, status='cancelled')
+        self.assertEqual(
+            [product['id'] for product in self.suggest('galaxy')['products']],
+            [popular.pk, steady.pk, quiet.pk]
+        )
+
+    def test_best_sellers_win_among_many_matches(self):
+        products = [self.create_product(f'Galaxy {index:03d}', self.phones) for index in range(300)]
+        best = products[-1]
+        self.create_order(self.user, {best: 3})
+        data = self.suggest('galaxy', limit=5)
+        self.assertEqual(len(data['products']), 5)
+        self.assertEqual(data['products'][0]['id'], best.pk)
+
+    def test_inactive_products_are_not_suggested(self):
+        self.create_product('Galaxy Old', self.phones, is_active=False)
+        self.assertEqual(self.suggest('galaxy')['products'], [])
+
+    def test_index_follows_product_writes(self):
+        product = self.create_product('Galaxy', self.phones)
+        self.suggest('galaxy')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Pixel'
+            product.save()
+        self.assertEqual(self.suggest('galaxy')['products'], [])
+        self.assertEqual([item['name'] for item in self.suggest('pix')['products']], ['Pixel'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_order(self.user, {self.create_product('Pixel Pro', self.phones): 1})
+        self.assertEqual([item['name'] for item in self.suggest('pix')['products']], ['Pixel Pro', 'Pixel'])
+
+    def test_invalid_limit(self):
+        response = APIClient().get('/api/v1/products/suggest/', {'q': 'gal', 'limit': 'ten'})
+        self.assertEqual(response.status_code, 400)
+
+
+class FuzzySearchTests(CatalogTestMixin, TestCase):
+    """Misspelled searches fall back to trigram matching"""
+
+    def setUp(self):
+        super().setUp()
+        self.galaxy = self.create_product('Samsung Galaxy', description='A phone')
+        self.headphones = self.create_product('Wireless Headphones', description='Over-ear')
+        patcher = mock.patch('products.suggest._index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def search(self, query, **params):
+        response = APIClient().get('/api/v1/products/search/', {'search': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [product['id'] for product in response.data['results']], response.data['fuzzy']
+
+    def test_exact_matches_do_not_fall_back(self):
+        self.assertEqual(self.search('galaxy'), ([self.galaxy.pk], False))
+
+    def test_typos_fall_back_to_fuzzy_matches(self):
+        self.assertEqual(self.search('samsnug galxy'), ([self.galaxy.pk], True))
+        self.assertEqual(self.search('hedphones'), ([self.headphones.pk], True))
+
+    def test_fuzzy_matches_are_ranked_by_similarity(self):
+        closer = self.create_product('Galaxy Buds', description='Earbuds')
+        ids, fuzzy = self.search('galaxy buts')
+        self.assertEqual(ids[0], closer.pk)
+        self.assertIn(self.galaxy.pk, ids)
+
+    def test_fallback_keeps_the_other_filters(self):
+        self.headphones.stock_quantity = 0
+        self.headphones.save()
+        self.assertEqual(self.search('hedphones', in_stock_only='true'), ([], True))
+
+    def test_fuzzy_can_be_forced_or_disabled(self):
+        self.assertEqual(self.search('galxy', fuzzy='false'), ([], False))
+        self.assertEqual(self.search('galaxy', fuzzy='true'), ([self.galaxy.pk], True))
+
+    def test_unrelated_queries_find_nothing(self):
+        self.assertEqual(self.search('refrigerator'), ([], True))
+
+    def test_trigram_index_drops_removed_words(self):
+        index = TrigramIndex()
+        index.add(1, 'Samsung Galaxy')
+        index.add(2, 'Galaxy Buds')
+        index.remove(1)
+        self.assertEqual([pk for pk, _ in index.search('galaxy')], [2])
+        self.assertEqual(index.search('samsung'), [])
+        self.assertNotIn('samsung', index.word_trigrams)
+
+
+class PriceHistogramTests(CatalogTestMixin, TestCase):
+    """Histogram bins and percentiles of effective prices"""
+
+    def setUp(self):
+        super().setUp()
+        self.phones = Category.objects.create(name='Phones')
+        for price in range(10, 101, 10):
+            self.create_product(f'Phone {price}', self.phones, price=Decimal(price))
+
+    def histogram(self, **params):
+        response = APIClient().get('/api/v1/products/price-histogram/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_bins_and_percentiles(self):
+        data = self.histogram(bins=3)
+        self.assertEqual(
+            (data['count'], data['min'], data['max'], data['mean']), (10, '10.00', '100.00', '55.00')
+        )
+        self.assertEqual(data['bins'], [
+            {'min': '10.00', 'max': '40.00', 'count': 3},
+            {'min': '40.00', 'max': '70.00', 'count': 3},
+            {'min': '70.00', 'max': '100.00', 'count': 4},
+        ])
+        self.assertEqual(data['percentiles'], {
+            'p10': '19.00', 'p25': '32.50', 'p50': '55.00', 'p75': '77.50', 'p90': '91.00',
+        })
+
+    def test_uses_the_effective_price(self):
+        product = Product.objects.get(name='Phone 100')
+        product.discount_price = Decimal('5.00')
+        product.save()
+        data = self.histogram(bins=2)
+        self.assertEqual((data['min'], data['max']), ('5.00', '90.00'))
+
+    def test_filters(self):
+        laptops = Category.objects.create(name='Laptops')
+        self.create_product('Laptop', laptops, price=Decimal('900.00'), is_featured=True)
+        self.create_product('Sold Out Laptop', laptops, price=Decimal('700.00'), stock_quantity=0)
+        self.assertEqual(self.histogram(category=laptops.pk)['count'], 2)
+        self.assertEqual(self.histogram(category=laptops.pk, in_stock_only='true')['max'], '900.00')
+        self.assertEqual(self.histogram(is_featured='true')['count'], 1)
+        self.assertEqual(self.histogram(search='laptop')['count'], 2)
+
+    def test_single_price_is_one_bin(self):
+        laptops = Category.objects.create(name='Laptops')
+        self.create_product('Laptop', laptops, price=Decimal('900.00'))
+        self.create_product('Laptop 2', laptops, price=Decimal('900.00'))
+        data = self.histogram(category=laptops.pk)
+        self.assertEqual(data['bins'], [{'min': '900.00', 'max': '900.00', 'count': 2}])
+        self.assertEqual(data['percentiles']['p90'], '900.00')
+
+    def test_no_products(self):
+        data = self.histogram(category=0)
+        self.assertEqual(data, {'count': 0, 'min': None, 'max': None, 'mean': None, 'percentiles': {}, 'bins': []})
+
+    def test_invalid_parameters(self):
+        for params in ({'bins': 0}, {'bins': 101}, {'bins': 'ten'}, {'category': 'phones'}):
+            response = APIClient().get('/api/v1/products/price-histogram/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+class CoPurchaseTests(CatalogTestMixin, TestCase):
+    """Incremental co-purchase runs add up to a full rebuild"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.a, self.b, self.c, self.d = self.create_products(4)
+        self.start = timezone.now()
+
+    @contextmanager
+    def at(self, minutes):
+        """Run with the clock set `minutes` after the test started"""
+        moment = self.start + timedelta(minutes=minutes)
+        with mock.patch('payments.models.timezone.now', return_value=moment), \
+                mock.patch('products.copurchase.timezone.now', return_value=moment):
+            yield
+
+    def matrix(self):
+        return set(ProductCoPurchase.objects.values_list('product_id', 'related_id', 'orders', 'rank'))
+
+    def test_full_run_counts_distinct_orders_per_pair(self):
+        with self.at(0):
+            self.create_order(self.user, {self.a: 1, self.b: 2})
+            self.create_order(self.user, {self.a: 1, self.b: 1, self.c: 1})
+            self.create_order(self.user, {self.a: 3, self.c: 1})
+            self.create_order(self.user, {self.c: 1, self.d: 1}, status='cancelled')
+        with self.at(5):
+            run = update_copurchases(full=True)
+        self.assertEqual((run.orders, run.pairs), (3, 3))
+        self.assertEqual(
+            [(product.pk, orders) for product, orders in bought_together([self.a.pk])],
+            [(self.b.pk, 2), (self.c.pk, 2)]
+        )
+        self.assertEqual(
+            [(product.pk, orders) for product, orders in bought_together([self.b.pk, self.c.pk])],
+            [(self.a.pk, 4)]
+        )
+
+    def test_orders_still_settling_wait_for_the_next_run(self):
+        with self.at(0):
+            self.create_order(self.user, {self.a: 1, self.b: 1})
+            self.assertEqual(update_copurchases().orders, 0)
+        with self.at(5):
+            self.assertEqual(update_copurchases().orders, 1)
+            self.assertEqual(update_copurchases().orders, 0)
+
+    def test_incremental_runs_match_a_full_rebuild(self):
+        with self.at(0):
+            self.create_order(self.user, {self.a: 1, self.b: 1})
+            pending = self.create_order(self.user, {self.b: 1, self.c: 1}, status='pending')
+            # Gateway payment succeeded now; the status is only updated later
+            Transaction.objects.create(
+                order=pending, user=self.user, reference='REF-1', amount=Decimal('10.00'),
+                status='success', paid_at=timezone.now()
+            )
+        with self.at(5):
+            update_copurchases()
+        with self.at(10):
+            pending.status = 'paid'
+            pending.save()
+            # Marked paid by hand, with no gateway payment
+            self.create_order(self.user, {self.a: 1, self.c: 1, self.d: 1})
+            self.create_order(self.user, {self.a: 1, self.b: 1}, status='shipped')
+        with self.at(15):
+            self.assertEqual(update_copurchases().orders, 3)
+            incremental = self.matrix()
+            self.assertEqual(update_copurchases(full=True).orders, 4)
+        self.assertEqual(incremental, self.matrix())
+
+    def test_later_status_changes_are_not_counted_twice(self):
+        with self.at(0):
+            order = self.create_order(self.user, {self.a: 1, self.b: 1})
+        with self.at(5):
+            update_copurchases()
+        with self.at(10):
+            order.status = 'shipped'
+            order.save()
+        with self.at(15):
+            self.assertEqual(update_copurchases().orders, 0)
+        self.assertEqual(bought_together([self.a.pk])[0][1], 1)
+
+    def test_ranks_keep_the_top_k(self):
+        with self.at(0):
+            self.create_order(self.user, {self.a: 1, self.b: 1, self.c: 1, self.d: 1})
+            self.create_order(self.user, {self.a: 1, self.c: 1})
+        with self.at(5):
+            update_copurchases(top_k=1)
+        ranks = {
+            related: rank for product, related, _, rank in self.matrix() if product == self.a.pk
+        }
+        self.assertEqual(ranks, {self.b.pk: None, self.c.pk: 1, self.d.pk: None})
+
+    def test_repeated_lines_count_once(self):
+        left, right, counts = count_pairs([0, 0, 0, 1, 1], [7, 7, 9, 7, 9])
+        self.assertEqual((left.tolist(), right.tolist(), counts.tolist()), ([7], [9], [2]))
+
+    def test_endpoints(self):
+        with self.at(0):
+            self.create_order(self.user, {self.a: 1, self.b: 1})
+        with self.at(5):
+            call_command('update_copurchases', stdout=StringIO())
+        response = APIClient().get('/api/v1/products/bought-together/', {'ids': self.a.pk})
+        self.assertEqual(
+            [(row['product']['id'], row['orders']) for row in response.data['results']], [(self.b.pk, 1)]
+        )
+        client = self.client_for(self.user)
+        client.post('/api/v1/products/cart/add/', {'product_id': self.b.pk, 'quantity': 1}, format='json')
+        response = client.get('/api/v1/products/cart/bought-together/')
+        self.assertEqual([row['product']['id'] for row in response.data['results']], [self.a.pk])
+
+
+class ProductExportTests(CatalogTestMixin, TestCase):
+    """The export streams every product and round-trips through the importer"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.client_for(self.create_admin())
+        self.phone = self.create_product('Phone, "Pro"', price=Decimal('200.00'), discount_price=Decimal('150.00'))
+        self.watch = self.create_product('Montre Café', is_active=False)
+
+    def export(self, **params):
+        response = self.client.get('/api/v1/products/admin/products/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="products-', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(content.decode('utf-8'))))
+        self.assertEqual([row['name'] for row in rows], ['Phone, "Pro"', 'Montre Café'])
+        self.assertEqual(
+            (rows[0]['effective_price'], rows[0]['discount_percentage'], rows[1]['discount_price']),
+            ('150.00', '25.00', '')
+        )
+
+    def test_ndjson(self):
+        _, content = self.export(file_format='ndjson', is_active='true')
+        rows = [json.loads(line) for line in content.decode('utf-8').splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(
+            (rows[0]['sku'], rows[0]['price'], rows[0]['is_active'], rows[0]['stock_quantity']),
+            (self.phone.sku, '200.00', True, 10)
+        )
+
+    def test_gzip(self):
+        response, content = self.export(gzip='true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(gzip.decompress(content).decode('utf-8').count('\n'), 3)
+
+    def test_streams_in_blocks(self):
+        for index in range(5):
+            self.create_product(f'Extra {index}')
+        exporter = ProductExporter(chunk_size=2)
+        blocks = list(exporter)
+        self.assertEqual(len(blocks), 4)
+        self.assertEqual(b''.join(blocks).decode('utf-8').count('\n'), 8)
+
+    def test_csv_reimports_unchanged(self):
+        _, content = self.export()
+        report = ProductImporter().run(ROW_READERS['csv'](StringIO(content.decode('utf-8'))))
+        self.assertEqual((report['created'], report['updated'], report['failed']), (0, 2, 0))
+        self.phone.refresh_from_db()
+        self.assertEqual((self.phone.name, self.phone.effective_price), ('Phone, "Pro"', Decimal('150.00')))
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/products.ndjson'
+            call_command('export_products', path, '--format', 'ndjson', '--active-only', stdout=StringIO())
+            with open(path, encoding='utf-8') as output:
+                self.assertEqual([json.loads(line)['sku'] for line in output], [self.phone.sku])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(
+            self.client.get('/api/v1/products/admin/products/export/', {'file_format': 'xml'}).status_code, 400
+        )
+        self.assertEqual(
+            self.client.get('/api/v1/products/admin/products/export/', {'category': 'phones'}).status_code, 400
+        )
+
+
+class CartSummaryTests(CatalogTestMixin, TestCase):
+    """Cart totals for the header badge, without loading the lines"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        self.phone = self.create_product('Phone', price=Decimal('100.00'), discount_price=Decimal('80.50'))
+        self.tablet = self.create_product('Tablet', price=Decimal('1999.99'))
+
+    def summary(self):
+        response = self.client.get('/api/v1/products/cart/summary/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_empty_cart(self):
+        self.assertEqual(self.summary(), {
+            'total_amount': '0.00',
+            'total_amount_formatted': 'GHS 0.00',
+            'total_items': 0,
+            'total_unique_items': 0,
+        })
+
+    def test_totals_use_effective_prices(self):
+        for product, quantity in ((self.phone, 2), (self.tablet, 1)):
+            self.client.post(
+                '/api/v1/products/cart/add/', {'product_id': product.pk, 'quantity': quantity}, format='json'
+            )
+        self.assertEqual(self.summary(), {
+            'total_amount': '2160.99',
+            'total_amount_formatted': 'GHS 2,160.99',
+            'total_items': 3,
+            'total_unique_items': 2,
+        })
+
+    def test_matches_cart_totals(self):
+        self.client.post(
+            '/api/v1/products/cart/add/', {'product_id': self.phone.pk, 'quantity': 3}, format='json'
+        )
+        cart = self.client.get('/api/v1/products/cart/').data
+        summary = self.summary()
+        for key in ('total_amount', 'total_items', 'total_unique_items'):
+            self.assertEqual(str(summary[key]), str(cart[key]))
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get('/api/v1/products/cart/summary/').status_code, 401)
+
+
+@override_settings(CART_STORAGE='document')
+class DocumentCartSummaryTests(CartSummaryTests):
+    """The same totals with carts stored as documents"""
+
+
+class CartBatchTests(CatalogTestMixin, TestCase):
+    """Batched cart edits apply all or nothing"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user()
+        self.client = self.client_for(self.user)
+        self.phone, self.tablet, self.watch = self.create_products(count=3, stock_quantity=5)
+
+    def batch(self, operations):
+        return self.client.post('/api/v1/products/cart/batch/', {'operations': operations}, format='json')
+
+    def test_add_set_and_remove(self):
+        self.batch([
+            {'op': 'add', 'product_id': self.phone.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': self.tablet.pk, 'quantity': 1},
+        ])
+        response = self.batch([
+            {'op': 'add', 'product_id': self.phone.pk, 'quantity': 1},
+            {'op': 'set', 'product_id': self.watch.pk, 'quantity': 4},
+            {'op': 'remove', 'product_id': self.tablet.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_items'], 7)
+        self.assertEqual(self.cart_quantities(self.user), {self.phone.pk: 3, self.watch.pk: 4})
+
+    def test_operations_fold_in_order(self):
+        response = self.batch([
+            {'op': 'add', 'product_id': self.phone.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': self.phone.pk, 'quantity': 2},
+            {'op': 'set', 'product_id': self.tablet.pk, 'quantity': 3},
+            {'op': 'set', 'product_id': self.tablet.pk, 'quantity': 0},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cart_quantities(self.user), {self.phone.pk: 4})
+
+    def test_errors_apply_nothing(self):
+        self.batch([{'op': 'add', 'product_id': self.phone.pk, 'quantity': 1}])
+        self.tablet.is_active = False
+        self.tablet.save()
+        response = self.batch([
+            {'op': 'set', 'product_id': self.phone.pk, 'quantity': 2},
+            {'op': 'add', 'product_id': self.watch.pk, 'quantity': 3},
+            {'op': 'add', 'product_id': self.watch.pk, 'quantity': 3},
+            {'op': 'add', 'product_id': self.tablet.pk, 'quantity': 1},
+            {'op': 'remove', 'product_id': self.phone.pk},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'], [
+            {'index': 2, 'product_id': self.watch.pk, 'errors': {'quantity': ['Only 5 units available']}},
+            {'index': 3, 'product_id': self.tablet.pk, 'errors': {'product_id': ['Product not found']}},
+        ])
+        self.assertEqual(self.cart_quantities(self.user), {self.phone.pk: 1})
+
+    def test_invalid_operations(self):
+        for operations in (
+            [],
+            [{'op': 'add', 'product_id': self.phone.pk}],
+            [{'op': 'add', 'product_id': self.phone.pk, 'quantity': 0}],
+            [{'op': 'replace', 'product_id': self.phone.pk, 'quantity': 1}],
+            [{'op': 'remove', 'product_id': self.phone.pk}] * 101,
+        ):
+            self.assertEqual(self.batch(operations).status_code, 400)
+        self.assertEqual(self.cart_quantities(self.user), {})
+
+    def test_requires_authentication(self):
+        response = APIClient().post(
+            '/api/v1/products/cart/batch/',
+            {'operations': [{'op': 'add', 'product_id': self.phone.pk, 'quantity': 1}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(CART_STORAGE='document')
+class DocumentCartBatchTests(CartBatchTests):
+    """The same batch guarantees with carts stored as documents"""
+
+
+class GuestCartBatchTests(CatalogTestMixin, TestCase):
+    """Guest batches edit the signed token, never database rows"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.phone, self.tablet = self.create_products(count=2, stock_quantity=5)
+
+    def batch(self, operations, token=None):
+        headers = {'HTTP_X_GUEST_CART': token} if token else {}
+        return self.client.post(
+            '/api/v1/products/cart/guest/batch/', {'operations': operations}, format='json', **headers
+        )
+
+    def test_edits_carry_over_in_the_token(self):
+        first = self.batch([{'op': 'add', 'product_id': self.phone.pk, 'quantity': 2}])
+        self.assertEqual(first.status_code, 200)
+        second = self.batch([
+            {'op': 'add', 'product_id': self.phone.pk, 'quantity': 1},
+            {'op': 'add', 'product_id': self.tablet.pk, 'quantity': 1},
+        ], token=first.data['token'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(
+            {item['product']['id']: item['quantity'] for item in second.data['items']},
+            {self.phone.pk: 3, self.tablet.pk: 1}
+        )
+        self.assertEqual((second.data['total_amount'], second.data['total_items']), ('401.00', 4))
+        self.assertEqual(second.cookies['guest_cart'].value, second.data['token'])
+        self.assertFalse(Cart.objects.exists())
+
+    def test_errors_keep_the_token(self):
+        token = self.batch([{'op': 'add', 'product_id': self.phone.pk, 'quantity': 2}]).data['token']
+        response = self.batch([
+            {'op': 'remove', 'product_id': self.phone.pk},
+            {'op': 'add', 'product_id': self.tablet.pk, 'quantity': 6},
+        ], token=token)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertNotIn('guest_cart', response.cookies)
@@ -0,0 +1,106 @@
+# products/trigrams.py
+from collections import defaultdict
+from .search import normalize, tokenize
+
+# Minimum word similarity (shared / distinct trigrams) for a fuzzy match
+SIMILARITY_THRESHOLD = 0.3
+# Most fuzzy candidates handed back to the database query (which still
+# applies the request's other filters)
+MAX_FUZZY_RESULTS = 2000
+
+
+def trigrams(word):
+    """pg_trgm style trigrams of a word padded with two leading and one trailing space"""
+    padded = f'  {word} '
+    return frozenset(padded[index:index + 3] for index in range(len(padded) - 2))
+
+
+def similarity(shared, left, right):
+    return shared / (len(left) + len(right) - shared)
+
+
+class TrigramIndex:
+    """
+    Word-level trigram index for typo-tolerant product lookup.
+
+    Each distinct word of the indexed product text is stored once with its
+    trigram set; postings map trigrams to words and words to product IDs, so
+    a query only scores the vocabulary words it shares a trigram with.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(set)
+        self.word_trigrams = {}
+        self.word_products = defaultdict(set)
+        self.product_words = {}
+
+    def add(self, pk, text):
+        self.remove(pk)
+        words = set(tokenize(normalize(text)))
+        self.product_words[pk] = words
+        for word in words:
+            if word not in self.word_trigrams:
+                self.word_trigrams[word] = trigrams(word)
+                for trigram in self.word_trigrams[word]:
+                    self.postings[trigram].add(word)
+            self.word_products[word].add(pk)
+
+    def remove(self, pk):
+        for word in self.product_words.pop(pk, ()):
+            products = self.word_products[word]
+            products.discard(pk)
+            if not products:
+                # Last product using this word: drop it from the vocabulary
+                del self.word_products[word]
+                for trigram in self.word_trigrams.pop(word):
+                    self.postings[trigram].discard(word)
+                    if not self.postings[trigram]:
+                        del self.postings[trigram]
+
+    def load(self, text_by_pk):
+        """Bulk load (replaces the index contents)"""
+        self.__init__()
+        for pk, text in text_by_pk.items():
+            self.add(pk, text)
+
+    def similar_words(self, token, threshold=SIMILARITY_THRESHOLD):
+        """Return {word: similarity} for vocabulary words similar to token"""
+        token_trigrams = trigrams(token)
+        shared = defaultdict(int)
+        for trigram in token_trigrams:
+            for word in self.postings.get(trigram, ()):
+                shared[word] += 1
+
+        matches = {}
+        for word, count in shared.items():
+            score = similarity(count, token_trigrams, self.word_trigrams[word])
+            if score >= threshold:
+                matches[word] = score
+        return matches
+
+    def search(self, query, threshold=SIMILARITY_THRESHOLD, limit=MAX_FUZZY_RESULTS):
+        """
+        Return up to `limit` (product_id, score) pairs, best first.
+
+        A product scores the mean, over query words, of its most similar
+        word; products scoring below the threshold are dropped.
+        """
+        tokens = tokenize(normalize(query))
+        if not tokens:
+            return []
+
+        scores = defaultdict(float)
+        for token in tokens:
+            best = {}
+            for word, score in self.similar_words(token, threshold).items():
+                for pk in self.word_products[word]:
+                    if score > best.get(pk, 0):
+                        best[pk] = score
+            for pk, score in best.items():
+                scores[pk] += score
+
+        ranked = sorted(
+            ((pk, total / len(tokens)) for pk, total in scores.items()),
+            key=lambda item: (-item[1], item[0])
+        )
+        return [(pk, score) for pk, score in ranked if score >= threshold][:limit]
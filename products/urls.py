@@ -16,32 +16,50 @@ urlpatterns = [
     path('featured/', views.FeaturedProductsView.as_view(), name='featured-products'),
     path('search/', views.ProductSearchView.as_view(), name='product-search'),
     path('sku/<str:sku>/', views.ProductBySkuView.as_view(), name='product-by-sku'),
+    path('batch/', views.ProductBatchView.as_view(), name='product-batch'),
+    path('suggest/', views.ProductSuggestView.as_view(), name='product-suggest'),
     
     # Cart Management
     path('cart/', views.CartView.as_view(), name='cart-detail'),
+    path('cart/summary/', views.CartSummaryView.as_view(), name='cart-summary'),
     path('cart/add/', views.AddToCartView.as_view(), name='add-to-cart'),
     path('cart/items/', views.CartItemListView.as_view(), name='cart-items'),
     path('cart/items/<int:item_id>/', views.CartItemDetailView.as_view(), name='cart-item-detail'),
     path('cart/items/<int:item_id>/update/', views.UpdateCartItemView.as_view(), name='update-cart-item'),
     path('cart/items/<int:item_id>/remove/', views.RemoveCartItemView.as_view(), name='remove-cart-item'),
+    path('cart/batch/', views.CartBatchView.as_view(), name='cart-batch'),
     path('cart/clear/', views.ClearCartView.as_view(), name='clear-cart'),
+    path('cart/guest/', views.GuestCartView.as_view(), name='guest-cart'),
+    path('cart/guest/batch/', views.GuestCartBatchView.as_view(), name='guest-cart-batch'),
+    path('cart/merge/', views.MergeGuestCartView.as_view(), name='merge-guest-cart'),
     
     # Product Management (Admin)
     path('admin/products/', views.ProductCreateView.as_view(), name='product-create'),
     path('admin/products/<int:pk>/update/', views.ProductUpdateView.as_view(), name='product-update'),
+    path('admin/products/import/', views.ProductImportView.as_view(), name='product-import'),
+    path('admin/products/bulk-update/', views.ProductBulkUpdateView.as_view(), name='product-bulk-update'),
+    path('admin/products/export/', views.ProductExportView.as_view(), name='product-export'),
     path('admin/categories/', views.CategoryCreateView.as_view(), name='category-create'),
     
     # Statistics and Analytics
     path('stats/', views.ProductStatsView.as_view(), name='product-stats'),
     path('categories/<int:category_id>/stats/', views.CategoryStatsView.as_view(), name='category-stats'),
+    path('price-histogram/', views.PriceHistogramView.as_view(), name='price-histogram'),
+    path('cache/stats/', views.CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
     
-    # Wishlist (Future feature)
+    # Wishlist
     path('wishlist/', views.WishlistView.as_view(), name='wishlist'),
     path('wishlist/add/', views.AddToWishlistView.as_view(), name='add-to-wishlist'),
+    path('wishlist/remove/', views.RemoveFromWishlistView.as_view(), name='remove-from-wishlist'),
+    path('wishlist/check/', views.WishlistCheckView.as_view(), name='wishlist-check'),
     
-    # Product Comparison (Future feature)
+    # Product Comparison
     path('compare/', views.CompareProductsView.as_view(), name='compare-products'),
     
+    # Recommendations
+    path('bought-together/', views.BoughtTogetherView.as_view(), name='bought-together'),
+    path('cart/bought-together/', views.CartBoughtTogetherView.as_view(), name='cart-bought-together'),
+    
     # API Overview
     path('overview/', views.products_overview, name='products-overview'),
 ]
\ No newline at end of file
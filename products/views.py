@@ -1,20 +1,56 @@
 # products/views.py
+import codecs
+from decimal import Decimal
 from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Count, Max
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Category, Product, Cart, CartItem
+from smart_gear.fieldsets import SparseFieldsetMixin
+from smart_gear.pagination import KeysetOrPageNumberPagination
+from .models import Category, Product, CartItem, WishlistItem
+from .carts import (
+    MAX_GUEST_CART_LINES, dump_guest_cart, fold_operations, get_cart_storage,
+    get_guest_token, guest_cart_items, load_guest_cart
+)
+from .cache import (
+    CatalogCacheMixin, ConditionalGetMixin, get_versions, make_etag, normalize_query,
+    get_stats as get_cache_stats
+)
+from .compare import MAX_COMPARE_PRODUCTS, build_matrix
+from .compiled import CompiledListMixin
+from .copurchase import bought_together
+from .facets import compute_facets, parse_facets
+from .exporters import EXPORT_FORMATS, ProductExporter
+from .histogram import DEFAULT_BINS, MAX_BINS, get_price_histogram
+from .importers import ROW_READERS, PriceStockUpdater, ProductImporter, detect_format
+from .filters import ProductFilter, ProductSearchFilter, RelevanceOrderingFilter
+from .stats import get_category_stats, get_product_stats
+from .suggest import get_suggest_index, search_with_fallback
 from .serializers import (
     CategorySerializer, ProductListSerializer, ProductDetailSerializer,
     ProductCreateUpdateSerializer, CartSerializer, CartItemSerializer,
-    AddToCartSerializer, UpdateCartItemSerializer, ProductSearchSerializer
+    AddToCartSerializer, UpdateCartItemSerializer,
+    ProductImportSerializer, ProductBulkUpdateSerializer, WishlistItemSerializer,
+    WishlistUpdateSerializer, CartBatchSerializer
 )
 
+def parse_id_list(raw):
+    """Parse comma-separated integer IDs, dropping repeats but keeping order (raises ValueError)"""
+    values = [value.strip() for value in (raw or '').split(',') if value.strip()]
+    if not all(value.isdigit() for value in values):
+        raise ValueError('ids must be integers')
+    return list(dict.fromkeys(int(value) for value in values))
+
 # API Overview
 @swagger_auto_schema(
     method='get',
@@ -34,8 +70,10 @@ def products_overview(request):
             'products': '/api/v1/products/',
             'featured_products': '/api/v1/products/featured/',
             'search': '/api/v1/products/search/',
+            'suggest': '/api/v1/products/suggest/?q=',
             'cart': '/api/v1/products/cart/',
             'add_to_cart': '/api/v1/products/cart/add/',
+            'compare': '/api/v1/products/compare/?ids=1,2',
         },
         'features': [
             'Product Catalog',
@@ -43,6 +81,7 @@ def products_overview(request):
             'Shopping Cart',
             'Product Search & Filtering',
             'Featured Products',
+            'Product Comparison',
             'Stock Management',
             'Ghana Cedis Pricing'
         ]
@@ -52,8 +91,9 @@ def products_overview(request):
 # CATEGORY VIEWS
 # =============================================================================
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ConditionalGetMixin, CatalogCacheMixin, generics.ListAPIView):
     """List all active categories"""
+    cache_scopes = ('categories',)
     queryset = Category.objects.filter(is_active=True).order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
@@ -66,8 +106,21 @@ class CategoryListView(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class CategoryDetailView(generics.RetrieveAPIView):
+    def get_validators(self, request):
+        state = Category.objects.filter(is_active=True).aggregate(
+            last_modified=Max('updated_at'), count=Count('pk')
+        )
+        versions = get_versions(self.get_cache_scopes())
+        # No Last-Modified: deactivating or deleting the newest category would
+        # move the maximum backwards
+        return (
+            make_etag(state, sorted(versions.items()), normalize_query(request.query_params)),
+            None
+        )
+
+class CategoryDetailView(CatalogCacheMixin, generics.RetrieveAPIView):
     """Get category details"""
+    cache_scopes = ('categories',)
     queryset = Category.objects.filter(is_active=True)
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
@@ -83,14 +136,14 @@ class CategoryDetailView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class CategoryProductsView(generics.ListAPIView):
+class CategoryProductsView(CompiledListMixin, SparseFieldsetMixin, CatalogCacheMixin, generics.ListAPIView):
     """Get products in a specific category"""
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, RelevanceOrderingFilter]
     filterset_fields = ['is_featured', 'is_active']
     search_fields = ['name', 'description']
-    ordering_fields = ['name', 'price', 'created_at']
+    ordering_fields = ['name', 'price', 'effective_price', 'discount_percentage', 'created_at']
     ordering = ['-created_at']
 
     @swagger_auto_schema(
@@ -137,25 +190,34 @@ class CategoryCreateView(generics.CreateAPIView):
 # PRODUCT VIEWS
 # =============================================================================
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(CompiledListMixin, SparseFieldsetMixin, CatalogCacheMixin, generics.ListAPIView):
     """List all active products with filtering and search"""
     queryset = Product.objects.filter(is_active=True).select_related('category')
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'is_featured']
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, RelevanceOrderingFilter]
+    filterset_class = ProductFilter
     search_fields = ['name', 'description', 'sku']
-    ordering_fields = ['name', 'price', 'created_at', 'stock_quantity']
+    ordering_fields = [
+        'name', 'price', 'effective_price', 'discount_percentage',
+        'created_at', 'stock_quantity'
+    ]
     ordering = ['-created_at']
+    pagination_class = KeysetOrPageNumberPagination
 
     @swagger_auto_schema(
         operation_description="Get paginated list of products with filtering and search",
         manual_parameters=[
             openapi.Parameter('page', openapi.IN_QUERY, description="Page number", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('search', openapi.IN_QUERY, description="Search in name/description/SKU", type=openapi.TYPE_STRING),
+            openapi.Parameter('pagination', openapi.IN_QUERY, description="Set to 'cursor' for keyset pagination", type=openapi.TYPE_STRING),
+            openapi.Parameter('cursor', openapi.IN_QUERY, description="Keyset pagination cursor", type=openapi.TYPE_STRING),
+            openapi.Parameter('count', openapi.IN_QUERY, description="Set to false to skip the total count (cursor mode)", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('search', openapi.IN_QUERY, description="Full-text search in name/description/SKU/category", type=openapi.TYPE_STRING),
             openapi.Parameter('category', openapi.IN_QUERY, description="Filter by category ID", type=openapi.TYPE_INTEGER),
             openapi.Parameter('is_featured', openapi.IN_QUERY, description="Filter featured products", type=openapi.TYPE_BOOLEAN),
-            openapi.Parameter('ordering', openapi.IN_QUERY, description="Order by field (name, price, -created_at)", type=openapi.TYPE_STRING),
+            openapi.Parameter('min_price', openapi.IN_QUERY, description="Minimum effective price", type=openapi.TYPE_NUMBER),
+            openapi.Parameter('max_price', openapi.IN_QUERY, description="Maximum effective price", type=openapi.TYPE_NUMBER),
+            openapi.Parameter('ordering', openapi.IN_QUERY, description="Order by field (name, price, effective_price, discount_percentage, -created_at)", type=openapi.TYPE_STRING),
         ],
         responses={200: ProductListSerializer(many=True)},
         tags=['Products']
@@ -163,7 +225,7 @@ class ProductListView(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductDetailView(SparseFieldsetMixin, ConditionalGetMixin, CatalogCacheMixin, generics.RetrieveAPIView):
     """Get detailed product information"""
     queryset = Product.objects.filter(is_active=True).select_related('category')
     serializer_class = ProductDetailSerializer
@@ -180,7 +242,22 @@ class ProductDetailView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class FeaturedProductsView(generics.ListAPIView):
+    def get_cache_scopes(self):
+        return [f"product:{self.kwargs['pk']}", 'categories']
+
+    def get_validators(self, request):
+        state = Product.objects.filter(
+            pk=self.kwargs['pk'], is_active=True
+        ).values('updated_at', 'category__updated_at').first()
+        if state is None:
+            return None
+        versions = get_versions(self.get_cache_scopes())
+        return (
+            make_etag(state, sorted(versions.items()), normalize_query(request.query_params)),
+            max(state['updated_at'], state['category__updated_at'])
+        )
+
+class FeaturedProductsView(CompiledListMixin, SparseFieldsetMixin, CatalogCacheMixin, generics.ListAPIView):
     """Get featured products"""
     queryset = Product.objects.filter(is_active=True, is_featured=True).select_related('category')
     serializer_class = ProductListSerializer
@@ -195,21 +272,24 @@ class FeaturedProductsView(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-class ProductSearchView(generics.ListAPIView):
+class ProductSearchView(SparseFieldsetMixin, generics.ListAPIView):
     """Advanced product search"""
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
+    fuzzy = False
 
     @swagger_auto_schema(
         operation_description="Advanced product search with multiple filters",
         manual_parameters=[
             openapi.Parameter('search', openapi.IN_QUERY, description="Search term", type=openapi.TYPE_STRING),
+            openapi.Parameter('fuzzy', openapi.IN_QUERY, description="Typo-tolerant matching: auto (when nothing matches exactly, default), true or false", type=openapi.TYPE_STRING),
             openapi.Parameter('category', openapi.IN_QUERY, description="Category ID", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('min_price', openapi.IN_QUERY, description="Minimum price", type=openapi.TYPE_NUMBER),
-            openapi.Parameter('max_price', openapi.IN_QUERY, description="Maximum price", type=openapi.TYPE_NUMBER),
+            openapi.Parameter('min_price', openapi.IN_QUERY, description="Minimum effective price", type=openapi.TYPE_NUMBER),
+            openapi.Parameter('max_price', openapi.IN_QUERY, description="Maximum effective price", type=openapi.TYPE_NUMBER),
             openapi.Parameter('is_featured', openapi.IN_QUERY, description="Featured products only", type=openapi.TYPE_BOOLEAN),
             openapi.Parameter('in_stock_only', openapi.IN_QUERY, description="In stock products only", type=openapi.TYPE_BOOLEAN),
             openapi.Parameter('ordering', openapi.IN_QUERY, description="Order by field", type=openapi.TYPE_STRING),
+            openapi.Parameter('facets', openapi.IN_QUERY, description="Facet counts to include (category,price,featured,in_stock or all)", type=openapi.TYPE_STRING),
         ],
         responses={200: ProductListSerializer(many=True)},
         tags=['Products']
@@ -217,31 +297,39 @@ class ProductSearchView(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
+    def list(self, request, *args, **kwargs):
+        facets = parse_facets(request.query_params.get('facets'))
+        response = super().list(request, *args, **kwargs)
+        if facets:
+            # One grouped aggregation over the same filter set as the results
+            response.data['facets'] = compute_facets(self.get_queryset(), facets)
+        if request.query_params.get('search'):
+            response.data['fuzzy'] = self.fuzzy
+        return response
+
+    def search(self, queryset, query):
+        """Index search, falling back to trigram matching when it finds nothing"""
+        queryset, self.fuzzy = search_with_fallback(
+            queryset, query, self.request.query_params.get('fuzzy', 'auto')
+        )
+        return queryset
+
     def get_queryset(self):
         queryset = Product.objects.filter(is_active=True).select_related('category')
         
-        # Search term
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(sku__icontains=search)
-            )
-        
         # Category filter
         category = self.request.query_params.get('category')
         if category:
             queryset = queryset.filter(category_id=category)
         
-        # Price range filters
+        # Price range filters (on what the customer actually pays)
         min_price = self.request.query_params.get('min_price')
         if min_price:
-            queryset = queryset.filter(price__gte=min_price)
+            queryset = queryset.filter(effective_price__gte=min_price)
         
         max_price = self.request.query_params.get('max_price')
         if max_price:
-            queryset = queryset.filter(price__lte=max_price)
+            queryset = queryset.filter(effective_price__lte=max_price)
         
         # Featured filter
         is_featured = self.request.query_params.get('is_featured')
@@ -253,14 +341,24 @@ class ProductSearchView(generics.ListAPIView):
         if in_stock_only == 'true':
             queryset = queryset.filter(stock_quantity__gt=0)
         
-        # Ordering
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        if ordering in ['name', '-name', 'price', '-price', 'created_at', '-created_at', 'stock_quantity', '-stock_quantity']:
+        # Search term (ranked by relevance, applied after the filters so the
+        # fuzzy fallback only triggers when nothing matches all of them)
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = self.search(queryset, search)
+        
+        # Ordering (searches default to relevance)
+        ordering = self.request.query_params.get('ordering') or (None if search else '-created_at')
+        if ordering in [
+            'name', '-name', 'price', '-price', 'effective_price', '-effective_price',
+            'discount_percentage', '-discount_percentage', 'created_at', '-created_at',
+            'stock_quantity', '-stock_quantity'
+        ]:
             queryset = queryset.order_by(ordering)
         
         return queryset
 
-class ProductBySkuView(generics.RetrieveAPIView):
+class ProductBySkuView(SparseFieldsetMixin, CatalogCacheMixin, generics.RetrieveAPIView):
     """Get product by SKU"""
     serializer_class = ProductDetailSerializer
     permission_classes = [AllowAny]
@@ -280,6 +378,117 @@ class ProductBySkuView(generics.RetrieveAPIView):
     def get_queryset(self):
         return Product.objects.filter(is_active=True).select_related('category')
 
+    def get_cache_scopes(self):
+        return [f"sku:{self.kwargs['sku']}", 'categories']
+
+class ProductBatchView(SparseFieldsetMixin, CatalogCacheMixin, generics.ListAPIView):
+    """Get several products by ID or SKU in one request"""
+    serializer_class = ProductDetailSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    max_batch_size = 100
+
+    @swagger_auto_schema(
+        operation_description="Get up to 100 products by comma-separated IDs or SKUs, in the requested order",
+        manual_parameters=[
+            openapi.Parameter('ids', openapi.IN_QUERY, description="Comma-separated product IDs", type=openapi.TYPE_STRING),
+            openapi.Parameter('skus', openapi.IN_QUERY, description="Comma-separated product SKUs", type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Products in the requested order plus identifiers that were not found",
+                examples={
+                    "application/json": {
+                        "results": [],
+                        "missing": [42]
+                    }
+                }
+            ),
+            400: "Missing, invalid or too many identifiers"
+        },
+        tags=['Products']
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_lookup(self):
+        """Return (field, identifiers) parsed from the query string, or raise ValueError"""
+        if 'ids' in self.request.query_params:
+            field, raw = 'pk', self.request.query_params['ids']
+        elif 'skus' in self.request.query_params:
+            field, raw = 'sku', self.request.query_params['skus']
+        else:
+            raise ValueError('Provide ids or skus')
+
+        if field == 'pk':
+            identifiers = parse_id_list(raw)
+        else:
+            # Drop repeats but keep the order the client asked for
+            identifiers = list(dict.fromkeys(
+                value.strip().upper() for value in raw.split(',') if value.strip()
+            ))
+        if not identifiers:
+            raise ValueError('Provide at least one identifier')
+        if len(identifiers) > self.max_batch_size:
+            raise ValueError(f'At most {self.max_batch_size} products per request')
+        return field, identifiers
+
+    def list(self, request, *args, **kwargs):
+        try:
+            field, identifiers = self.get_lookup()
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = self.narrow_queryset(Product.objects.filter(
+            is_active=True, **{f"{field}__in": identifiers}
+        ).select_related('category'), extra_paths=[field])
+        by_identifier = {getattr(product, field): product for product in products}
+
+        found = [by_identifier[value] for value in identifiers if value in by_identifier]
+        return Response({
+            'results': self.get_serializer(found, many=True).data,
+            'missing': [value for value in identifiers if value not in by_identifier],
+        })
+
+class ProductSuggestView(APIView):
+    """Autocomplete product and category names"""
+    permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 20
+
+    @swagger_auto_schema(
+        operation_description="Prefix suggestions over product names, SKUs and category names, most popular products first",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Text typed so far", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum suggestions per group (default 10, max 20)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Matching products and categories",
+                examples={
+                    "application/json": {
+                        "query": "gal",
+                        "products": [
+                            {"id": 3, "name": "Samsung Galaxy S24", "sku": "SG-0003", "category_name": "Phones"}
+                        ],
+                        "categories": []
+                    }
+                }
+            ),
+            400: "Invalid limit"
+        },
+        tags=['Products']
+    )
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_limit))
+
+        return Response({'query': query, **get_suggest_index().suggest(query, limit)})
+
 class ProductCreateView(generics.CreateAPIView):
     """Create new product (Admin only)"""
     queryset = Product.objects.all()
@@ -333,17 +542,147 @@ class ProductUpdateView(generics.UpdateAPIView):
     def patch(self, request, *args, **kwargs):
         return super().patch(request, *args, **kwargs)
 
+class ProductImportView(APIView):
+    """Bulk import products from CSV or NDJSON (Admin only)"""
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_description="Stream a CSV or NDJSON product file and upsert it by SKU (Admin only)",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, description="CSV or NDJSON file", type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('file_format', openapi.IN_FORM, description="csv or ndjson (guessed from the file name if omitted)", type=openapi.TYPE_STRING),
+            openapi.Parameter('update_existing', openapi.IN_FORM, description="Update products whose SKU already exists", type=openapi.TYPE_BOOLEAN),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Import report",
+                examples={
+                    "application/json": {
+                        "created": 4980,
+                        "updated": 15,
+                        "failed": 5,
+                        "errors": [
+                            {"row": 17, "sku": "SG-IPH-15", "errors": {"price": ["A valid number is required."]}}
+                        ]
+                    }
+                }
+            ),
+            400: "Validation errors, or an import report whose file-level error says where undecodable UTF-8 stopped it (earlier rows are committed)",
+            403: "Admin access required"
+        },
+        tags=['Products']
+    )
+    def post(self, request):
+        serializer = ProductImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data['file']
+        file_format = serializer.validated_data.get('file_format') or detect_format(upload.name)
+        importer = ProductImporter(update_existing=serializer.validated_data['update_existing'])
+        # Decode the upload line by line so large files are never held in memory
+        lines = codecs.iterdecode(upload, 'utf-8-sig')
+        report = importer.run(ROW_READERS[file_format](lines))
+
+        if importer.decode_failed:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+class ProductBulkUpdateView(APIView):
+    """Bulk update product prices and stock by SKU (Admin only)"""
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Apply up to 10,000 price/stock updates keyed by SKU in one transaction (Admin only)",
+        request_body=ProductBulkUpdateSerializer,
+        responses={
+            200: openapi.Response(
+                description="Update report",
+                examples={
+                    "application/json": {
+                        "updated": 9998,
+                        "unknown_skus": ["SG-OLD-01"],
+                        "failed": 1,
+                        "errors": [
+                            {"sku": "SG-IPH-15", "errors": {"discount_price": ["Discount price must be less than regular price"]}}
+                        ]
+                    }
+                }
+            ),
+            400: "Validation errors",
+            403: "Admin access required"
+        },
+        tags=['Products']
+    )
+    def post(self, request):
+        serializer = ProductBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        report = PriceStockUpdater().run(serializer.validated_data['items'])
+        return Response(report)
+
+class ProductExportView(APIView):
+    """Stream the product catalog as CSV or NDJSON (Admin only)"""
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Stream every product with its category as a CSV or NDJSON download, optionally gzipped (Admin only)",
+        manual_parameters=[
+            openapi.Parameter('file_format', openapi.IN_QUERY, description="csv (default) or ndjson", type=openapi.TYPE_STRING),
+            openapi.Parameter('gzip', openapi.IN_QUERY, description="Gzip the download", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('category', openapi.IN_QUERY, description="Only this category ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('is_active', openapi.IN_QUERY, description="Only active (true) or inactive (false) products", type=openapi.TYPE_BOOLEAN),
+        ],
+        responses={
+            200: "CSV or NDJSON file (the CSV columns can be re-imported)",
+            400: "Invalid format or filters",
+            403: "Admin access required"
+        },
+        tags=['Products']
+    )
+    def get(self, request):
+        params = request.query_params
+        file_format = params.get('file_format', 'csv')
+        if file_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"file_format must be one of: {', '.join(sorted(EXPORT_FORMATS))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = Product.objects.all()
+        if params.get('category'):
+            if not params['category'].isdigit():
+                return Response({'error': 'category must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(category_id=params['category'])
+        if params.get('is_active') in ('true', 'false'):
+            queryset = queryset.filter(is_active=params['is_active'] == 'true')
+
+        exporter = ProductExporter(
+            file_format=file_format, compress=params.get('gzip') == 'true', queryset=queryset
+        )
+        response = StreamingHttpResponse(exporter, content_type=exporter.content_type)
+        filename = f"products-{timezone.localdate():%Y%m%d}.{exporter.extension}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 # =============================================================================
 # CART VIEWS
 # =============================================================================
 
-class CartView(generics.RetrieveAPIView):
+class CartStorageMixin:
+    """Resolve the configured cart storage once per request"""
+
+    @cached_property
+    def cart_storage(self):
+        return get_cart_storage()
+
+class CartView(CartStorageMixin, ConditionalGetMixin, generics.RetrieveAPIView):
     """Get user's shopping cart"""
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Get current user's shopping cart",
+        operation_description="Get current user's shopping cart. With document cart storage a user who has never written to their cart gets an empty cart whose id, created_at and updated_at are null (reads never create the row).",
         responses={
             200: CartSerializer,
             401: "Authentication required"
@@ -354,10 +693,43 @@ class CartView(generics.RetrieveAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_object(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        return self.cart_storage.get_cart(self.request.user)
 
-class AddToCartView(generics.CreateAPIView):
+    def get_validators(self, request):
+        return self.cart_storage.get_validators(request.user)
+
+class CartSummaryView(CartStorageMixin, APIView):
+    """Get cart totals for the header badge"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Get current user's cart totals from a single aggregate query",
+        responses={
+            200: openapi.Response(
+                description="Cart totals",
+                examples={
+                    "application/json": {
+                        "total_amount": "23000.00",
+                        "total_amount_formatted": "GHS 23,000.00",
+                        "total_items": 3,
+                        "total_unique_items": 2
+                    }
+                }
+            ),
+            401: "Authentication required"
+        },
+        tags=['Shopping Cart']
+    )
+    def get(self, request):
+        totals = self.cart_storage.summarize(request.user)
+        return Response({
+            'total_amount': f"{totals['total_amount']:.2f}",
+            'total_amount_formatted': f"GHS {totals['total_amount']:,.2f}",
+            'total_items': totals['total_items'],
+            'total_unique_items': totals['total_unique_items'],
+        })
+
+class AddToCartView(CartStorageMixin, generics.CreateAPIView):
     """Add item to shopping cart"""
     serializer_class = AddToCartSerializer
     permission_classes = [IsAuthenticated]
@@ -389,36 +761,19 @@ class AddToCartView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        product_id = serializer.validated_data['product_id']
-        quantity = serializer.validated_data['quantity']
+        # Product resolved (once) during validation; the line is upserted atomically
+        cart_item = self.cart_storage.add(
+            request.user,
+            serializer.validated_data['product'],
+            serializer.validated_data['quantity']
+        )
         
-        try:
-            product = Product.objects.get(id=product_id, is_active=True)
-            
-            # Check if item already exists in cart
-            cart_item, item_created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                defaults={'quantity': quantity}
-            )
-            
-            if not item_created:
-                # Update existing item quantity
-                cart_item.quantity += quantity
-                cart_item.save()
-            
-            return Response({
-                'message': 'Item added to cart successfully',
-                'cart_item': CartItemSerializer(cart_item).data
-            }, status=status.HTTP_201_CREATED)
-            
-        except Product.DoesNotExist:
-            return Response({
-                'error': 'Product not found'
-            }, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'message': 'Item added to cart successfully',
+            'cart_item': CartItemSerializer(cart_item).data
+        }, status=status.HTTP_201_CREATED)
 
-class CartItemListView(generics.ListAPIView):
+class CartItemListView(CartStorageMixin, generics.ListAPIView):
     """List items in user's cart"""
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
@@ -435,10 +790,9 @@ class CartItemListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart).select_related('product', 'product__category')
+        return self.cart_storage.list_items(self.request.user)
 
-class CartItemDetailView(generics.RetrieveAPIView):
+class CartItemDetailView(CartStorageMixin, generics.RetrieveAPIView):
     """Get cart item details"""
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
@@ -455,15 +809,10 @@ class CartItemDetailView(generics.RetrieveAPIView):
     def get(self, request, *args, **kwargs):
         return super().get(request, *args, **kwargs)
 
-    def get_queryset(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return CartItem.objects.filter(cart=cart).select_related('product')
-
     def get_object(self):
-        item_id = self.kwargs['item_id']
-        return self.get_queryset().get(id=item_id)
+        return self.cart_storage.get_item(self.request.user, self.kwargs['item_id'])
 
-class UpdateCartItemView(APIView):
+class UpdateCartItemView(CartStorageMixin, APIView):
     """Update cart item quantity"""
     permission_classes = [IsAuthenticated]
 
@@ -492,8 +841,7 @@ class UpdateCartItemView(APIView):
     )
     def put(self, request, item_id):
         try:
-            cart, created = Cart.objects.get_or_create(user=request.user)
-            cart_item = CartItem.objects.get(id=item_id, cart=cart)
+            cart_item = self.cart_storage.get_item(request.user, item_id)
             
             serializer = UpdateCartItemSerializer(
                 data=request.data,
@@ -502,16 +850,13 @@ class UpdateCartItemView(APIView):
             serializer.is_valid(raise_exception=True)
             
             quantity = serializer.validated_data['quantity']
+            cart_item = self.cart_storage.set_quantity(request.user, cart_item, quantity)
             
             if quantity == 0:
-                cart_item.delete()
                 return Response({
                     'message': 'Item removed from cart'
                 }, status=status.HTTP_204_NO_CONTENT)
             else:
-                cart_item.quantity = quantity
-                cart_item.save()
-                
                 return Response({
                     'message': 'Cart item updated successfully',
                     'cart_item': CartItemSerializer(cart_item).data
@@ -522,7 +867,7 @@ class UpdateCartItemView(APIView):
                 'error': 'Cart item not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
-class RemoveCartItemView(APIView):
+class RemoveCartItemView(CartStorageMixin, APIView):
     """Remove item from cart"""
     permission_classes = [IsAuthenticated]
 
@@ -537,9 +882,7 @@ class RemoveCartItemView(APIView):
     )
     def delete(self, request, item_id):
         try:
-            cart, created = Cart.objects.get_or_create(user=request.user)
-            cart_item = CartItem.objects.get(id=item_id, cart=cart)
-            cart_item.delete()
+            self.cart_storage.remove_item(request.user, item_id)
             
             return Response({
                 'message': 'Item removed from cart successfully'
@@ -550,7 +893,41 @@ class RemoveCartItemView(APIView):
                 'error': 'Cart item not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
-class ClearCartView(APIView):
+class CartBatchView(CartStorageMixin, APIView):
+    """Apply several cart edits at once"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Apply up to 100 add/set/remove operations to the cart in one transaction (all or nothing) and return the resulting cart",
+        request_body=CartBatchSerializer,
+        responses={
+            200: CartSerializer,
+            400: openapi.Response(
+                description="Invalid operations; nothing was applied",
+                examples={
+                    "application/json": {
+                        "errors": [
+                            {"index": 2, "product_id": 7, "errors": {"quantity": ["Only 3 units available"]}}
+                        ]
+                    }
+                }
+            ),
+            401: "Authentication required"
+        },
+        tags=['Shopping Cart']
+    )
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        errors = self.cart_storage.apply_operations(request.user, serializer.validated_data['operations'])
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        cart = self.cart_storage.get_cart(request.user)
+        return Response(CartSerializer(cart, context={'request': request}).data)
+
+class ClearCartView(CartStorageMixin, APIView):
     """Clear all items from cart"""
     permission_classes = [IsAuthenticated]
 
@@ -570,13 +947,112 @@ class ClearCartView(APIView):
         tags=['Shopping Cart']
     )
     def post(self, request):
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        cart.items.all().delete()
+        self.cart_storage.clear(request.user)
         
         return Response({
             'message': 'Cart cleared successfully'
         })
 
+class GuestCartMixin:
+    """Render signed guest carts and keep the guest cart cookie in step"""
+
+    def guest_cart_response(self, nonce, lines):
+        items = guest_cart_items(lines)
+        total_amount = sum((item.subtotal for item in items), Decimal('0.00'))
+        token = dump_guest_cart(nonce, {item.product_id: item.quantity for item in items})
+        response = Response({
+            'token': token,
+            'items': CartItemSerializer(items, many=True, context={'request': self.request}).data,
+            'total_amount': f"{total_amount:.2f}",
+            'total_amount_formatted': f"GHS {total_amount:,.2f}",
+            'total_items': sum(item.quantity for item in items),
+            'total_unique_items': len(items),
+        })
+        response.set_cookie(
+            settings.GUEST_CART_COOKIE, token,
+            max_age=settings.GUEST_CART_MAX_AGE, httponly=True, samesite='Lax'
+        )
+        return response
+
+class GuestCartView(GuestCartMixin, APIView):
+    """Get the anonymous shopper's cart"""
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Get a guest cart from its signed token (X-Guest-Cart header or guest_cart cookie); no database rows are involved",
+        responses={
+            200: openapi.Response(
+                description="Guest cart with a refreshed signed token",
+                examples={
+                    "application/json": {
+                        "token": "signed-guest-cart-token",
+                        "items": [],
+                        "total_amount": "0.00",
+                        "total_amount_formatted": "GHS 0.00",
+                        "total_items": 0,
+                        "total_unique_items": 0
+                    }
+                }
+            )
+        },
+        tags=['Shopping Cart']
+    )
+    def get(self, request):
+        return self.guest_cart_response(*load_guest_cart(get_guest_token(request)))
+
+class GuestCartBatchView(GuestCartMixin, APIView):
+    """Edit the anonymous shopper's cart"""
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description=f"Apply add/set/remove operations to a guest cart (at most {MAX_GUEST_CART_LINES} lines) and return it with a new signed token",
+        request_body=CartBatchSerializer,
+        responses={
+            200: "Guest cart with a new signed token",
+            400: "Invalid operations; the cart is unchanged"
+        },
+        tags=['Shopping Cart']
+    )
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
+        nonce, lines = load_guest_cart(get_guest_token(request))
+        products = Product.objects.in_bulk({operation['product_id'] for operation in operations})
+        errors = fold_operations(operations, lines, products)
+        if errors:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        if sum(1 for quantity in lines.values() if quantity) > MAX_GUEST_CART_LINES:
+            return Response(
+                {'error': f'Guest carts hold at most {MAX_GUEST_CART_LINES} products'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return self.guest_cart_response(nonce, lines)
+
+class MergeGuestCartView(CartStorageMixin, APIView):
+    """Merge a guest cart into the user's cart"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Merge the signed guest cart (X-Guest-Cart header or guest_cart cookie) into the current user's cart, capping quantities at stock. Login does this automatically; each guest cart merges only once, so replays and retries are no-ops.",
+        responses={
+            200: CartSerializer,
+            401: "Authentication required"
+        },
+        tags=['Shopping Cart']
+    )
+    def post(self, request):
+        nonce, lines = load_guest_cart(get_guest_token(request))
+        if lines:
+            self.cart_storage.merge(request.user, nonce, lines)
+
+        cart = self.cart_storage.get_cart(request.user)
+        response = Response(CartSerializer(cart, context={'request': request}).data)
+        response.delete_cookie(settings.GUEST_CART_COOKIE, samesite='Lax')
+        return response
+
 # =============================================================================
 # STATISTICS & ANALYTICS VIEWS
 # =============================================================================
@@ -605,16 +1081,7 @@ class ProductStatsView(APIView):
         tags=['Statistics']
     )
     def get(self, request):
-        stats = {
-            'total_products': Product.objects.count(),
-            'active_products': Product.objects.filter(is_active=True).count(),
-            'featured_products': Product.objects.filter(is_featured=True, is_active=True).count(),
-            'out_of_stock': Product.objects.filter(stock_quantity=0, is_active=True).count(),
-            'categories_count': Category.objects.filter(is_active=True).count(),
-            'average_price': Product.objects.filter(is_active=True).aggregate(Avg('price'))['price__avg'] or 0,
-        }
-        
-        return Response(stats)
+        return Response(get_product_stats())
 
 class CategoryStatsView(APIView):
     """Get category statistics"""
@@ -640,68 +1107,354 @@ class CategoryStatsView(APIView):
         tags=['Statistics']
     )
     def get(self, request, category_id):
-        try:
-            category = Category.objects.get(id=category_id, is_active=True)
-            products = Product.objects.filter(category=category)
-            
-            stats = {
-                'category_name': category.name,
-                'total_products': products.count(),
-                'active_products': products.filter(is_active=True).count(),
-                'featured_products': products.filter(is_featured=True, is_active=True).count(),
-                'average_price': products.filter(is_active=True).aggregate(Avg('price'))['price__avg'] or 0,
-            }
-            
-            return Response(stats)
-            
-        except Category.DoesNotExist:
+        stats = get_category_stats(category_id)
+        if stats is None:
             return Response({
                 'error': 'Category not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
+        return Response(stats)
+
+class PriceHistogramView(APIView):
+    """Get the price distribution of the catalog or a filtered subset"""
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Histogram bins, range and percentiles of effective prices for the price slider",
+        manual_parameters=[
+            openapi.Parameter('category', openapi.IN_QUERY, description="Category ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('search', openapi.IN_QUERY, description="Search term", type=openapi.TYPE_STRING),
+            openapi.Parameter('is_featured', openapi.IN_QUERY, description="Featured products only", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('in_stock_only', openapi.IN_QUERY, description="In stock products only", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('bins', openapi.IN_QUERY, description=f"Number of bins (default {DEFAULT_BINS}, max {MAX_BINS})", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Price distribution",
+                examples={
+                    "application/json": {
+                        "count": 140,
+                        "min": "150.00",
+                        "max": "12500.00",
+                        "mean": "4210.35",
+                        "percentiles": {"p10": "420.00", "p25": "1100.00", "p50": "3200.00", "p75": "6400.00", "p90": "9800.00"},
+                        "bins": [{"min": "150.00", "max": "767.50", "count": 21}]
+                    }
+                }
+            ),
+            400: "Invalid category or bins"
+        },
+        tags=['Statistics']
+    )
+    def get(self, request):
+        params = request.query_params
+        try:
+            bins = int(params.get('bins', DEFAULT_BINS))
+            filters = {}
+            if params.get('category'):
+                filters['category'] = int(params['category'])
+        except ValueError:
+            return Response({'error': 'category and bins must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 1 <= bins <= MAX_BINS:
+            return Response({'error': f'bins must be between 1 and {MAX_BINS}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if params.get('search', '').strip():
+            filters['search'] = params['search'].strip()
+        if params.get('is_featured') == 'true':
+            filters['is_featured'] = True
+        if params.get('in_stock_only') == 'true':
+            filters['in_stock_only'] = True
+
+        return Response(get_price_histogram(filters, bins))
+
+class CatalogCacheStatsView(APIView):
+    """Get catalog response cache statistics (Admin only)"""
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Get catalog response cache hit/miss counters (Admin only)",
+        responses={
+            200: openapi.Response(
+                description="Catalog cache statistics",
+                examples={
+                    "application/json": {
+                        "hits": 1520,
+                        "misses": 87,
+                        "hit_ratio": 0.9459,
+                        "backend": "django.core.cache.backends.locmem.LocMemCache",
+                        "versions": {"products": 1760500000000, "categories": 1760500000000}
+                    }
+                }
+            ),
+            403: "Admin access required"
+        },
+        tags=['Statistics']
+    )
+    def get(self, request):
+        return Response(get_cache_stats())
+
 # =============================================================================
-# FUTURE FEATURES (PLACEHOLDER VIEWS)
+# WISHLIST & COMPARISON VIEWS
 # =============================================================================
 
-class WishlistView(APIView):
-    """User wishlist (Future feature)"""
+class WishlistView(generics.ListAPIView):
+    """User wishlist"""
+    serializer_class = WishlistItemSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = None
 
     @swagger_auto_schema(
-        operation_description="Get user wishlist (Coming soon)",
-        responses={200: "Wishlist feature coming soon"},
-        tags=['Future Features']
+        operation_description="Get the current user's wishlist with availability and current prices",
+        responses={200: WishlistItemSerializer(many=True)},
+        tags=['Wishlist']
     )
-    def get(self, request):
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        # Items, products and categories in one joined query
+        return WishlistItem.objects.filter(
+            user=self.request.user
+        ).select_related('product__category')
+
+class AddToWishlistView(APIView):
+    """Add products to wishlist"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Add one or more products to the current user's wishlist",
+        request_body=WishlistUpdateSerializer,
+        responses={
+            200: openapi.Response(
+                description="Products added",
+                examples={
+                    "application/json": {
+                        "added": [3, 7],
+                        "not_found": [99]
+                    }
+                }
+            ),
+            400: "Validation errors"
+        },
+        tags=['Wishlist']
+    )
+    def post(self, request):
+        serializer = WishlistUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_ids = list(dict.fromkeys(serializer.validated_data['product_ids']))
+
+        available = set(Product.objects.filter(
+            pk__in=product_ids, is_active=True
+        ).values_list('pk', flat=True))
+        added = [pk for pk in product_ids if pk in available]
+        # Already wishlisted products hit the unique index and are skipped
+        WishlistItem.objects.bulk_create(
+            [WishlistItem(user=request.user, product_id=pk) for pk in added],
+            ignore_conflicts=True
+        )
+
         return Response({
-            'message': 'Wishlist feature coming soon',
-            'user': request.user.email
+            'added': added,
+            'not_found': [pk for pk in product_ids if pk not in available],
         })
 
-class AddToWishlistView(APIView):
-    """Add to wishlist (Future feature)"""
+class RemoveFromWishlistView(APIView):
+    """Remove products from wishlist"""
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
-        operation_description="Add product to wishlist (Coming soon)",
-        responses={200: "Wishlist feature coming soon"},
-        tags=['Future Features']
+        operation_description="Remove one or more products from the current user's wishlist",
+        request_body=WishlistUpdateSerializer,
+        responses={
+            200: openapi.Response(
+                description="Number of wishlist items removed",
+                examples={"application/json": {"removed": 2}}
+            ),
+            400: "Validation errors"
+        },
+        tags=['Wishlist']
     )
     def post(self, request):
+        serializer = WishlistUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        removed, _ = WishlistItem.objects.filter(
+            user=request.user,
+            product_id__in=serializer.validated_data['product_ids']
+        ).delete()
+
+        return Response({'removed': removed})
+
+class WishlistCheckView(APIView):
+    """Check which products are wishlisted"""
+    permission_classes = [IsAuthenticated]
+    max_check_size = 100
+
+    @swagger_auto_schema(
+        operation_description="Check up to 100 comma-separated product IDs against the current user's wishlist (one call per list page)",
+        manual_parameters=[
+            openapi.Parameter('ids', openapi.IN_QUERY, description="Comma-separated product IDs", type=openapi.TYPE_STRING, required=True),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Wishlisted flag per product ID",
+                examples={"application/json": {"results": {"3": True, "7": False}}}
+            ),
+            400: "Missing or invalid product IDs"
+        },
+        tags=['Wishlist']
+    )
+    def get(self, request):
+        try:
+            product_ids = parse_id_list(request.query_params.get('ids'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not product_ids or len(product_ids) > self.max_check_size:
+            return Response(
+                {'error': f'Provide between 1 and {self.max_check_size} product IDs'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Answered from the (user, product) unique index alone
+        wishlisted = set(WishlistItem.objects.filter(
+            user=request.user, product_id__in=product_ids
+        ).values_list('product_id', flat=True))
+
         return Response({
-            'message': 'Add to wishlist feature coming soon'
+            'results': {str(pk): pk in wishlisted for pk in product_ids}
         })
 
 class CompareProductsView(APIView):
-    """Compare products (Future feature)"""
+    """Compare products side by side"""
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Compare 2 to 10 products by comma-separated IDs",
+        manual_parameters=[
+            openapi.Parameter('ids', openapi.IN_QUERY, description="Comma-separated product IDs", type=openapi.TYPE_STRING, required=True),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Comparison matrix with min/max highlights",
+                examples={
+                    "application/json": {
+                        "products": [
+                            {"id": 1, "name": "Galaxy S24", "sku": "SG-S24"},
+                            {"id": 2, "name": "iPhone 15", "sku": "AP-IP15"}
+                        ],
+                        "matrix": {
+                            "price": ["1200.00", "1100.00"],
+                            "effective_price": ["999.00", "1100.00"],
+                            "discount_percentage": ["16.75", "0.00"],
+                            "stock_quantity": [12, 0],
+                            "weight": ["0.17", None],
+                            "dimensions": ["147x71x7.6mm", ""],
+                            "category": ["Smartphones", "Smartphones"]
+                        },
+                        "highlights": {
+                            "effective_price": {"min": [1], "max": [2]}
+                        },
+                        "missing": []
+                    }
+                }
+            ),
+            400: "Missing or invalid product IDs"
+        },
+        tags=['Products']
+    )
+    def get(self, request):
+        try:
+            product_ids = parse_id_list(request.query_params.get('ids'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 2 <= len(product_ids) <= MAX_COMPARE_PRODUCTS:
+            return Response(
+                {'error': f'Provide between 2 and {MAX_COMPARE_PRODUCTS} product IDs'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(build_matrix(product_ids))
+
+# =============================================================================
+# RECOMMENDATION VIEWS
+# =============================================================================
+
+class BoughtTogetherView(APIView):
+    """Products frequently bought together with the given products"""
     permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 50
+    max_products = 100
 
     @swagger_auto_schema(
-        operation_description="Compare multiple products (Coming soon)",
-        responses={200: "Product comparison feature coming soon"},
-        tags=['Future Features']
+        operation_description="Products most often found in paid orders together with the given products (one product or a whole basket)",
+        manual_parameters=[
+            openapi.Parameter('ids', openapi.IN_QUERY, description="Comma-separated product IDs", type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum recommendations (default 10, max 50)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Response(
+                description="Recommended products with the number of paid orders they shared with the given products",
+                examples={
+                    "application/json": {
+                        "results": [
+                            {"product": {"id": 9, "name": "USB-C Charger"}, "orders": 42}
+                        ]
+                    }
+                }
+            ),
+            400: "Missing or invalid product IDs"
+        },
+        tags=['Recommendations']
     )
     def get(self, request):
+        try:
+            product_ids = parse_id_list(request.query_params.get('ids'))
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not product_ids or len(product_ids) > self.max_products:
+            return Response(
+                {'error': f'Provide between 1 and {self.max_products} product IDs'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return self.recommend(product_ids, limit)
+
+    def recommend(self, product_ids, limit):
+        limit = max(1, min(limit, self.max_limit))
+        context = {'request': self.request}
         return Response({
-            'message': 'Product comparison feature coming soon'
-        })
\ No newline at end of file
+            'results': [
+                {'product': ProductListSerializer(product, context=context).data, 'orders': orders}
+                for product, orders in bought_together(product_ids, limit)
+            ]
+        })
+
+class CartBoughtTogetherView(BoughtTogetherView):
+    """Products frequently bought together with the current cart"""
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Products most often found in paid orders together with the items in the user's cart",
+        manual_parameters=[
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum recommendations (default 10, max 50)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: "Recommended products with the number of paid orders they shared with the cart",
+            400: "Invalid limit"
+        },
+        tags=['Recommendations']
+    )
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Relational carts pass a subquery: the whole cart is answered in one query
+        return self.recommend(get_cart_storage().product_ids(request.user), limit)
\ No newline at end of file
@@ -0,0 +1,144 @@
+# smart_gear/fieldsets.py
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+
+
+def parse_field_list(value):
+    """Split a comma-separated field list into a set of names"""
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for generic views via `?fields=a,b` or `?omit=c`.
+
+    The serializer is pruned to the requested fields before serialization,
+    and the queryset is narrowed with only()/select_related() to the columns
+    those fields read. Serializers map fields that are not plain model
+    attributes (method fields, properties) to the ORM paths they read in a
+    `field_dependencies` dict; if any kept field cannot be resolved, the
+    queryset is left unnarrowed rather than risking per-row deferred loads.
+    Unknown field names are rejected with a 400 listing the valid ones.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    def get_sparse_fieldset(self):
+        """Return (fields, omit) name sets, or None when the request asks for all fields"""
+        params = self.request.query_params
+        fields = parse_field_list(params.get(self.fields_query_param))
+        omit = parse_field_list(params.get(self.omit_query_param))
+        if not fields and not omit:
+            return None
+        return fields, omit
+
+    def prune_fields(self, serializer):
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None:
+            return serializer
+        fields, omit = fieldset
+        target = getattr(serializer, 'child', serializer)
+        unknown = (fields | omit) - set(target.fields)
+        if unknown:
+            param = self.fields_query_param if unknown & fields else self.omit_query_param
+            raise ValidationError({param: [
+                f"Unknown fields: {', '.join(sorted(unknown))}. "
+                f"Valid fields are: {', '.join(target.fields)}"
+            ]})
+        for name in list(target.fields):
+            if (fields and name not in fields) or name in omit:
+                target.fields.pop(name)
+        return serializer
+
+    def get_serializer(self, *args, **kwargs):
+        return self.prune_fields(super().get_serializer(*args, **kwargs))
+
+    def resolve_path(self, model, path):
+        """Split an ORM path into (relations to join, loaded path, prefetch), or None if unresolvable"""
+        parts = path.split('__')
+        relations = []
+        for index, part in enumerate(parts):
+            try:
+                field = model._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation and (field.one_to_many or field.many_to_many):
+                # Reverse or many-to-many relations are prefetched, not selected
+                return [], None, '__'.join(parts[:index + 1])
+            if index < len(parts) - 1:
+                if not field.is_relation:
+                    return None
+                relations.append('__'.join(parts[:index + 1]))
+                model = field.related_model
+        return relations, path, None
+
+    def get_sparse_paths(self, serializer):
+        """ORM paths read by the kept fields of a (pruned) serializer, or None"""
+        target = getattr(serializer, 'child', serializer)
+        model = target.Meta.model
+        dependencies = getattr(target, 'field_dependencies', {})
+
+        paths = []
+        for name, field in target.fields.items():
+            if name in dependencies:
+                paths.extend(dependencies[name])
+            elif isinstance(field, BaseSerializer):
+                # Nested serializers load their whole relation
+                paths.append(f"{field.source.replace('.', '__')}__*")
+            elif field.source == '*':
+                return None
+            else:
+                paths.append(field.source.replace('.', '__'))
+        return paths
+
+    def narrow_queryset(self, queryset, extra_paths=()):
+        """Restrict a queryset to the columns the sparse fieldset (plus extra_paths) needs"""
+        if self.get_sparse_fieldset() is None:
+            return queryset
+
+        serializer = self.prune_fields(
+            self.get_serializer_class()(context=self.get_serializer_context())
+        )
+        paths = self.get_sparse_paths(serializer)
+        if paths is None:
+            return queryset
+
+        model = queryset.model
+        # Ordering columns are read back by keyset pagination
+        ordering = [
+            field.lstrip('-') for field in
+            (queryset.query.order_by or model._meta.ordering)
+            if isinstance(field, str)
+        ]
+
+        only = {model._meta.pk.name}
+        relations = set()
+        prefetches = set()
+        for path in paths + list(extra_paths) + ordering:
+            whole_relation = path.endswith('__*')
+            resolved = self.resolve_path(model, path[:-3] if whole_relation else path)
+            if resolved is None:
+                if path in ordering:
+                    # Annotations such as search_rank
+                    continue
+                return queryset
+            path_relations, loaded, prefetch = resolved
+            relations.update(path_relations)
+            if prefetch:
+                prefetches.add(prefetch)
+            elif whole_relation:
+                relations.add(loaded)
+                only.add(loaded)
+            else:
+                only.add(loaded)
+
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*relations)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset.only(*only)
+
+    def filter_queryset(self, queryset):
+        return self.narrow_queryset(super().filter_queryset(queryset))
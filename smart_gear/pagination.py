@@ -0,0 +1,205 @@
+# smart_gear/pagination.py
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+FALSE_VALUES = ('false', '0', 'no', 'off')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the queryset ordering plus an `id` tiebreaker.
+
+    The cursor stores the ordering values of the last (or first) row of the
+    page, so every page is a `WHERE (ordering) > (cursor) LIMIT n` query and
+    deep pages cost the same as the first one. `?count=false` skips COUNT(*).
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size = api_settings.PAGE_SIZE
+    tiebreaker = 'id'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset)
+        self.ordering_fields = [self.get_model_field(queryset, field) for field, _ in self.ordering]
+
+        values, reverse = self.decode_cursor(request)
+        include_count = request.query_params.get(
+            self.count_query_param, 'true'
+        ).lower() not in FALSE_VALUES
+        self.count = queryset.count() if include_count else None
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [(field, not descending) for field, descending in ordering]
+        if values is not None:
+            queryset = queryset.filter(self.build_position_filter(ordering, values))
+
+        queryset = queryset.order_by(*[
+            f"-{field}" if descending else field for field, descending in ordering
+        ])
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        self.page = results
+        return results
+
+    def get_ordering(self, queryset):
+        """Return the queryset ordering as (field, descending) pairs ending in the tiebreaker"""
+        order_by = list(queryset.query.order_by or queryset.model._meta.ordering)
+        ordering = []
+        for field in order_by:
+            if not isinstance(field, str):
+                continue
+            descending = field.startswith('-')
+            ordering.append((field.lstrip('-'), descending))
+
+        if not any(field in (self.tiebreaker, 'pk') for field, descending in ordering):
+            descending = ordering[0][1] if ordering else False
+            ordering.append((self.tiebreaker, descending))
+        return ordering
+
+    def get_model_field(self, queryset, path):
+        """Return the model (or annotation output) field an ordering path points at"""
+        if path in queryset.query.annotations:
+            return queryset.query.annotations[path].output_field
+        model = queryset.model
+        field = None
+        try:
+            for name in path.split('__'):
+                field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+                if field.is_relation:
+                    model = field.related_model
+        except FieldDoesNotExist:
+            return None
+        return field
+
+    def build_position_filter(self, ordering, values):
+        """Build the lexicographic `(f1, f2, ...) > (v1, v2, ...)` filter"""
+        position = Q()
+        for index, (field, descending) in enumerate(ordering):
+            lookup = 'lt' if descending else 'gt'
+            clause = Q(**{f"{field}__{lookup}": values[index]})
+            for previous_index in range(index):
+                clause &= Q(**{ordering[previous_index][0]: values[previous_index]})
+            position |= clause
+        return position
+
+    def get_position(self, instance):
+        """Return the JSON-safe ordering values of a row"""
+        position = []
+        for field, descending in self.ordering:
+            value = instance
+            for attr in field.split('__'):
+                value = getattr(value, attr)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, (Decimal, UUID)):
+                value = str(value)
+            position.append(value)
+        return position
+
+    def encode_cursor(self, values, reverse=False):
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        cursor = b64encode(payload.encode('utf-8')).decode('ascii')
+        url = remove_query_param(self.base_url, self.count_query_param)
+        if self.count is None:
+            url = replace_query_param(url, self.count_query_param, 'false')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values, reverse = payload['v'], bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Tampered or stale values must not reach the position filter
+        try:
+            values = [
+                field.to_python(value) if field is not None else value
+                for field, value in zip(self.ordering_fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if any(value is None for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+
+class KeysetOrPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination that switches to keyset pagination on request.
+
+    Clients opt in with `?pagination=cursor` (or by following a `cursor`
+    link), so existing `?page=` consumers keep working unchanged.
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor' or
+            self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_class()
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
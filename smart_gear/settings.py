@@ -129,10 +129,28 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
         'OPTIONS': {
             'timeout': 20,
-        }
+        },
+        # File-backed so threaded tests share one test database
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# Cache
+# The catalog cache backend is pluggable: LocMemCache (default), FileBasedCache
+# (LOCATION is a directory) or RedisCache (LOCATION is a redis:// URL; any
+# Redis-protocol server works).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': config('CATALOG_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CATALOG_CACHE_LOCATION', default='smartgear-catalog'),
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -327,4 +345,42 @@ ALLOWED_IMAGE_TYPES = ['jpeg', 'jpg', 'png', 'webp']
 
 # Pagination settings
 DEFAULT_PAGE_SIZE = 20
-MAX_PAGE_SIZE = 100
\ No newline at end of file
+MAX_PAGE_SIZE = 100
+
+# Search settings
+# Dotted path to a products.search backend; None picks one matching the database
+PRODUCT_SEARCH_BACKEND = None
+# Lower bounds (GHS) of the price buckets returned by search facets
+PRODUCT_PRICE_FACET_BUCKETS = [0, 100, 500, 1000, 5000, 10000]
+
+# Catalog cache settings
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TIMEOUT = 300  # seconds; 0 disables response caching
+# Stats endpoints are served from cache for STATS_CACHE_TIMEOUT seconds, then
+# stale for up to STATS_STALE_TIMEOUT more while one request recomputes them
+STATS_CACHE_TIMEOUT = 60
+STATS_STALE_TIMEOUT = 600
+# Maintain the products.CategoryStats rollup on every product write and serve
+# the stats endpoints from it (run `rebuild_stats_rollup` before enabling)
+PRODUCT_STATS_ROLLUP = False
+
+# Serve ProductListSerializer list endpoints from values_list() rows through a
+# precompiled renderer (same JSON output, no model or serializer field overhead)
+PRODUCT_COMPILED_SERIALIZATION = True
+
+# Seconds before the in-memory autocomplete index is rebuilt from the database
+# (edits made in this process are applied immediately)
+PRODUCT_SUGGEST_REFRESH = 300
+
+# Neighbours kept per product by the `update_copurchases` job for the
+# "frequently bought together" endpoints
+PRODUCT_COPURCHASE_TOP_K = 20
+
+# Anonymous carts live in a signed cookie (or X-Guest-Cart header) and are
+# merged into the user's cart on login
+GUEST_CART_COOKIE = 'guest_cart'
+GUEST_CART_MAX_AGE = 60 * 60 * 24 * 30
+
+# Where carts live: 'relational' (CartItem rows) or 'document' (a JSON line
+# list on the Cart row, products rehydrated from the catalog cache)
+CART_STORAGE = config('CART_STORAGE', default='relational')
\ No newline at end of file